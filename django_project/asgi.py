@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+# Tells settings.py to turn off persistent database connections
+os.environ['DJANGO_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ms18.middleware.PerformanceMiddleware',
+    'ms18.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,20 +77,75 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'django_project.wsgi.application'
 
+# Order and requisition forms post one quantity_<id> field per product
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connection settings come from DB_* environment variables. By default each
+# worker thread keeps its connection for DB_CONN_MAX_AGE seconds (0 closes
+# it after every request, empty keeps it forever) and checks it is still
+# alive before reusing it. DB_POOL=1 uses psycopg's connection pool instead:
+# connections are shared by all threads of a process, and the pool is only
+# opened by the first query, so commands that never touch the database
+# start as fast as before. Compare the modes with
+# `manage.py benchmark_connections`.
+#
+# Under ASGI (django_project/asgi.py sets DJANGO_ASGI=1) the sync ORM runs
+# each request in a thread of its own, so a persistent connection would be
+# left open by every request until the database runs out of connections.
+# There CONN_MAX_AGE is always 0; set DB_POOL=1 to reuse connections.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+DB_POOL = os.environ.get('DB_POOL', '') == '1'
+ASGI = os.environ.get('DJANGO_ASGI', '') == '1'
+
 DATABASES = {
    'default': {
        'ENGINE': 'django.db.backends.postgresql',
-       'NAME': 'ms18',
-       'USER': 'postgres',
-       'PASSWORD': 'iPrimexd24',
-       'HOST': 'localhost',
-       'PORT': '5432',
+       'NAME': os.environ.get('DB_NAME', 'ms18'),
+       'USER': os.environ.get('DB_USER', 'postgres'),
+       'PASSWORD': os.environ.get('DB_PASSWORD', 'iPrimexd24'),
+       'HOST': os.environ.get('DB_HOST', 'localhost'),
+       'PORT': os.environ.get('DB_PORT', '5432'),
+       # The pool manages connection lifetime itself
+       'CONN_MAX_AGE': 0 if DB_POOL or ASGI else (int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None),
+       'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+       'OPTIONS': {
+           'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+       },
    }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    }
+
+# Optional read replica, used by listing and reporting views and exports
+# (see ms18.routers). DB_REPLICA_HOST / DB_REPLICA_NAME (and _PORT, _USER,
+# _PASSWORD) override the primary's values. After a POST a client reads
+# from the primary for REPLICA_LAG_SECONDS, so it sees its own writes even
+# when the replica is behind. To try it locally, add any second alias
+# (SQLite or PostgreSQL) named REPLICA_DATABASE to DATABASES;
+# django_project/test_settings.py adds one mirroring the primary for tests.
+REPLICA_DATABASE = 'replica'
+REPLICA_LAG_SECONDS = int(os.environ.get('DB_REPLICA_LAG_SECONDS', '5'))
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        **{
+            key: os.environ[f'DB_REPLICA_{key}']
+            for key in ('NAME', 'HOST', 'PORT', 'USER', 'PASSWORD') if f'DB_REPLICA_{key}' in os.environ
+        },
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        # Tests run the replica against the primary's test database
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['ms18.routers.ReplicaRouter']
 
 
 # Password validation
@@ -130,6 +187,74 @@ STATIC_URL = 'static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Uploads are stored under their content hash; see ms18.storage
+STORAGES = {
+    'default': {
+        'BACKEND': 'ms18.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Serve MEDIA_URL from Django with long-lived cache headers. Turn off when a
+# web server serves the media directory directly.
+SERVE_MEDIA = DEBUG
+
+# Background jobs such as image thumbnailing. BACKEND is 'thread' (in-process
+# pool), 'spool' (job files drained by `manage.py run_task_worker`) or
+# 'immediate' (synchronous, for tests).
+TASK_QUEUE = {
+    'BACKEND': 'thread',
+    'WORKERS': 2,
+    'SPOOL_DIR': os.path.join(BASE_DIR, 'task_spool'),
+}
+
+# Cache used for catalog pages (see ms18.caching). Pick the backend with
+# CACHE_BACKEND: 'locmem' (per process), 'file' (shared by all workers on
+# one host) or 'redis' (shared; CACHE_LOCATION defaults to a local server).
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'ms18-catalog'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_DEFAULT_LOCATION),
+    },
+}
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 600
+
+# Request instrumentation (see ms18.middleware). Server-Timing headers go to
+# staff always and to everyone when PERFORMANCE_SERVER_TIMING is on. Each
+# request is logged as JSON on ms18.performance: at INFO normally, at
+# WARNING when it is slow or runs one query PERFORMANCE_DUPLICATE_QUERY_WARNING
+# times or more (an N+1, or bulk writes in many small batches). /metrics/
+# serves Prometheus histograms to staff or to a scraper sending
+# "Authorization: Bearer $METRICS_TOKEN".
+PERFORMANCE_SERVER_TIMING = DEBUG
+PERFORMANCE_SLOW_REQUEST_MS = 500
+PERFORMANCE_DUPLICATE_QUERY_WARNING = 10
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ms18.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -0,0 +1,16 @@
+# Settings for the test suite:
+#   python manage.py test --settings=django_project.test_settings
+# The same as settings.py, plus a replica alias that mirrors the primary's
+# test database when no DB_REPLICA_* replica is configured, so the replica
+# routing tests run without a second server.
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REPLICA_DATABASE
+
+if REPLICA_DATABASE not in DATABASES:
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        # A mirror uses the primary's connection settings in tests; its own
+        # pool would only be a second one to the same database
+        'OPTIONS': {key: value for key, value in DATABASES['default']['OPTIONS'].items() if key != 'pool'},
+        'TEST': {'MIRROR': 'default'},
+    }
@@ -19,8 +19,9 @@ from django.contrib.auth import views as auth_views
 from django.urls import path, include
 from users import views as user_views
 from django.conf import settings
-from django.conf.urls.static import static
-from django.urls import path, include, reverse_lazy
+from ms18 import views as ms18_views
+import re
+from django.urls import path, include, reverse_lazy, re_path
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -65,5 +66,7 @@ urlpatterns = [
     
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), ms18_views.serve_media, name='media'),
+    ]
@@ -1,36 +1,132 @@
-from django.contrib import admin
-from .models import Product, PurchaseOrder, Requisition, RequestedProduct
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import Product, PurchaseOrder, Requisition, RequestedProduct, StockMovement, ApiToken
+from .services import receive_order_stock, record_movements, lock_product_quantity, StockError
+from .imports import queue_import, import_status, file_format, CatalogImportError
+
 class PurchaseOrderAdmin(admin.ModelAdmin):
     list_display = ('ORD_EMPLOYEE', 'ORD_DATE_POSTED', 'ORD_NAME', 'ORD_QUANTITY', 'status')
+    raw_id_fields = ('product', 'employee')
+    readonly_fields = ('ORD_RECEIVED_AT',)
 
     def save_model(self, request, obj, form, change):
-        # Call the parent class's save_model to ensure the model is saved
-        super().save_model(request, obj, form, change)
+        with transaction.atomic():
+            # Lock the stored row so two admins saving the same order cannot
+            # both see it as unapproved and receive the stock twice.
+            previous_status = None
+            if change:
+                previous_status = (
+                    PurchaseOrder.objects.select_for_update()
+                    .filter(pk=obj.pk)
+                    .values_list('status', flat=True)
+                    .first()
+                )
+
+            # Only the transition into Approved updates the inventory
+            received = obj.status == PurchaseOrder.APPROVED and previous_status != PurchaseOrder.APPROVED
+            if received:
+                obj.ORD_RECEIVED_AT = timezone.now()
+
+            # Call the parent class's save_model to ensure the model is saved
+            super().save_model(request, obj, form, change)
+
+            if received:
+                try:
+                    receive_order_stock(obj)
+                except StockError as e:
+                    self.message_user(request, str(e), messages.ERROR)
 
-        # Check if the order is approved
-        if obj.status == PurchaseOrder.APPROVED:
-            try:
-                # Retrieve the corresponding product and update the inventory
-                product = Product.objects.get(PROD_NAME=obj.ORD_NAME)
-                original_quantity = product.PROD_QUANTITY
-                product.PROD_QUANTITY += obj.ORD_QUANTITY
-                print(f"Before update - Original Quantity: {original_quantity}, Order Quantity: {obj.ORD_QUANTITY}, Updated Quantity: {product.PROD_QUANTITY}")
-                product.save()
 
-                # Print statements for debugging
-                print(f"Order {obj.id} approved. Inventory updated: {original_quantity} -> {product.PROD_QUANTITY}")
-                print(f"Product details: {product.PROD_NAME}, Quantity: {product.PROD_QUANTITY}")
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or XLSX with columns sku, name, description, price, quantity, '
+                                     'supplier_code, supplier_name, supplier_address, supplier_phone')
 
-            except Product.DoesNotExist:
-                print(f"Product {obj.ORD_NAME} does not exist.")
-            except Exception as e:
-                print(f"An error occurred: {e}")
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        try:
+            file_format(file.name)
+        except CatalogImportError as e:
+            raise forms.ValidationError(str(e))
+        return file
 
 
 class ProductAdmin(admin.ModelAdmin):
-    # Customize the admin behavior for the Product model if needed
-    pass
+    change_list_template = 'admin/ms18/product/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='ms18_product_import'),
+            path('import/<str:import_id>/', self.admin_site.admin_view(self.import_status_view), name='ms18_product_import_status'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            import_id = queue_import(form.cleaned_data['file'])
+            return redirect('admin:ms18_product_import_status', import_id=import_id)
+        context = {**self.admin_site.each_context(request), 'opts': self.model._meta, 'form': form, 'title': 'Import catalog'}
+        return TemplateResponse(request, 'admin/ms18/product/import.html', context)
+
+    def import_status_view(self, request, import_id):
+        status = import_status(import_id)
+        if status is None:
+            raise Http404('Unknown import.')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'status': status,
+            'title': f"Import of {status['name']}",
+        }
+        return TemplateResponse(request, 'admin/ms18/product/import_status.html', context)
+
+    def save_model(self, request, obj, form, change):
+        # Record manual stock edits in the ledger as the difference from
+        # the stored quantity
+        with transaction.atomic():
+            previous_quantity = lock_product_quantity(obj.pk) if change else None
+            super().save_model(request, obj, form, change)
+            if previous_quantity is None:
+                record_movements({obj.pk: obj.PROD_QUANTITY}, StockMovement.OPENING)
+            else:
+                record_movements({obj.pk: obj.PROD_QUANTITY - previous_quantity}, StockMovement.ADJUSTMENT)
+
+
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('MOVE_DATE', 'product', 'MOVE_QUANTITY', 'MOVE_REASON', 'MOVE_REFERENCE')
+    list_filter = ('MOVE_REASON',)
+    list_select_related = ('product',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+class ApiTokenAdmin(admin.ModelAdmin):
+    # Tokens are created with `manage.py create_api_token`; here they can
+    # only be reviewed and revoked (deleted).
+    list_display = ('user', 'TOKEN_NAME', 'TOKEN_CREATED_AT')
+    list_select_related = ('user',)
+    fields = ('user', 'TOKEN_NAME', 'TOKEN_CREATED_AT')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 admin.site.register(Product, ProductAdmin)
 admin.site.register(PurchaseOrder, PurchaseOrderAdmin)
 admin.site.register(Requisition)
+admin.site.register(StockMovement, StockMovementAdmin)
+admin.site.register(ApiToken, ApiTokenAdmin)
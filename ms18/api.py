@@ -0,0 +1,484 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.forms import modelform_factory
+from django.forms.models import model_to_dict
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.urls import path
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.http import quote_etag
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import services
+from .models import Product, Supplier, PurchaseOrder, Requisition, RequestedProduct, StockMovement, ApiToken, DeletedRecord
+from .pagination import keyset_paginate
+from .routers import SAFE_METHODS
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# synced_at is set this far behind "now": rows written by transactions that
+# were still open when the page was read carry an earlier timestamp, and a
+# client that polls with since=<synced_at> would otherwise never see them.
+SINCE_OVERLAP = services.SNAPSHOT_GRACE
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+class Resource(View):
+    # A JSON resource over one model. `fields` maps API names to model
+    # fields; `?fields=a,b` limits both the response and the SELECT to those
+    # columns. Lists are keyset-paginated on the primary key and can be
+    # narrowed to rows changed since a timestamp with `?since=`; the first
+    # page of those also lists the ids deleted since then.
+    #
+    # Clients authenticate with `Authorization: Bearer <token>` (see
+    # `manage.py create_api_token`) or with the browser session. Session
+    # writes need the CSRF token like any form post: the csrftoken cookie
+    # echoed in an X-CSRFToken header.
+    model = None
+    fields = {}
+    computed = {}
+    writable = ()
+    filters = {}
+    updated_field = None
+    staff_only_writes = True
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.authenticate(request)
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as e:
+            body = {'error': str(e)}
+            if e.errors:
+                body['errors'] = e.errors
+            return JsonResponse(body, status=e.status)
+        except ObjectDoesNotExist:
+            return JsonResponse({'error': 'Not found.'}, status=404)
+
+    def authenticate(self, request):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and token.strip():
+            user = ApiToken.user_for(token.strip())
+            if user is None:
+                raise ApiError('Invalid API token.', status=401)
+            request.user = user
+            return
+        if not request.user.is_authenticated:
+            raise ApiError('Authentication required.', status=401)
+        # The views are csrf_exempt so token clients need no cookie; session
+        # writes get the same check CsrfViewMiddleware would have made
+        if request.method not in SAFE_METHODS:
+            check = CsrfViewMiddleware(lambda request: None)
+            check.process_request(request)
+            if check.process_view(request, None, (), {}) is not None:
+                raise ApiError('CSRF check failed. Send the X-CSRFToken header, or use an API token.', status=403)
+
+    # Reading
+
+    def get_queryset(self):
+        # select_related(None): the default managers join related tables
+        # that a sparse field list usually leaves out.
+        return self.model.objects.select_related(None)
+
+    def requested_fields(self):
+        names = self.request.GET.get('fields')
+        if not names:
+            return list(self.fields) + list(self.computed)
+        names = [name.strip() for name in names.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields and name not in self.computed]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+        return names
+
+    def columns(self, names):
+        columns = {self.model._meta.pk.name}
+        for name in names:
+            if name in self.fields:
+                columns.add(self.fields[name])
+            else:
+                columns.update(self.computed[name][0])
+        return columns
+
+    def serialize(self, obj, names):
+        data = {}
+        for name in names:
+            if name in self.fields:
+                data[name] = getattr(obj, self.model._meta.get_field(self.fields[name]).attname)
+            else:
+                data[name] = self.computed[name][1](obj)
+        return data
+
+    def filter_value(self, param, lookup):
+        # Converted to the field's type first, so a malformed value is a 400
+        # rather than a database error. Exact matches on fields with choices
+        # must be one of them; a generated field's choices are on its
+        # output field.
+        value = self.request.GET.get(param)
+        field = self.model._meta.get_field(lookup.split('__')[0])
+        if isinstance(field, models.GeneratedField):
+            field = field.output_field
+        try:
+            value = field.to_python(value)
+        except ValidationError:
+            raise ApiError(f"Invalid {param} '{value}'.")
+        if field.choices and '__' not in lookup and value not in dict(field.flatchoices):
+            raise ApiError(f"Invalid {param} '{value}'.")
+        return value
+
+    def since(self):
+        since = self.request.GET.get('since')
+        if not since:
+            return None
+        try:
+            when = parse_datetime(since)
+        except ValueError:
+            when = None
+        if when is None:
+            raise ApiError(f"Invalid since '{since}'.")
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        if when < timezone.now() - timedelta(days=DeletedRecord.DELETION_RETENTION_DAYS):
+            raise ApiError('since is older than the deletion log; fetch the full list again.', status=410)
+        return when
+
+    def filter_queryset(self, queryset, since=None):
+        for param, lookup in self.filters.items():
+            if self.request.GET.get(param):
+                queryset = queryset.filter(**{lookup: self.filter_value(param, lookup)})
+        if since is not None:
+            queryset = queryset.filter(**{f'{self.updated_field}__gte': since})
+        return queryset
+
+    def deleted_since(self, since):
+        return list(
+            DeletedRecord.objects.filter(DEL_MODEL=self.model._meta.label_lower, DEL_DATE__gte=since)
+            .order_by('DEL_ID').values_list('DEL_OBJECT_ID', flat=True)
+        )
+
+    def page_size(self):
+        try:
+            size = int(self.request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ApiError('limit must be a number.')
+        return max(1, min(size, MAX_PAGE_SIZE))
+
+    def etag(self, *parts):
+        key = ':'.join([self.request.get_full_path(), str(self.request.user.pk), *map(str, parts)])
+        return quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+    def not_modified(self, etag):
+        return etag in [tag.strip() for tag in self.request.headers.get('If-None-Match', '').split(',')]
+
+    def get(self, request, pk=None):
+        names = self.requested_fields()
+        if pk is not None:
+            obj = self.get_queryset().only(*self.columns(names), self.updated_field).get(pk=pk)
+            etag = self.etag(getattr(obj, self.updated_field).isoformat())
+            if self.not_modified(etag):
+                return self.with_etag(HttpResponseNotModified(), etag)
+            return self.with_etag(JsonResponse(self.serialize(obj, names)), etag)
+
+        since = self.since()
+        queryset = self.filter_queryset(self.get_queryset(), since)
+        synced_at = timezone.now() - SINCE_OVERLAP
+        first_page = not (request.GET.get('after') or request.GET.get('before'))
+        deleted = self.deleted_since(since) if since is not None and first_page else None
+
+        # The ETag covers this page only: the keys and timestamps of its rows
+        # (at most limit + 1 of them) and any deletions listed with it. A
+        # repeat poll is answered without reading the other columns or
+        # encoding anything.
+        keys = keyset_paginate(queryset.only(self.updated_field), request.GET, self.page_size())
+        etag = self.etag(
+            keys.has_next, deleted,
+            *[f'{obj.pk}@{getattr(obj, self.updated_field).isoformat()}' for obj in keys],
+        )
+        if self.not_modified(etag):
+            return self.with_etag(HttpResponseNotModified(), etag)
+
+        page = keyset_paginate(queryset.only(*self.columns(names)), request.GET, self.page_size())
+        body = {
+            'results': [self.serialize(obj, names) for obj in page],
+            'next': f'{request.path}?{page.next_querystring()}' if page.has_next else None,
+            'previous': f'{request.path}?{page.previous_querystring()}' if page.has_previous else None,
+            'synced_at': synced_at,
+        }
+        if deleted is not None:
+            body['deleted'] = deleted
+        return self.with_etag(JsonResponse(body), etag)
+
+    def with_etag(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    # Writing
+
+    def check_write_permission(self):
+        if self.staff_only_writes and not self.request.user.is_staff:
+            raise ApiError('Staff access required.', status=403)
+
+    def payload(self):
+        try:
+            data = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise ApiError('Request body must be JSON.')
+        if not isinstance(data, dict):
+            raise ApiError('Request body must be a JSON object.')
+        return data
+
+    def validate(self, data, instance=None):
+        # Writes go through a ModelForm so the API applies the same
+        # validation as the HTML forms.
+        columns = [self.fields[name] for name in self.writable]
+        form_data = model_to_dict(instance, fields=columns) if instance else {}
+        form_data.update({self.fields[name]: value for name, value in data.items() if name in self.writable})
+        form = modelform_factory(self.model, fields=columns)(form_data, instance=instance)
+        if not form.is_valid():
+            names = {column: name for name, column in self.fields.items()}
+            errors = {names.get(field, field): messages for field, messages in form.errors.items()}
+            raise ApiError('Invalid data.', errors=errors)
+        return form
+
+    def post(self, request, pk=None):
+        if pk is not None:
+            raise ApiError('Method not allowed.', status=405)
+        self.check_write_permission()
+        obj = self.create(self.payload())
+        return JsonResponse(self.serialize(obj, self.requested_fields()), status=201)
+
+    def patch(self, request, pk=None):
+        if pk is None:
+            raise ApiError('Method not allowed.', status=405)
+        self.check_write_permission()
+        obj = self.update(self.get_queryset().get(pk=pk), self.payload())
+        return JsonResponse(self.serialize(obj, self.requested_fields()))
+
+    def delete(self, request, pk=None):
+        if pk is None:
+            raise ApiError('Method not allowed.', status=405)
+        self.check_write_permission()
+        self.get_queryset().get(pk=pk).delete()
+        return HttpResponse(status=204)
+
+    def create(self, data):
+        return self.validate(data).save()
+
+    def update(self, obj, data):
+        return self.validate(data, obj).save()
+
+    @classmethod
+    def urls(cls, prefix):
+        # CSRF is checked in authenticate(), for session clients only
+        view = csrf_exempt(cls.as_view())
+        return [
+            path(f'{prefix}/', view, name=f'api-{prefix}'),
+            path(f'{prefix}/<int:pk>/', view, name=f'api-{prefix}-detail'),
+        ]
+
+
+class SupplierResource(Resource):
+    model = Supplier
+    fields = {
+        'id': 'SUPPLIER_ID',
+        'code': 'SUPPLIER_CODE',
+        'name': 'SUPPLIER_NAME',
+        'address': 'SUPPLIER_ADDRESS',
+        'phone': 'SUPPLIER_PHONE',
+        'updated_at': 'SUPPLIER_UPDATED_AT',
+    }
+    writable = ('code', 'name', 'address', 'phone')
+    filters = {'name': 'SUPPLIER_NAME__istartswith'}
+    updated_field = 'SUPPLIER_UPDATED_AT'
+
+
+class ProductResource(Resource):
+    model = Product
+    fields = {
+        'id': 'id',
+        'sku': 'PROD_SKU',
+        'name': 'PROD_NAME',
+        'description': 'PROD_DESCRIPTION',
+        'quantity': 'PROD_QUANTITY',
+        'price': 'PROD_PRICE',
+        'supplier': 'supplier',
+        'stock_band': 'PROD_STOCK_BAND',
+        'reorder_point': 'PROD_REORDER_POINT',
+        'reorder_quantity': 'PROD_REORDER_QUANTITY',
+        'updated_at': 'PROD_UPDATED_AT',
+    }
+    computed = {
+        'image': (['PROD_IMAGE'], lambda product: product.PROD_IMAGE.url if product.PROD_IMAGE else None),
+    }
+    writable = ('sku', 'name', 'description', 'quantity', 'price', 'supplier')
+    filters = {'supplier': 'supplier_id', 'name': 'PROD_NAME__istartswith', 'stock_band': 'PROD_STOCK_BAND'}
+    updated_field = 'PROD_UPDATED_AT'
+
+    def create(self, data):
+        with transaction.atomic():
+            product = super().create(data)
+            services.record_movements({product.pk: product.PROD_QUANTITY}, StockMovement.OPENING)
+        return product
+
+    def update(self, product, data):
+        # Quantity edits are recorded in the ledger like admin edits
+        with transaction.atomic():
+            previous_quantity = services.lock_product_quantity(product.pk)
+            product = super().update(product, data)
+            services.record_movements({product.pk: product.PROD_QUANTITY - previous_quantity}, StockMovement.ADJUSTMENT)
+        return product
+
+
+def line_quantities(data):
+    lines = data.get('lines')
+    if not isinstance(lines, list) or not lines:
+        raise ApiError('lines must be a non-empty list of {"product": id, "quantity": n}.')
+    quantities = {}
+    for line in lines:
+        try:
+            product_id, quantity = int(line['product']), int(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ApiError(f'Invalid line {line!r}.')
+        if quantity <= 0:
+            raise ApiError(f'Quantity for product with ID {product_id} must be positive.')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+class StatusResource(Resource):
+    # Orders and requisitions are created through the intake services and
+    # change only by moving out of Pending (or Draft, for requisitions).
+    status_field = None
+    staff_only_writes = False
+
+    def patch(self, request, pk=None):
+        if pk is None:
+            raise ApiError('Method not allowed.', status=405)
+        if not request.user.is_staff:
+            raise ApiError('Staff access required.', status=403)
+        self.get_queryset().filter(pk=pk).values_list('pk').get()
+        status = self.payload().get('status')
+        actions = self.status_actions()
+        if status not in actions:
+            raise ApiError(f"status must be one of {', '.join(actions)}.")
+        try:
+            changed = actions[status](pk)
+        except services.StockError as e:
+            raise ApiError(str(e), status=409)
+        if not changed:
+            raise ApiError('Already processed.', status=409)
+        return JsonResponse(self.serialize(self.get_queryset().get(pk=pk), self.requested_fields()))
+
+    def delete(self, request, pk=None):
+        raise ApiError('Method not allowed.', status=405)
+
+
+class OrderResource(StatusResource):
+    model = PurchaseOrder
+    fields = {
+        'id': 'id',
+        'product': 'product',
+        'employee': 'employee',
+        'name': 'ORD_NAME',
+        'description': 'ORD_DESCRIPTION',
+        'quantity': 'ORD_QUANTITY',
+        'price': 'ORD_PRICE',
+        'status': 'status',
+        'date_posted': 'ORD_DATE_POSTED',
+        'updated_at': 'ORD_UPDATED_AT',
+    }
+    filters = {'status': 'status', 'product': 'product_id'}
+    updated_field = 'ORD_UPDATED_AT'
+
+    def get_queryset(self):
+        # Staff see every order; everyone else only their own
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(employee=self.request.user)
+        return queryset
+
+    def status_actions(self):
+        return {PurchaseOrder.APPROVED: services.approve_order, PurchaseOrder.REJECTED: services.reject_order}
+
+    def post(self, request, pk=None):
+        if pk is not None:
+            raise ApiError('Method not allowed.', status=405)
+        orders, errors = services.create_orders(request.user, line_quantities(self.payload()))
+        if not orders:
+            raise ApiError('No orders were created.', errors={'lines': errors})
+        names = self.requested_fields()
+        return JsonResponse({'results': [self.serialize(order, names) for order in orders], 'errors': errors}, status=201)
+
+
+class RequisitionResource(StatusResource):
+    model = Requisition
+    fields = {
+        'id': 'REQ_ID',
+        'employee': 'REQ_EMPLOYEE',
+        'supplier': 'supplier',
+        'status': 'REQ_STATUS',
+        'reorder': 'REQ_REORDER',
+        'date_created': 'REQ_DATE_CREATEDAT',
+        'updated_at': 'REQ_UPDATED_AT',
+    }
+    filters = {'status': 'REQ_STATUS', 'supplier': 'supplier_id'}
+    updated_field = 'REQ_UPDATED_AT'
+
+    def status_actions(self):
+        return {
+            Requisition.PENDING: services.submit_requisition,
+            Requisition.APPROVED: services.approve_requisition,
+            Requisition.REJECTED: services.reject_requisition,
+        }
+
+    def post(self, request, pk=None):
+        if pk is not None:
+            raise ApiError('Method not allowed.', status=405)
+        data = self.payload()
+        try:
+            supplier = Supplier.objects.get(pk=data.get('supplier'))
+        except (Supplier.DoesNotExist, TypeError, ValueError):
+            raise ApiError(f"Supplier with ID {data.get('supplier')} does not exist.")
+        requisition, requested_products, errors = services.create_requisition(request.user, supplier, line_quantities(data))
+        if requisition is None:
+            raise ApiError('No products were added to the requisition.', errors={'lines': errors})
+        body = self.serialize(requisition, self.requested_fields())
+        body['errors'] = errors
+        return JsonResponse(body, status=201)
+
+
+class RequestedProductResource(Resource):
+    model = RequestedProduct
+    fields = {
+        'id': 'REQUESTED_PRODUCT_ID',
+        'requisition': 'Requisition',
+        'product': 'Product',
+        'name': 'REQUESTED_PRODUCT_NAME',
+        'quantity': 'REQUESTED_PRODUCT_QUANTITY',
+        'updated_at': 'REQUESTED_PRODUCT_UPDATED_AT',
+    }
+    filters = {'requisition': 'Requisition_id', 'product': 'Product_id'}
+    updated_field = 'REQUESTED_PRODUCT_UPDATED_AT'
+    http_method_names = ['get', 'head', 'options']
+
+
+urlpatterns = [
+    *SupplierResource.urls('suppliers'),
+    *ProductResource.urls('products'),
+    *OrderResource.urls('orders'),
+    *RequisitionResource.urls('requisitions'),
+    *RequestedProductResource.urls('requested-products'),
+]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class Ms18Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ms18'
+
+    def ready(self):
+        import ms18.signals
@@ -0,0 +1,649 @@
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener, urlopen
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Profile
+
+from .caching import bump_catalog_version
+from .models import Product, Supplier, PurchaseOrder, Requisition, RequestedProduct, StockMovement
+from .search import index_products
+
+# Seeded rows are marked with this prefix (SKU, supplier code, username)
+# so a benchmark database is easy to recognise.
+BENCH_PREFIX = 'bench-'
+BENCH_PASSWORD = 'benchmark'
+SEED_CHUNK_SIZE = 5000
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+_ADJECTIVES = ['Wireless', 'Mechanical', 'Compact', 'Rugged', 'Silent', 'Gaming', 'Office', 'Portable', 'Smart', 'Ultra']
+_NOUNS = ['Keyboard', 'Mouse', 'Monitor', 'Cable', 'Adapter', 'Router', 'Speaker', 'Headset', 'Webcam', 'Drive', 'Printer', 'Charger']
+
+
+def dataset_sizes(products):
+    return {
+        'users': 20,
+        'suppliers': max(10, products // 100),
+        'products': products,
+        'orders': products,
+        'requisitions': max(10, products // 10),
+        'lines_per_requisition': 3,
+    }
+
+
+def product_name(index):
+    # Deterministic, so orders and requisition lines can name their product
+    # without keeping every product in memory.
+    return f'{_ADJECTIVES[index % len(_ADJECTIVES)]} {_NOUNS[index // len(_ADJECTIVES) % len(_NOUNS)]} {index}'
+
+
+def product_price(index):
+    return Decimal(100 + index * 7919 % 99900) / 100
+
+
+def is_seeded():
+    return Product.objects.filter(PROD_SKU__startswith=BENCH_PREFIX).exists()
+
+
+def _chunks(count, size=SEED_CHUNK_SIZE):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+def seed_dataset(products, seed=0, progress=None):
+    # Generate a benchmark dataset with `products` products and suppliers,
+    # users, orders and requisitions in proportion (dataset_sizes). The
+    # same seed always gives the same data. Rows are written in chunks,
+    # each in its own transaction, so memory use stays flat at any scale.
+    rng = random.Random(seed)
+    sizes = dataset_sizes(products)
+    now = timezone.now()
+    progress = progress or (lambda step, done, total: None)
+
+    password = make_password(BENCH_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'{BENCH_PREFIX}staff', password=password, is_staff=True),
+        *[User(username=f'{BENCH_PREFIX}clerk-{i}', password=password) for i in range(sizes['users'])],
+    ])
+    # bulk_create skips the post_save signal that gives every user a profile
+    Profile.objects.bulk_create([Profile(user=user) for user in User.objects.filter(username__startswith=BENCH_PREFIX)])
+    users = list(User.objects.filter(username__startswith=f'{BENCH_PREFIX}clerk-').order_by('pk').values_list('pk', 'username'))
+
+    supplier_ids = array('q')
+    for chunk in _chunks(sizes['suppliers']):
+        with transaction.atomic():
+            supplier_ids.extend(supplier.pk for supplier in Supplier.objects.bulk_create([
+                Supplier(
+                    SUPPLIER_CODE=f'{BENCH_PREFIX}s{i:07d}', SUPPLIER_NAME=f'Supplier {i}',
+                    SUPPLIER_ADDRESS=f'{i} Benchmark Street, Cebu City', SUPPLIER_PHONE=f'09{i:09d}'[:12],
+                )
+                for i in chunk
+            ]))
+        progress('suppliers', len(supplier_ids), sizes['suppliers'])
+
+    # Product i belongs to supplier i % suppliers
+    product_ids = array('q')
+    for chunk in _chunks(products):
+        with transaction.atomic():
+            created = Product.objects.bulk_create([
+                Product(
+                    PROD_SKU=f'{BENCH_PREFIX}p{i:08d}', PROD_NAME=product_name(i),
+                    PROD_DESCRIPTION=f'Benchmark product {i}', PROD_QUANTITY=rng.randrange(60),
+                    PROD_PRICE=product_price(i), supplier_id=supplier_ids[i % len(supplier_ids)],
+                )
+                for i in chunk
+            ])
+            StockMovement.objects.bulk_create([
+                StockMovement(product_id=product.pk, MOVE_QUANTITY=product.PROD_QUANTITY, MOVE_REASON=StockMovement.OPENING, MOVE_DATE=now)
+                for product in created if product.PROD_QUANTITY
+            ])
+            product_ids.extend(product.pk for product in created)
+        progress('products', len(product_ids), products)
+
+    statuses = [PurchaseOrder.APPROVED] * 18 + [PurchaseOrder.PENDING, PurchaseOrder.REJECTED]
+    done = 0
+    for chunk in _chunks(sizes['orders']):
+        with transaction.atomic():
+            orders = []
+            for _ in chunk:
+                index = rng.randrange(products)
+                user_id, username = users[rng.randrange(len(users))]
+                posted = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+                status = rng.choice(statuses)
+                orders.append(PurchaseOrder(
+                    ORD_EMPLOYEE=username, ORD_DATE_POSTED=posted,
+                    ORD_NAME=product_name(index), ORD_QUANTITY=rng.randint(1, 20), ORD_PRICE=product_price(index),
+                    ORD_DESCRIPTION=f'Benchmark product {index}', product_id=product_ids[index], employee_id=user_id,
+                    status=status,
+                    ORD_RECEIVED_AT=posted + timedelta(hours=rng.randint(1, 14 * 24)) if status == PurchaseOrder.APPROVED else None,
+                ))
+            PurchaseOrder.objects.bulk_create(orders)
+        done += len(chunk)
+        progress('orders', done, sizes['orders'])
+
+    statuses = [Requisition.APPROVED] * 16 + [Requisition.PENDING, Requisition.PENDING, Requisition.REJECTED, Requisition.DRAFT]
+    per_supplier = max(1, products // len(supplier_ids))
+    done = 0
+    for chunk in _chunks(sizes['requisitions'], SEED_CHUNK_SIZE // sizes['lines_per_requisition']):
+        with transaction.atomic():
+            suppliers = [rng.randrange(len(supplier_ids)) for _ in chunk]
+            requisitions = Requisition.objects.bulk_create([
+                Requisition(
+                    REQ_EMPLOYEE_id=users[rng.randrange(len(users))][0], supplier_id=supplier_ids[supplier],
+                    REQ_STATUS=rng.choice(statuses), REQ_DATE_CREATEDAT=now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                )
+                for supplier in suppliers
+            ])
+            lines = []
+            for requisition, supplier in zip(requisitions, suppliers):
+                # Lines are products of the requisition's supplier
+                for index in {
+                    min(products - 1, supplier + len(supplier_ids) * rng.randrange(per_supplier))
+                    for _ in range(sizes['lines_per_requisition'])
+                }:
+                    lines.append(RequestedProduct(
+                        REQUESTED_PRODUCT_NAME=product_name(index), REQUESTED_PRODUCT_QUANTITY=rng.randint(1, 10),
+                        Product_id=product_ids[index], Requisition=requisition,
+                    ))
+            RequestedProduct.objects.bulk_create(lines)
+        done += len(chunk)
+        progress('requisitions', done, sizes['requisitions'])
+
+    # bulk_create sends no signals: rebuild the search index, drop cached
+    # pages and refresh planner statistics for the new tables
+    with transaction.atomic():
+        index_products()
+        bump_catalog_version()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    progress('search index', products, products)
+    return sizes
+
+
+def dataset_counts():
+    return {
+        'suppliers': Supplier.objects.count(),
+        'products': Product.objects.count(),
+        'orders': PurchaseOrder.objects.count(),
+        'requisitions': Requisition.objects.count(),
+        'requested_products': RequestedProduct.objects.count(),
+    }
+
+
+def fixtures():
+    # Ids the benchmarked URLs point at, taken from the seeded data
+    product = Product.objects.select_related(None).filter(PROD_SKU__startswith=BENCH_PREFIX).order_by('pk').first()
+    if product is None:
+        raise LookupError('No benchmark data; run `manage.py seed_benchmark` first.')
+    requisitions = Requisition.objects.select_related(None).filter(REQ_EMPLOYEE__username__startswith=BENCH_PREFIX)
+    return {
+        'staff': User.objects.get(username=f'{BENCH_PREFIX}staff'),
+        'product': product.pk,
+        'supplier': product.supplier_id,
+        'order': PurchaseOrder.objects.filter(status=PurchaseOrder.PENDING).order_by('pk').values_list('pk', flat=True).first(),
+        'requisition': requisitions.order_by('pk').values_list('pk', flat=True).first(),
+        'pending_requisition': requisitions.filter(REQ_STATUS=Requisition.PENDING).order_by('pk').values_list('pk', flat=True).first(),
+        'draft_requisition': requisitions.filter(REQ_STATUS=Requisition.DRAFT).order_by('pk').values_list('pk', flat=True).first(),
+    }
+
+
+class Route:
+    # One benchmarked request. `writes` requests run in a transaction that
+    # is rolled back so every iteration sees the same data. `heavy` ones
+    # (full exports) are timed once.
+    def __init__(self, label, name, args=(), method='GET', data=None, query=None, writes=False, heavy=False):
+        self.label = label
+        self.name = name
+        self.args = args
+        self.method = method
+        self.data = data or {}
+        self.query = query or {}
+        self.writes = writes
+        self.heavy = heavy
+
+    def url(self):
+        return reverse(self.name, args=self.args)
+
+
+def routes(ids):
+    # Every route in ms18.urls, including the API. Routes whose object does
+    # not exist in the dataset (say, no draft requisitions) are left out.
+    product, supplier = ids['product'], ids['supplier']
+    return [route for route in _routes(ids, product, supplier) if None not in route.args]
+
+
+def _routes(ids, product, supplier):
+    return [
+        Route('inventory', 'ms18-home'),
+        Route('inventory by stock band', 'ms18-home', query={'stock': Product.LOW}),
+        Route('inventory by name', 'ms18-home', query={'name': 'Wireless K'}),
+        Route('product detail', 'product-detail', [product]),
+        Route('product create form', 'product-create'),
+        Route('product create', 'product-create', method='POST', writes=True, data={
+            'PROD_NAME': 'Benchmark create', 'PROD_DESCRIPTION': 'x', 'PROD_QUANTITY': 1, 'PROD_PRICE': '1.00', 'supplier': supplier,
+        }),
+        Route('product update form', 'product-update', [product]),
+        Route('product delete form', 'product-delete', [product]),
+        Route('product delete', 'product-delete', [product], method='POST', writes=True),
+        Route('add to cart', 'add-to-cart', method='POST', writes=True, data={f'quantity_{product}': 2}),
+        Route('cart', 'cart'),
+        Route('supplier list', 'supplier-list'),
+        Route('add supplier to product', 'add-supplier-to-product', [product], method='POST', writes=True,
+              data={'supplier_name': 'Supplier 0'}),
+        Route('supplier create form', 'supplier-create'),
+        Route('purchase order page', 'ms18-about'),
+        Route('order review queue', 'admin_review_orders'),
+        Route('approve order', 'admin_approve_order', [ids['order']], method='POST', writes=True),
+        Route('reject order', 'admin_reject_order', [ids['order']], method='POST', writes=True),
+        Route('receipt', 'generate-receipt', query={'format': 'txt'}),
+        Route('export products', 'export-data', ['products', 'csv'], heavy=True),
+        Route('export orders', 'export-data', ['orders', 'jsonl'], heavy=True),
+        Route('export requisitions', 'export-data', ['requisitions', 'csv'], heavy=True),
+        Route('add requisition page', 'add-requisition'),
+        Route('add to requisition', 'add_to_req', method='POST', writes=True,
+              data={'hidden_supplier_id': supplier, f'quantity_{product}': 1}),
+        Route('requisition list', 'view-requisitions'),
+        Route('approve requisition', 'approve_requisition', [ids['pending_requisition']], method='POST', writes=True),
+        Route('reject requisition', 'reject_requisition', [ids['pending_requisition']], method='POST', writes=True),
+        Route('submit requisition', 'submit_requisition', [ids['draft_requisition']], method='POST', writes=True),
+        Route('requisition lines', 'requested-product-view', [ids['requisition']]),
+        Route('cache stats', 'catalog-cache-stats'),
+        Route('metrics', 'metrics'),
+        Route('typeahead', 'product-search', query={'q': 'wireless key'}),
+        Route('api suppliers', 'api-suppliers'),
+        Route('api supplier', 'api-suppliers-detail', [supplier]),
+        Route('api products', 'api-products'),
+        Route('api products since', 'api-products', query={'since': (timezone.now() - timedelta(hours=1)).isoformat()}),
+        Route('api product', 'api-products-detail', [product]),
+        Route('api orders', 'api-orders'),
+        Route('api order', 'api-orders-detail', [ids['order']]),
+        Route('api requisitions', 'api-requisitions'),
+        Route('api requisition', 'api-requisitions-detail', [ids['requisition']]),
+        Route('api requested products', 'api-requested-products', query={'requisition': ids['requisition']}),
+        Route('api requested product', 'api-requested-products-detail', [
+            RequestedProduct.objects.filter(Requisition_id=ids['requisition']).values_list('pk', flat=True).first(),
+        ]),
+    ]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of an unsorted list
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies, queries):
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'queries': round(statistics.fmean(queries), 1) if queries else None,
+    }
+
+
+def _client_host():
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0] if hosts else 'localhost'
+
+
+def _request(client, route):
+    url = route.url()
+    if route.method == 'POST':
+        response = client.post(url, route.data)
+    else:
+        response = client.get(url, route.query)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def time_route(client, route, iterations, warmup):
+    latencies = []
+    queries = []
+    status = None
+    runs = 1 if route.heavy else warmup + iterations
+    for i in range(runs):
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    status = _request(client, route)
+                    elapsed = time.perf_counter() - start
+                if route.writes:
+                    raise _Rollback
+        except _Rollback:
+            pass
+        if route.heavy or i >= warmup:
+            latencies.append(elapsed)
+            queries.append(len(context.captured_queries))
+    return {'route': route.name, 'method': route.method, 'status': status, **summarize(latencies, queries)}
+
+
+def run_route_benchmarks(iterations=20, warmup=1, only=None, progress=None):
+    # Time every route with the Django test client, logged in as the seeded
+    # staff user. Returns {label: summary}.
+    ids = fixtures()
+    client = Client(HTTP_HOST=_client_host())
+    client.force_login(ids['staff'])
+    results = {}
+    for route in routes(ids):
+        if only and route.name not in only and route.label not in only:
+            continue
+        results[route.label] = time_route(client, route, iterations, warmup)
+        if progress:
+            progress(route.label, results[route.label])
+    return results
+
+
+# Connection handling compared by run_connection_benchmark: a new
+# connection per request (CONN_MAX_AGE = 0, Django's default), persistent
+# connections with health checks, and psycopg's pool.
+CONNECTION_MODES = {
+    'per request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': {'min_size': 1, 'max_size': 4}},
+}
+
+
+def time_connections(settings_dict, label, requests):
+    # Replays Django's request cycle against one database: the previous
+    # connection is checked when a request starts and closed, kept or
+    # returned to the pool when it finishes, with one query in between.
+    # Returns ([seconds per request], number of server connections used).
+    mode = dict(CONNECTION_MODES[label])
+    options = {key: value for key, value in settings_dict['OPTIONS'].items() if key != 'pool'}
+    if 'pool' in mode:
+        options['pool'] = mode.pop('pool')
+    # A connection handler of its own, so neither the pool nor a persistent
+    # connection touches or outlives the default connection. The handler
+    # insists on a 'default' entry, which is never connected.
+    alias = f"benchmark-{label.replace(' ', '-')}"
+    handler = ConnectionHandler({DEFAULT_DB_ALIAS: dict(settings_dict), alias: {**settings_dict, **mode, 'OPTIONS': options}})
+    conn = handler[alias]
+    latencies = []
+    backends = set()
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            conn.close_if_unusable_or_obsolete()
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                backends.add(cursor.fetchone()[0])
+            conn.close_if_unusable_or_obsolete()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+        if conn.pool:
+            conn.close_pool()
+    return latencies, len(backends)
+
+
+def run_connection_benchmark(requests=200, alias=DEFAULT_DB_ALIAS, modes=None):
+    # Per-request connection overhead of each CONNECTION_MODES entry on a
+    # PostgreSQL database. Returns {mode: summary}.
+    if connections[alias].vendor != 'postgresql':
+        raise ValueError('The connection benchmark needs a PostgreSQL database.')
+    results = {}
+    for label in modes or CONNECTION_MODES:
+        latencies, backends = time_connections(connections[alias].settings_dict, label, requests)
+        results[label] = {**summarize(latencies, []), 'connections': backends}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_document(kind, results, **options):
+    return {
+        'kind': kind,
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'dataset': dataset_counts(),
+        'options': options,
+        'results': results,
+    }
+
+
+def save_results(document, path=None):
+    # Default: benchmark_results/<kind>-<commit>-<time>.json under BASE_DIR
+    if path is None:
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(settings.BASE_DIR, 'benchmark_results', f"{document['kind']}-{document['commit'] or 'nogit'}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(previous, current):
+    # [(label, previous p50, current p50, change %, previous queries, current queries)]
+    rows = []
+    for label, result in current['results'].items():
+        before = previous['results'].get(label)
+        if before is None:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        rows.append((label, before['p50_ms'], result['p50_ms'], change, before['queries'], result['queries']))
+    return rows
+
+
+def load_test_paths(ids):
+    # Read-only pages hit by the load test, weighted by how often they are
+    # used; (label, path)
+    return [
+        *[(route.label, route.url() + ('?' + urlencode(route.query) if route.query else '')) for route in routes(ids)
+          if route.method == 'GET' and not route.heavy and not route.label.startswith(('cache', 'metrics'))],
+        *[('inventory', reverse('ms18-home'))] * 4,
+        *[('typeahead', reverse('product-search') + '?' + urlencode({'q': query}))
+          for query in ['wi', 'mech', 'router 1', 'silent mo', 'cable']],
+    ]
+
+
+_QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+class _Session:
+    # A logged-in browser session against a running server
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+        login_url = self.base_url + reverse('login')
+        self.opener.open(login_url).read()
+        token = self.cookie(settings.CSRF_COOKIE_NAME)
+        self.opener.open(Request(
+            login_url, data=urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': token}).encode(),
+            headers={'Referer': login_url},
+        )).read()
+        if self.cookie(settings.SESSION_COOKIE_NAME) is None:
+            raise ValueError(f'Could not log in to {self.base_url} as {username}.')
+
+    def cookie(self, name):
+        return next((cookie.value for cookie in self.cookies if cookie.name == name), None)
+
+    def get(self, path):
+        # (status, seconds, queries from Server-Timing or None); status 0
+        # when the server could not be reached
+        start = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path) as response:
+                response.read()
+                status, timing = response.status, response.headers.get('Server-Timing', '')
+        except HTTPError as e:
+            status, timing = e.code, ''
+        except URLError:
+            status, timing = 0, ''
+        elapsed = time.perf_counter() - start
+        match = _QUERY_COUNT.search(timing)
+        return status, elapsed, int(match.group(1)) if match else None
+
+
+def run_load_test(base_url, username, password, concurrency=8, duration=30, paths=None):
+    # Each of `concurrency` threads logs in and requests the paths in turn
+    # (shuffled, repeating) for `duration` seconds against a running
+    # server. Queries per request are read from the Server-Timing header,
+    # so the server needs PERFORMANCE_SERVER_TIMING on or a staff login.
+    # Returns {label: summary} plus an 'overall' entry.
+    paths = paths or load_test_paths(fixtures())
+    samples = []
+    lock = threading.Lock()
+
+    # Log in up front so a wrong password or URL fails before any timing
+    sessions = [_Session(base_url, username, password) for _ in range(concurrency)]
+
+    def worker(number):
+        session = sessions[number]
+        order = paths[:]
+        random.Random(number).shuffle(order)
+        done = []
+        while time.monotonic() < deadline:
+            for label, path in order:
+                done.append((label, *session.get(path)))
+                if time.monotonic() >= deadline:
+                    break
+        with lock:
+            samples.extend(done)
+
+    deadline = time.monotonic() + duration
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    by_label = {}
+    for sample in samples:
+        by_label.setdefault(sample[0], []).append(sample)
+    results = {}
+    for label, group in [*sorted(by_label.items()), ('overall', samples)]:
+        if not group:
+            continue
+        results[label] = {
+            **summarize([seconds for _, _, seconds, _ in group], [queries for _, _, _, queries in group if queries is not None]),
+            'errors': sum(1 for _, status, _, _ in group if not 200 <= status < 400),
+            'requests_per_second': round(len(group) / elapsed, 1),
+        }
+    return results
+
+
+# The same project under each kind of server, with the same number of
+# worker processes: gunicorn's sync workers handle one request at a time
+# each, uvicorn's event loops interleave the async views' requests while
+# they wait on the database. Neither server is a dependency of the app.
+SERVERS = {
+    'wsgi': ('gunicorn', ['django_project.wsgi:application', '--bind', '127.0.0.1:{port}', '--workers', '{workers}', '--threads', '{threads}']),
+    'asgi': ('uvicorn', [
+        'django_project.asgi:application', '--host', '127.0.0.1', '--port', '{port}', '--workers', '{workers}',
+        '--lifespan', 'off', '--no-access-log', '--log-level', 'warning',
+    ]),
+}
+
+
+def server_available(kind):
+    return importlib.util.find_spec(SERVERS[kind][0]) is not None
+
+
+def async_view_paths(ids):
+    # The endpoints served by async views, weighted toward the typeahead;
+    # (label, path)
+    return [
+        *[('typeahead', reverse('product-search') + '?' + urlencode({'q': query}))
+          for query in ['wi', 'mech', 'router 1', 'silent mo', 'cable']],
+        ('requisition lines', reverse('requested-product-view', args=[ids['requisition']])),
+        ('receipt', reverse('generate-receipt') + '?' + urlencode({'format': 'txt'})),
+        ('export orders', reverse('export-data', args=['orders', 'csv'])),
+    ]
+
+
+@contextmanager
+def running_server(kind, port, workers, threads=1, timeout=30):
+    # Starts the server on 127.0.0.1:port with this process's settings and
+    # yields its base URL once the login page answers
+    module, arguments = SERVERS[kind]
+    options = {'port': port, 'workers': workers, 'threads': threads}
+    command = [sys.executable, '-m', module, *[argument.format(**options) for argument in arguments]]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    urlopen(base_url + reverse('login'), timeout=1).read()
+                    break
+                except (URLError, OSError):
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        log.seek(0)
+                        raise RuntimeError(f'{module} did not start:\n{log.read().decode(errors="replace")[-2000:]}')
+                    time.sleep(0.2)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def run_server_benchmark(username, password, workers=2, threads=1, concurrency=(1, 8, 32), duration=10,
+                         kinds=('wsgi', 'asgi'), port=8301, paths=None, progress=None):
+    # run_load_test() against each server at each concurrency level.
+    # Returns {kind: {concurrency: {label: summary}}}.
+    paths = paths or async_view_paths(fixtures())
+    results = {}
+    for offset, kind in enumerate(kinds):
+        results[kind] = {}
+        with running_server(kind, port + offset, workers, threads) as base_url:
+            for clients in concurrency:
+                if progress:
+                    progress(kind, clients)
+                results[kind][str(clients)] = run_load_test(base_url, username, password, clients, duration, paths)
+    return results
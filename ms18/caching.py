@@ -0,0 +1,108 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import primary_reads
+
+# Catalog pages (products and suppliers) are cached under keys that embed a
+# version number. Any change to a product or supplier bumps the version, so
+# every stale entry stops being read at once and simply expires later.
+VERSION_KEY = 'ms18:catalog:version'
+HITS_KEY = 'ms18:catalog:hits'
+MISSES_KEY = 'ms18:catalog:misses'
+WRITTEN_KEY = 'ms18:catalog:written_at'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def catalog_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 600)
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    # Bump now so this process stops serving the old entries, and again
+    # after commit in case another request cached the old rows under the
+    # new version while the write was still uncommitted.
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+    cache.set(WRITTEN_KEY, time.time(), timeout=None)
+
+
+def recently_written():
+    # A read replica may not have caught up with the last catalog change yet
+    written_at = get_cache().get(WRITTEN_KEY)
+    return written_at is not None and time.time() - written_at < getattr(settings, 'REPLICA_LAG_SECONDS', 5)
+
+
+def catalog_key(name, *parts):
+    # Parts may be free text (query strings, search terms); hashing keeps
+    # the key short and valid for every cache backend.
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'ms18:catalog:{catalog_version()}:{name}:{digest}'
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def cached(name, parts, compute):
+    # get_or_set that also records whether the entry was found
+    cache = get_cache()
+    key = catalog_key(name, *parts)
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+    _count(MISSES_KEY)
+    # Entries live for the catalog timeout, so they must not be filled from
+    # a replica that is still behind the change that created this version
+    if recently_written():
+        with primary_reads():
+            value = compute()
+    else:
+        value = compute()
+    cache.set(key, value, catalog_timeout())
+    return value
+
+
+def cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'version': catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def reset_cache_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,217 @@
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Product, PurchaseOrder, RequestedProduct
+from .receipts import _Echo
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Each export is a list of (column, lookup, type) read with values_list()
+# over a server-side cursor, so rows are never turned into model instances
+# and only one chunk is in memory at a time.
+PRODUCT_COLUMNS = [
+    ('id', 'id', 'int'),
+    ('sku', 'PROD_SKU', 'str'),
+    ('name', 'PROD_NAME', 'str'),
+    ('description', 'PROD_DESCRIPTION', 'str'),
+    ('quantity', 'PROD_QUANTITY', 'int'),
+    ('price', 'PROD_PRICE', 'decimal'),
+    ('supplier_id', 'supplier_id', 'int'),
+    ('supplier_code', 'supplier__SUPPLIER_CODE', 'str'),
+    ('supplier_name', 'supplier__SUPPLIER_NAME', 'str'),
+    ('updated_at', 'PROD_UPDATED_AT', 'datetime'),
+]
+ORDER_COLUMNS = [
+    ('id', 'id', 'int'),
+    ('date_posted', 'ORD_DATE_POSTED', 'datetime'),
+    ('employee', 'ORD_EMPLOYEE', 'str'),
+    ('product_id', 'product_id', 'int'),
+    ('product', 'ORD_NAME', 'str'),
+    ('quantity', 'ORD_QUANTITY', 'int'),
+    ('unit_price', 'ORD_PRICE', 'decimal'),
+    ('status', 'status', 'str'),
+    ('updated_at', 'ORD_UPDATED_AT', 'datetime'),
+]
+REQUISITION_COLUMNS = [
+    ('requisition_id', 'Requisition_id', 'int'),
+    ('status', 'Requisition__REQ_STATUS', 'str'),
+    ('date_created', 'Requisition__REQ_DATE_CREATEDAT', 'datetime'),
+    ('employee', 'Requisition__REQ_EMPLOYEE__username', 'str'),
+    ('supplier', 'Requisition__supplier__SUPPLIER_NAME', 'str'),
+    ('line_id', 'REQUESTED_PRODUCT_ID', 'int'),
+    ('product_id', 'Product_id', 'int'),
+    ('product', 'REQUESTED_PRODUCT_NAME', 'str'),
+    ('quantity', 'REQUESTED_PRODUCT_QUANTITY', 'int'),
+]
+
+
+def product_rows(user):
+    return Product.objects.select_related(None).order_by('id')
+
+
+def order_rows(user):
+    orders = PurchaseOrder.objects.order_by('id')
+    if user is not None and not user.is_staff:
+        orders = orders.filter(employee=user)
+    return orders
+
+
+def requisition_rows(user):
+    return RequestedProduct.objects.select_related(None).order_by('Requisition_id', 'REQUESTED_PRODUCT_ID')
+
+
+EXPORTS = {
+    'products': (PRODUCT_COLUMNS, product_rows),
+    'orders': (ORDER_COLUMNS, order_rows),
+    'requisitions': (REQUISITION_COLUMNS, requisition_rows),
+}
+
+
+def _lookups(columns):
+    return [lookup for _, lookup, _ in columns]
+
+
+def export_rows(kind, user=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # `user` limits orders to that employee unless they are staff; None
+    # exports everything (management command). Yields lists of up to
+    # chunk_size rows.
+    columns, queryset = EXPORTS[kind]
+    rows = queryset(user).values_list(*_lookups(columns)).iterator(chunk_size=chunk_size)
+    return iter(lambda: list(islice(rows, chunk_size)), [])
+
+
+async def aexport_rows(kind, user=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # export_rows() for async views. Each chunk is read in the ORM's worker
+    # thread, as aiterator() would do; aiterator() itself cannot be used on
+    # values_list() querysets, which run their query as soon as iteration
+    # starts, on the event loop.
+    chunks = export_rows(kind, user, chunk_size)
+    while rows := await sync_to_async(next)(chunks, []):
+        yield rows
+
+
+# Writers turn chunks of rows into output: start(), then write(rows) per
+# chunk, then finish(); each returns what is ready to be sent. The same
+# writer serves export() and aexport().
+class CsvWriter:
+    def __init__(self, columns):
+        self.columns = columns
+        self.writer = csv.writer(_Echo())
+
+    def start(self):
+        return self.writer.writerow([name for name, _, _ in self.columns])
+
+    def write(self, rows):
+        return ''.join(self.writer.writerow(row) for row in rows)
+
+    def finish(self):
+        return ''
+
+
+class JsonlWriter:
+    def __init__(self, columns):
+        self.names = [name for name, _, _ in columns]
+        self.encoder = DjangoJSONEncoder()
+
+    def start(self):
+        return ''
+
+    def write(self, rows):
+        return ''.join(self.encoder.encode(dict(zip(self.names, row))) + '\n' for row in rows)
+
+    def finish(self):
+        return ''
+
+
+class _Sink:
+    # Write-only file for ParquetWriter; whatever was written since the
+    # last take() is handed to the response and dropped.
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetWriter:
+    # One row group per chunk, written out as soon as it is full
+    def __init__(self, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'int': pa.int64(),
+            'str': pa.string(),
+            'decimal': pa.decimal128(12, 2),
+            'datetime': pa.timestamp('us', tz='UTC'),
+        }
+        self.from_pylist = pa.Table.from_pylist
+        self.schema = pa.schema([(name, types[kind]) for name, _, kind in columns])
+        self.sink = _Sink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def start(self):
+        return self.sink.take()
+
+    def write(self, rows):
+        names = self.schema.names
+        self.writer.write_table(self.from_pylist([dict(zip(names, row)) for row in rows], schema=self.schema))
+        return self.sink.take()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.take()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', CsvWriter),
+    'jsonl': ('application/x-ndjson', JsonlWriter),
+    'parquet': ('application/vnd.apache.parquet', ParquetWriter),
+}
+
+
+def export(kind, file_format, user=None, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = EXPORT_FORMATS[file_format][1](EXPORTS[kind][0])
+    yield writer.start()
+    for rows in export_rows(kind, user, chunk_size):
+        yield writer.write(rows)
+    yield writer.finish()
+
+
+async def aexport(kind, file_format, user=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # export() for async views; a chunk is formatted between two awaits
+    writer = EXPORT_FORMATS[file_format][1](EXPORTS[kind][0])
+    yield writer.start()
+    async for rows in aexport_rows(kind, user, chunk_size):
+        yield writer.write(rows)
+    yield writer.finish()
@@ -0,0 +1,95 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import DEFERRED
+from PIL import Image
+
+from .tasks import task, enqueue
+
+THUMBNAIL_SIZES = (64, 150, 300)
+DISPLAY_SIZE = 300
+
+
+def variant_name(name, size, webp=False):
+    root, ext = os.path.splitext(name)
+    return f"{root}_{size}{'.webp' if webp else ext}"
+
+
+def thumbnail_url(file, size=DISPLAY_SIZE):
+    # URL of a generated variant, falling back to the original until the
+    # worker has produced it.
+    if not file:
+        return ''
+    name = variant_name(file.name, size)
+    if file.storage.exists(name):
+        return file.storage.url(name)
+    return file.url
+
+
+class ThumbnailedImageMixin:
+    # Queues make_thumbnails for each field in `thumbnail_fields` whose file
+    # changed on save. The request thread never opens the image itself.
+    thumbnail_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_images = {
+            field: values[field_names.index(field)]
+            for field in cls.thumbnail_fields
+            if field in field_names and values[field_names.index(field)] is not DEFERRED
+        }
+        return instance
+
+    def _changed_images(self, update_fields):
+        loaded = getattr(self, '_loaded_images', {})
+        changed = []
+        for field in self.thumbnail_fields:
+            if update_fields is not None and field not in update_fields:
+                continue
+            if field in self.get_deferred_fields():
+                continue
+            file = getattr(self, field)
+            if not file or file.name == self._meta.get_field(field).default:
+                continue
+            if not file._committed or file.name != loaded.get(field):
+                changed.append(field)
+        return changed
+
+    def save(self, *args, **kwargs):
+        changed = self._changed_images(kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        for field in changed:
+            name = getattr(self, field).name
+            self._loaded_images = {**getattr(self, '_loaded_images', {}), field: name}
+            enqueue('make_thumbnails', name)
+
+
+def _save_image(img, name, image_format):
+    # A variant name always maps to the same source image, so an existing
+    # file is already up to date.
+    if default_storage.exists(name):
+        return
+    buffer = BytesIO()
+    img.save(buffer, format=image_format)
+    save = getattr(default_storage, 'save_exact', default_storage.save)
+    save(name, ContentFile(buffer.getvalue()))
+
+
+@task
+def make_thumbnails(name):
+    with default_storage.open(name) as f:
+        img = Image.open(f)
+        img.load()
+    image_format = img.format or 'PNG'
+
+    # The uploaded file is left untouched; pages show the largest variant.
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB' if image_format == 'JPEG' else 'RGBA')
+    for size in THUMBNAIL_SIZES:
+        thumbnail = img.copy()
+        thumbnail.thumbnail((size, size))
+        _save_image(thumbnail, variant_name(name, size), image_format)
+        _save_image(thumbnail, variant_name(name, size, webp=True), 'WEBP')
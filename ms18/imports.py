@@ -0,0 +1,280 @@
+import csv
+import io
+import os
+import uuid
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import CatalogImport, Product, Supplier, StockMovement
+from .search import index_products
+from .services import record_movements, BULK_BATCH_SIZE
+from .tasks import task, enqueue
+
+# Rows are read, validated and written this many at a time, so memory use
+# does not depend on the size of the file.
+IMPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+class CatalogImportError(Exception):
+    pass
+
+
+def read_csv(file):
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(getattr(file, 'file', file), encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(file)
+
+
+def read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise CatalogImportError('Reading .xlsx files requires openpyxl (pip install openpyxl).')
+    # read_only mode streams rows from the sheet XML instead of building
+    # the whole workbook in memory.
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or '') for cell in next(rows, ())]
+        for row in rows:
+            yield {name: '' if value is None else str(value) for name, value in zip(header, row)}
+    finally:
+        workbook.close()
+
+
+READERS = {
+    'csv': read_csv,
+    'xlsx': read_xlsx,
+}
+
+
+def file_format(name):
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    if extension not in READERS:
+        raise CatalogImportError(f"Unsupported file type '.{extension}'; use one of: {', '.join(READERS)}.")
+    return extension
+
+
+def _clean(row):
+    return {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+
+
+def _length(errors, row, column, limit, required=False):
+    value = row.get(column, '')
+    if required and not value:
+        errors.append(f'{column} is required')
+    elif len(value) > limit:
+        errors.append(f'{column} is longer than {limit} characters')
+    return value
+
+
+SUPPLIER_DETAILS = ('supplier_name', 'supplier_address', 'supplier_phone')
+
+
+def _optional(fields, errors, row, column, field, limit):
+    # Blank optional columns are left out, so they keep the stored value
+    if row.get(column):
+        fields[field] = _length(errors, row, column, limit)
+
+
+def validate_row(row):
+    # Returns (supplier fields or None, product fields or None, errors). A
+    # row only writes a supplier when it has supplier details; a bare
+    # supplier_code just links the product to an existing supplier.
+    errors = []
+    supplier = product = None
+
+    if row.get('supplier_code') and any(row.get(column) for column in SUPPLIER_DETAILS):
+        supplier = {
+            'SUPPLIER_CODE': _length(errors, row, 'supplier_code', 50),
+            'SUPPLIER_NAME': _length(errors, row, 'supplier_name', 100, required=True),
+        }
+        _optional(supplier, errors, row, 'supplier_address', 'SUPPLIER_ADDRESS', 200)
+        _optional(supplier, errors, row, 'supplier_phone', 'SUPPLIER_PHONE', 12)
+
+    if row.get('sku'):
+        product = {
+            'PROD_SKU': _length(errors, row, 'sku', 64),
+            'PROD_NAME': _length(errors, row, 'name', 100, required=True),
+        }
+        _optional(product, errors, row, 'description', 'PROD_DESCRIPTION', 200)
+        if row.get('price'):
+            try:
+                product['PROD_PRICE'] = Decimal(row['price']).quantize(Decimal('0.01'))
+                if product['PROD_PRICE'] < 0 or product['PROD_PRICE'] >= 10 ** 8:
+                    raise InvalidOperation
+            except InvalidOperation:
+                errors.append(f"invalid price '{row['price']}'")
+        if row.get('quantity'):
+            try:
+                product['PROD_QUANTITY'] = int(row['quantity'])
+                if product['PROD_QUANTITY'] < 0:
+                    raise ValueError
+            except ValueError:
+                errors.append(f"invalid quantity '{row['quantity']}'")
+
+    if supplier is None and product is None:
+        errors.append('row has neither a sku nor supplier details')
+    return supplier, product, errors
+
+
+def _error(result, line, errors):
+    result['error_count'] += 1
+    if len(result['errors']) < MAX_REPORTED_ERRORS:
+        result['errors'].append(f"Line {line}: {'; '.join(errors)}.")
+
+
+def upsert(model, rows, unique_field, insert_only=()):
+    # Insert rows (dicts of fields), updating those whose unique_field
+    # already exists. Only the columns a row has are updated, so rows are
+    # written in groups with the same columns; insert_only columns are
+    # never updated.
+    groups = {}
+    for fields in rows:
+        groups.setdefault(frozenset(fields), []).append(fields)
+    updated_field = next(field.name for field in model._meta.fields if getattr(field, 'auto_now', False))
+    for columns, group in groups.items():
+        model.objects.bulk_create(
+            [model(**fields) for fields in group],
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=[unique_field],
+            update_fields=sorted(columns - {unique_field, *insert_only}) + [updated_field],
+        )
+
+
+def import_chunk(rows, first_line, result):
+    suppliers = {}
+    products = {}
+    for line, row in enumerate(rows, start=first_line):
+        row = _clean(row)
+        supplier, product, errors = validate_row(row)
+        if errors:
+            _error(result, line, errors)
+            continue
+        if supplier:
+            suppliers[supplier['SUPPLIER_CODE']] = supplier
+        if product:
+            # The row's supplier_code links the product; a later row for the
+            # same SKU wins.
+            products[product['PROD_SKU']] = (product, row.get('supplier_code') or None, line)
+
+    with transaction.atomic():
+        if suppliers:
+            previous_names = dict(
+                Supplier.objects.filter(SUPPLIER_CODE__in=list(suppliers)).values_list('SUPPLIER_CODE', 'SUPPLIER_NAME')
+            )
+            upsert(Supplier, suppliers.values(), 'SUPPLIER_CODE')
+            result['suppliers'] += len(suppliers)
+            # A renamed supplier changes the search rows of all its products
+            renamed = [
+                code for code, name in previous_names.items() if name != suppliers[code]['SUPPLIER_NAME']
+            ]
+            if renamed:
+                index_products(supplier_ids=list(
+                    Supplier.objects.filter(SUPPLIER_CODE__in=renamed).values_list('pk', flat=True)
+                ))
+
+        codes = {code for _, code, _ in products.values() if code}
+        supplier_ids = dict(Supplier.objects.filter(SUPPLIER_CODE__in=codes).values_list('SUPPLIER_CODE', 'pk'))
+        for sku, (fields, code, line) in list(products.items()):
+            if code and code not in supplier_ids:
+                _error(result, line, [f"unknown supplier_code '{code}'"])
+                del products[sku]
+            elif code:
+                fields['supplier_id'] = supplier_ids[code]
+
+        if products:
+            existing = set(Product.objects.filter(PROD_SKU__in=list(products)).values_list('PROD_SKU', flat=True))
+            # Quantity is only taken for new products. Stock on existing
+            # products changes through orders, requisitions and adjustments
+            # so that the ledger stays consistent. Rows without a
+            # supplier_code keep the product's supplier.
+            upsert(Product, [fields for fields, _, _ in products.values()], 'PROD_SKU', insert_only=['PROD_QUANTITY'])
+            product_ids = dict(
+                Product.objects.select_related(None).filter(PROD_SKU__in=list(products)).values_list('PROD_SKU', 'pk')
+            )
+            new_skus = [sku for sku in products if sku not in existing]
+            record_movements(
+                {product_ids[sku]: products[sku][0].get('PROD_QUANTITY', 0) for sku in new_skus}, StockMovement.OPENING
+            )
+            index_products(list(product_ids.values()))
+            result['products'] += len(products)
+            result['created'] += len(new_skus)
+
+        # bulk_create sends no post_save signals, so the cache and search
+        # index are refreshed here
+        bump_catalog_version()
+
+
+def import_catalog(file, file_type, progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    # Stream a CSV/XLSX catalog into Supplier and Product. Suppliers are
+    # matched on supplier_code and products on sku; matching rows are
+    # updated, the rest are inserted. Each chunk commits on its own.
+    result = {'rows': 0, 'suppliers': 0, 'products': 0, 'created': 0, 'error_count': 0, 'errors': []}
+    rows = READERS[file_type](file)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # Line numbers count the header as line 1
+        import_chunk(chunk, result['rows'] + 2, result)
+        result['rows'] += len(chunk)
+        if progress:
+            progress(result)
+    return result
+
+
+def queue_import(upload):
+    # Store the upload and import it in the background; returns the id of
+    # the import for import_status().
+    import_id = uuid.uuid4().hex
+    name = f'imports/{import_id}.{file_format(upload.name)}'
+    save = getattr(default_storage, 'save_exact', default_storage.save)
+    name = save(name, upload)
+    CatalogImport.objects.create(IMPORT_ID=import_id, IMPORT_NAME=upload.name)
+    enqueue('import_catalog_file', name, import_id)
+    return import_id
+
+
+def import_status(import_id):
+    catalog_import = CatalogImport.objects.filter(pk=import_id).first()
+    if catalog_import is None:
+        return None
+    return {
+        **catalog_import.IMPORT_PROGRESS,
+        'name': catalog_import.IMPORT_NAME,
+        'state': catalog_import.IMPORT_STATE,
+        'error': catalog_import.IMPORT_ERROR,
+    }
+
+
+def _set_import_status(import_id, **fields):
+    CatalogImport.objects.filter(pk=import_id).update(IMPORT_UPDATED_AT=timezone.now(), **fields)
+
+
+@task
+def import_catalog_file(name, import_id):
+    # Background import of an uploaded file; progress is saved on its
+    # CatalogImport row for the admin status page.
+    progress = {}
+
+    def report(result):
+        progress.update(result)
+        _set_import_status(import_id, IMPORT_STATE=CatalogImport.RUNNING, IMPORT_PROGRESS=progress)
+
+    report({})
+    try:
+        with default_storage.open(name, 'rb') as f:
+            progress.update(import_catalog(f, file_format(name), report))
+        _set_import_status(import_id, IMPORT_STATE=CatalogImport.DONE, IMPORT_PROGRESS=progress)
+    except Exception as e:
+        _set_import_status(import_id, IMPORT_STATE=CatalogImport.FAILED, IMPORT_PROGRESS=progress, IMPORT_ERROR=str(e))
+        raise
+    finally:
+        default_storage.delete(name)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.benchmarks import CONNECTION_MODES, result_document, run_connection_benchmark, save_results
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request connection overhead: a new connection per request, persistent connections and the pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--mode', action='append', dest='modes', choices=CONNECTION_MODES)
+        parser.add_argument('-o', '--output', help='Result file (default: benchmark_results/connections-<commit>-<time>.json)')
+
+    def handle(self, *args, **options):
+        try:
+            results = run_connection_benchmark(options['requests'], options['database'], options['modes'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'mode':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'connections':>11}")
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:<12} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['mean_ms']:>9.2f} {result['connections']:>11}"
+            )
+        document = result_document('connections', results, requests=options['requests'], database=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Saved {save_results(document, options["output"])}'))
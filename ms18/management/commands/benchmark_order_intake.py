@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ms18.models import Product, Supplier
+from ms18.services import create_orders
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure query count and latency of order intake as the number of order lines grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', nargs='+', type=int, default=[1, 10, 100, 1000])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'lines':>8} {'queries':>8} {'ms':>10}")
+        for line_count in options['lines']:
+            queries, elapsed = self.run_once(line_count)
+            self.stdout.write(f'{line_count:>8} {queries:>8} {elapsed * 1000:>10.1f}')
+
+    def run_once(self, line_count):
+        # Everything happens inside a transaction that is rolled back, so
+        # the benchmark leaves no rows behind.
+        result = {}
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='benchmark-order-intake')
+                supplier = Supplier.objects.create(
+                    SUPPLIER_NAME='Benchmark', SUPPLIER_ADDRESS='Benchmark', SUPPLIER_PHONE='0'
+                )
+                products = Product.objects.bulk_create([
+                    Product(PROD_NAME=f'Benchmark {i}', PROD_DESCRIPTION='Benchmark', PROD_PRICE=1, supplier=supplier)
+                    for i in range(line_count)
+                ])
+                quantities = {product.pk: 1 for product in products}
+
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    create_orders(user, quantities)
+                    result['elapsed'] = time.perf_counter() - start
+                result['queries'] = len(context.captured_queries)
+                raise Rollback
+        except Rollback:
+            pass
+        return result['queries'], result['elapsed']
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.benchmarks import compare_results, result_document, run_route_benchmarks, save_results
+
+
+class Command(BaseCommand):
+    help = 'Time every ms18 route with the Django test client against seeded data (see seed_benchmark) and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--route', action='append', dest='routes', help='Only this URL name or label (repeatable)')
+        parser.add_argument('-o', '--output', help='Result file (default: benchmark_results/routes-<commit>-<time>.json)')
+        parser.add_argument('--compare', help='Earlier result file to compare against')
+
+    def handle(self, *args, **options):
+        def progress(label, result):
+            self.stdout.write(
+                f"{label:<28} {result['status']:>4} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['p99_ms']:>9.1f} {result['queries']:>8}"
+            )
+
+        self.stdout.write(f"{'route':<28} {'code':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        try:
+            results = run_route_benchmarks(options['iterations'], options['warmup'], options['routes'], progress)
+        except LookupError as e:
+            raise CommandError(str(e))
+        document = result_document('routes', results, iterations=options['iterations'], warmup=options['warmup'])
+        path = save_results(document, options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Saved {path}'))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            self.stdout.write(f"\nAgainst {previous.get('commit')} ({previous.get('created_at')}):")
+            self.stdout.write(f"{'route':<28} {'p50 before':>10} {'p50 now':>9} {'change':>8} {'queries':>12}")
+            for label, before, now, change, queries_before, queries_now in compare_results(previous, document):
+                self.stdout.write(f'{label:<28} {before:>10.1f} {now:>9.1f} {change:>+7.0f}% {queries_before:>5} -> {queries_now}')
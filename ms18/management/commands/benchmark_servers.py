@@ -0,0 +1,54 @@
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.benchmarks import (
+    BENCH_PASSWORD, BENCH_PREFIX, SERVERS, result_document, run_server_benchmark, save_results, server_available,
+)
+
+
+class Command(BaseCommand):
+    help = 'Load-test the async endpoints under gunicorn (WSGI) and uvicorn (ASGI) with the same number of workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=list(SERVERS), action='append', help='Default: both')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+        parser.add_argument('--port', type=int, default=8301, help='First port; one per server')
+        parser.add_argument('--username', default=f'{BENCH_PREFIX}clerk-0')
+        parser.add_argument('--password', default=BENCH_PASSWORD)
+        parser.add_argument('-o', '--output', help='Result file (default: benchmark_results/servers-<commit>-<time>.json)')
+
+    def handle(self, *args, **options):
+        kinds = options['server'] or list(SERVERS)
+        for kind in kinds:
+            if not server_available(kind):
+                module = SERVERS[kind][0]
+                raise CommandError(f'The {kind} benchmark needs {module} (pip install {module}).')
+
+        try:
+            results = run_server_benchmark(
+                options['username'], options['password'], options['workers'], options['threads'], options['concurrency'],
+                options['duration'], kinds, options['port'],
+                progress=lambda kind, clients: self.stderr.write(f'{kind}: {clients} concurrent clients'),
+            )
+        except (LookupError, ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+        except URLError as e:
+            raise CommandError(f'Could not reach the server: {e.reason}')
+
+        self.stdout.write(f"{'server':<6} {'clients':>7} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for kind, levels in results.items():
+            for clients, result in levels.items():
+                overall = result['overall']
+                self.stdout.write(
+                    f"{kind:<6} {clients:>7} {overall['count']:>8} {overall['errors']:>6} {overall['requests_per_second']:>7} "
+                    f"{overall['p50_ms']:>9.1f} {overall['p95_ms']:>9.1f} {overall['p99_ms']:>9.1f}"
+                )
+        document = result_document(
+            'servers', results, workers=options['workers'], threads=options['threads'],
+            concurrency=options['concurrency'], duration=options['duration'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Saved {save_results(document, options["output"])}'))
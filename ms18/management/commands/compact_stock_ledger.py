@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ms18.services import compact_stock_ledger
+
+
+class Command(BaseCommand):
+    help = 'Snapshot on-hand stock for products that moved since the last run (schedule this periodically, e.g. hourly)'
+
+    def handle(self, *args, **options):
+        count = compact_stock_ledger()
+        self.stdout.write(self.style.SUCCESS(f'Snapshotted {count} products.'))
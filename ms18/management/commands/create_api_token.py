@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = 'Create an API token for a user. It is printed once; only its digest is stored.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--name', default='', help='What the token is for, shown in the admin')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['username']}'.")
+        token, _ = ApiToken.issue(user, options['name'])
+        self.stdout.write(token)
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.exports import EXPORTS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, export, parquet_available
+
+
+class Command(BaseCommand):
+    help = 'Stream products, orders or requisition lines to a CSV, JSONL or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='Defaults to standard output')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        export_format = options['format']
+        if export_format == 'parquet' and not parquet_available():
+            raise CommandError('Parquet exports need pyarrow (pip install pyarrow).')
+        chunks = export(options['kind'], export_format, chunk_size=options['chunk_size'])
+        binary = export_format == 'parquet'
+        if options['output']:
+            with (open(options['output'], 'wb') if binary else open(options['output'], 'w', newline='')) as f:
+                f.writelines(chunks)
+        elif binary:
+            sys.stdout.buffer.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
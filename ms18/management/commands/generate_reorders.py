@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ms18.reorders import run_reorders
+
+
+class Command(BaseCommand):
+    help = 'Recompute reorder levels and draft requisitions for products below them (schedule this periodically, e.g. daily)'
+
+    def handle(self, *args, **options):
+        updated, requisitions = run_reorders()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated reorder levels for {updated} products; drafted {len(requisitions)} requisitions.'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.imports import import_catalog, file_format, CatalogImportError, IMPORT_CHUNK_SIZE, READERS
+
+
+class Command(BaseCommand):
+    help = 'Insert or update suppliers (matched on supplier_code) and products (matched on sku) from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(READERS), help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            file_type = options['format'] or file_format(options['path'])
+            with open(options['path'], 'rb') as f:
+                result = import_catalog(f, file_type, self.progress, options['chunk_size'])
+        except (OSError, CatalogImportError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(error)
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f"... and {result['error_count'] - len(result['errors'])} more rows with errors.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['rows']} rows: {result['suppliers']} supplier rows, "
+            f"{result['products']} product rows ({result['created']} new), {result['error_count']} rejected."
+        ))
+
+    def progress(self, result):
+        self.stdout.write(f"{result['rows']} rows read, {result['error_count']} rejected")
@@ -0,0 +1,38 @@
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.benchmarks import BENCH_PASSWORD, BENCH_PREFIX, result_document, run_load_test, save_results
+
+
+class Command(BaseCommand):
+    help = 'Drive a running server with concurrent logged-in sessions and report p50/p95/p99 latency and queries per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds')
+        parser.add_argument('--username', default=f'{BENCH_PREFIX}staff')
+        parser.add_argument('--password', default=BENCH_PASSWORD)
+        parser.add_argument('-o', '--output', help='Result file (default: benchmark_results/load-<commit>-<time>.json)')
+
+    def handle(self, *args, **options):
+        try:
+            results = run_load_test(
+                options['url'], options['username'], options['password'], options['concurrency'], options['duration'],
+            )
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        except URLError as e:
+            raise CommandError(f"Could not reach {options['url']}: {e.reason}")
+
+        self.stdout.write(f"{'route':<28} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:<28} {result['count']:>8} {result['errors']:>6} {result['requests_per_second']:>7} "
+                f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {str(result['queries']):>8}"
+            )
+        document = result_document(
+            'load', results, url=options['url'], concurrency=options['concurrency'], duration=options['duration'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Saved {save_results(document, options["output"])}'))
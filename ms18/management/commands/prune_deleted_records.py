@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ms18.services import prune_deleted_records
+
+
+class Command(BaseCommand):
+    help = 'Drop API deletion records past their retention (schedule this periodically, e.g. daily)'
+
+    def handle(self, *args, **options):
+        count = prune_deleted_records()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {count} deletion records.'))
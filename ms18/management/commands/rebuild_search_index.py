@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ms18.search import index_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the product and supplier tables'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            index_products()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+import ms18.images  # noqa: F401 -- registers make_thumbnails
+import ms18.imports  # noqa: F401 -- registers import_catalog_file
+from ms18.tasks import get_backend, SpoolBackend
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs queued in the spool directory (TASK_QUEUE BACKEND = "spool")'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the spool once and exit')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not isinstance(backend, SpoolBackend):
+            raise CommandError('TASK_QUEUE BACKEND must be "spool" to run a worker.')
+        while True:
+            # Reconnect after DB_CONN_MAX_AGE or a dropped connection
+            close_old_connections()
+            processed = backend.drain()
+            if processed:
+                self.stdout.write(f'Processed {processed} jobs.')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
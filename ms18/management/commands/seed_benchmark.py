@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ms18.benchmarks import SCALES, dataset_sizes, is_seeded, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a reproducible benchmark dataset (use a database of its own)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scale', choices=SCALES, help='Number of products; suppliers, orders and requisitions scale with it')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+
+    def handle(self, *args, **options):
+        if is_seeded():
+            raise CommandError('This database already holds benchmark data; seed a fresh database (or `manage.py flush` first).')
+        products = SCALES[options['scale']]
+        sizes = dataset_sizes(products)
+        self.stdout.write(', '.join(f'{count} {name}' for name, count in sizes.items() if name != 'lines_per_requisition'))
+
+        start = time.perf_counter()
+        reported = {}
+
+        def progress(step, done, total):
+            # One line per step and every tenth of the way through it
+            tenth = done * 10 // max(total, 1)
+            if reported.get(step) != tenth:
+                reported[step] = tenth
+                self.stdout.write(f'  {step}: {done}/{total} ({time.perf_counter() - start:.0f}s)')
+
+        seed_dataset(products, seed=options['seed'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded the {options['scale']} dataset in {time.perf_counter() - start:.0f}s. "
+            f"Log in as bench-staff / benchmark to browse it."
+        ))
@@ -0,0 +1,63 @@
+from django.db import models
+from django.db.models import Count, ExpressionWrapper, F, Sum
+
+
+class ProductQuerySet(models.QuerySet):
+    def listing(self):
+        # Columns rendered by the inventory, order and requisition tables
+        return self.select_related('supplier').only(
+            'id', 'PROD_NAME', 'PROD_DESCRIPTION', 'PROD_QUANTITY', 'PROD_PRICE', 'PROD_STOCK_BAND',
+            'supplier__SUPPLIER_ID', 'supplier__SUPPLIER_NAME',
+        )
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().select_related('supplier')
+
+
+class RequisitionQuerySet(models.QuerySet):
+    def listing(self):
+        return self.select_related('supplier', 'REQ_EMPLOYEE').only(
+            'REQ_ID', 'REQ_DATE_CREATEDAT', 'REQ_STATUS', 'REQ_REORDER',
+            'supplier__SUPPLIER_ID', 'supplier__SUPPLIER_NAME',
+            'REQ_EMPLOYEE__id', 'REQ_EMPLOYEE__username',
+        )
+
+
+class RequisitionManager(models.Manager.from_queryset(RequisitionQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().select_related('supplier', 'REQ_EMPLOYEE')
+
+
+class RequestedProductQuerySet(models.QuerySet):
+    def listing(self):
+        return self.select_related('Product').only(
+            'REQUESTED_PRODUCT_ID', 'REQUESTED_PRODUCT_QUANTITY', 'Requisition',
+            'Product__id', 'Product__PROD_NAME',
+        )
+
+
+class RequestedProductManager(models.Manager.from_queryset(RequestedProductQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().select_related('Product')
+
+
+class PurchaseOrderQuerySet(models.QuerySet):
+    def line_total(self):
+        return ExpressionWrapper(
+            F('ORD_QUANTITY') * F('ORD_PRICE'),
+            output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        )
+
+    def with_line_total(self):
+        return self.annotate(total_price=self.line_total())
+
+    def status_totals(self):
+        # One grouped query: {status: {'count': n, 'subtotal': amount}}
+        rows = (
+            self.order_by()
+            .values('status')
+            .annotate(count=Count('pk'), subtotal=Sum(self.line_total()))
+        )
+        return {row['status']: {'count': row['count'], 'subtotal': row['subtotal']} for row in rows}
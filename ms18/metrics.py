@@ -0,0 +1,117 @@
+import threading
+from bisect import bisect_left
+
+# In-process metrics in the Prometheus text format. Each worker process
+# keeps its own numbers; scrape every worker (or run one) to see them all.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, label_values, value):
+        # [count per bucket (last is +Inf), sum]
+        counts, total = self.values.get(label_values, ([0] * (len(self.buckets) + 1), 0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.values[label_values] = (counts, total + value)
+
+    def samples(self):
+        for label_values, (counts, total) in sorted(self.values.items()):
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': str(bound)}, cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def counter(self, name, help_text, labels):
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels, buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                for name, labels, value in metric.samples():
+                    label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                    lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    'ms18_requests_total', 'Requests handled, by URL name, method and status code.', ('view', 'method', 'status'),
+)
+request_duration = registry.histogram(
+    'ms18_request_duration_seconds', 'Wall time from the request reaching Django to the response leaving the view.',
+    ('view', 'method'),
+)
+request_db_duration = registry.histogram(
+    'ms18_request_db_seconds', 'Time spent in database queries per request.', ('view',),
+)
+request_queries = registry.histogram(
+    'ms18_request_queries', 'Database queries per request.', ('view',), buckets=QUERY_BUCKETS,
+)
+duplicate_queries_total = registry.counter(
+    'ms18_duplicate_queries_total', 'Queries whose fingerprint had already run in the same request.', ('view',),
+)
+
+
+def observe_request(view, method, status, duration, db_duration, queries, duplicates):
+    with registry.lock:
+        requests_total.inc((view, method, str(status)))
+        request_duration.observe((view, method), duration)
+        request_db_duration.observe((view,), db_duration)
+        request_queries.observe((view,), queries)
+        if duplicates:
+            duplicate_queries_total.inc((view,), duplicates)
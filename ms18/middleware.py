@@ -0,0 +1,164 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .metrics import observe_request
+from . import routers
+
+logger = logging.getLogger('ms18.performance')
+
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Placeholder lists such as IN (%s, %s, %s), and runs of them such as the
+# VALUES rows of a bulk insert, collapse to one so that the same query with a
+# different number of ids has the same fingerprint.
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_LIST_RUN = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    sql = _LIST_RUN.sub('(...)', _PLACEHOLDER_LIST.sub('(...)', sql))
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    # connection.execute_wrapper() hook: times every query run while the
+    # request is being handled and counts repeated fingerprints.
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        # {fingerprint: times run} for queries that ran more than once
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class PerformanceMiddleware:
+    # Per request: wall time, query count, time in the database and the
+    # fingerprints of queries that ran more than once (usually an N+1).
+    # Reported as a Server-Timing header (staff, or everyone with
+    # PERFORMANCE_SERVER_TIMING), one JSON log line on ms18.performance and
+    # the per-URL-name histograms behind /metrics/. Streaming responses are
+    # timed up to the point the view returns them.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def recording(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        self.report(request, response, recorder, duration, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        # Async views run their queries in the request's worker thread,
+        # which has its own connections; the wrappers go on those
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with await sync_to_async(self.recording)(recorder):
+            response = await self.get_response(request)
+        duration = time.perf_counter() - start
+        user = await request.auser() if hasattr(request, 'auser') else None
+        self.report(request, response, recorder, duration, user)
+        return response
+
+    def report(self, request, response, recorder, duration, user):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        duplicates = recorder.duplicates()
+        repeated = sum(duplicates.values()) - len(duplicates)
+
+        observe_request(view, method, response.status_code, duration, recorder.duration, recorder.count, repeated)
+
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', settings.DEBUG) or (user is not None and user.is_staff):
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={duration * 1000:.1f}',
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+                f'app;dur={(duration - recorder.duration) * 1000:.1f}',
+            ])
+
+        slow = duration * 1000 >= getattr(settings, 'PERFORMANCE_SLOW_REQUEST_MS', 500)
+        chatty = max(duplicates.values(), default=0) >= getattr(settings, 'PERFORMANCE_DUPLICATE_QUERY_WARNING', 10)
+        level = logging.WARNING if slow or chatty else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'view': view,
+                'method': method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'db_ms': round(recorder.duration * 1000, 2),
+                'queries': recorder.count,
+                'duplicate_queries': repeated,
+                'duplicates': sorted(duplicates.items(), key=lambda item: -item[1])[:5],
+            }))
+
+
+class ReplicaPinningMiddleware:
+    # Read-your-writes with a lagging replica: after a POST (or any other
+    # unsafe method) the client gets a short-lived cookie, and its requests
+    # read from the primary until it expires (REPLICA_LAG_SECONDS).
+    cookie_name = 'ms18_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.routing_scope(self.pinned(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with routers.routing_scope(self.pinned(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    def pinned(self, request):
+        return request.method not in routers.SAFE_METHODS or self.cookie_name in request.COOKIES
+
+    def pin(self, request, response):
+        if request.method not in routers.SAFE_METHODS and routers.replica_alias():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=getattr(settings, 'REPLICA_LAG_SECONDS', 5), httponly=True, samesite='Lax',
+            )
+        return response
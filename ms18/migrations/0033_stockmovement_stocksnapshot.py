@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0032_product_supplier_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('MOVE_ID', models.BigAutoField(primary_key=True, serialize=False)),
+                ('MOVE_QUANTITY', models.IntegerField()),
+                ('MOVE_REASON', models.CharField(choices=[('Order', 'Order'), ('Requisition', 'Requisition'), ('Adjustment', 'Adjustment'), ('Opening', 'Opening')], max_length=20)),
+                ('MOVE_REFERENCE', models.IntegerField(blank=True, null=True)),
+                ('MOVE_DATE', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ms18.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'MOVE_DATE'], name='movement_product_date_idx'), models.Index(fields=['MOVE_DATE'], name='movement_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('SNAP_ID', models.BigAutoField(primary_key=True, serialize=False)),
+                ('SNAP_QUANTITY', models.IntegerField()),
+                ('SNAP_DATE', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ms18.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-SNAP_DATE'], name='snapshot_product_date_idx'), models.Index(fields=['SNAP_DATE'], name='snapshot_date_idx')],
+            },
+        ),
+    ]
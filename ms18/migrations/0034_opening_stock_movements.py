@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def record_opening_balances(apps, schema_editor):
+    # Seed the ledger with each product's current quantity so that replaying
+    # movements reproduces PROD_QUANTITY.
+    Product = apps.get_model('ms18', 'Product')
+    StockMovement = apps.get_model('ms18', 'StockMovement')
+    now = timezone.now()
+    batch = []
+    for product_id, quantity in Product.objects.exclude(PROD_QUANTITY=0).values_list('pk', 'PROD_QUANTITY').iterator(chunk_size=2000):
+        batch.append(StockMovement(product_id=product_id, MOVE_QUANTITY=quantity, MOVE_REASON='Opening', MOVE_DATE=now))
+        if len(batch) >= 2000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+def remove_opening_balances(apps, schema_editor):
+    StockMovement = apps.get_model('ms18', 'StockMovement')
+    StockMovement.objects.filter(MOVE_REASON='Opening').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0033_stockmovement_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_balances, remove_opening_balances),
+    ]
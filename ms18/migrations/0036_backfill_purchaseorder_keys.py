@@ -0,0 +1,53 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_keys(apps, schema_editor):
+    # Walk the table in primary-key batches, each committed on its own, so
+    # the backfill never holds long locks on a live table.
+    PurchaseOrder = apps.get_model('ms18', 'PurchaseOrder')
+    Product = apps.get_model('ms18', 'Product')
+    User = apps.get_model('auth', 'User')
+
+    last_id = 0
+    while True:
+        batch = list(
+            PurchaseOrder.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'ORD_NAME', 'ORD_EMPLOYEE', 'product_id', 'employee_id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        names = {order.ORD_NAME for order in batch if order.product_id is None}
+        usernames = {order.ORD_EMPLOYEE for order in batch if order.employee_id is None}
+        products = {}
+        # Product names are not unique; keep the oldest match, as the old
+        # Product.objects.get(PROD_NAME=...) lookups effectively expected.
+        for pk, name in Product.objects.filter(PROD_NAME__in=names).order_by('-pk').values_list('pk', 'PROD_NAME'):
+            products[name] = pk
+        users = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+
+        changed = []
+        for order in batch:
+            product_id = order.product_id or products.get(order.ORD_NAME)
+            employee_id = order.employee_id or users.get(order.ORD_EMPLOYEE)
+            if (product_id, employee_id) != (order.product_id, order.employee_id):
+                order.product_id = product_id
+                order.employee_id = employee_id
+                changed.append(order)
+        PurchaseOrder.objects.bulk_update(changed, ['product', 'employee'])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('ms18', '0035_purchaseorder_product_employee'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0036_backfill_purchaseorder_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['supplier', 'PROD_NAME'], name='product_supplier_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['employee', 'id'], name='order_employee_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'ORD_DATE_POSTED'], name='order_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['id'], name='order_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['REQ_STATUS', '-REQ_ID'], name='requisition_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(condition=models.Q(('REQ_STATUS', 'Pending')), fields=['-REQ_ID'], name='requisition_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0037_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='PROD_UPDATED_AT',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='ORD_UPDATED_AT',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='requestedproduct',
+            name='REQUESTED_PRODUCT_UPDATED_AT',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='requisition',
+            name='REQ_UPDATED_AT',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='SUPPLIER_UPDATED_AT',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['PROD_UPDATED_AT'], name='product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['ORD_UPDATED_AT'], name='order_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestedproduct',
+            index=models.Index(fields=['REQUESTED_PRODUCT_UPDATED_AT'], name='requested_product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisition',
+            index=models.Index(fields=['REQ_UPDATED_AT'], name='requisition_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['SUPPLIER_UPDATED_AT'], name='supplier_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0038_updated_at_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='PROD_SKU',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='SUPPLIER_CODE',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from ms18.search import get_backend
+
+    backend = get_backend(schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        backend.install(cursor)
+        backend.index(cursor)
+
+
+def uninstall(apps, schema_editor):
+    from ms18.search import get_backend
+
+    with schema_editor.connection.cursor() as cursor:
+        get_backend(schema_editor.connection).uninstall(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0039_catalog_import_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0040_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='PROD_REORDER_POINT',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='PROD_REORDER_QUANTITY',
+            field=models.PositiveIntegerField(default=20),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='PROD_STOCK_BAND',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(PROD_QUANTITY__lt=10, then=models.Value('verylow')), models.When(PROD_QUANTITY__lt=20, then=models.Value('low')), models.When(PROD_QUANTITY__lte=30, then=models.Value('high')), default=models.Value('veryhigh')), output_field=models.CharField(choices=[('verylow', 'Very Low'), ('low', 'Low'), ('high', 'High'), ('veryhigh', 'Very High')], max_length=10)),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='PROD_NEEDS_REORDER',
+            field=models.GeneratedField(db_persist=True, expression=models.ExpressionWrapper(models.Q(('PROD_QUANTITY__lt', models.F('PROD_REORDER_POINT'))), output_field=models.BooleanField()), output_field=models.BooleanField()),
+        ),
+        migrations.AddField(
+            model_name='requisition',
+            name='REQ_REORDER',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='requisition',
+            name='REQ_STATUS',
+            field=models.CharField(choices=[('Approved', 'Approved'), ('Pending', 'Pending'), ('Rejected', 'Rejected'), ('Draft', 'Draft')], default='Pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['PROD_STOCK_BAND', 'id'], name='product_stock_band_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('PROD_NEEDS_REORDER', True)), fields=['supplier', 'id'], name='product_reorder_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Case-insensitive prefix filters (istartswith) on the inventory page. The
+# plain name indexes cannot serve them: PostgreSQL compares
+# UPPER("col"::text) LIKE 'ABC%', which needs an index on that expression
+# with text_pattern_ops, and SQLite only uses an index for LIKE when it has
+# the NOCASE collation. Neither can be declared portably in Meta.indexes.
+PREFIX_INDEXES = [
+    ('product_name_prefix_idx', 'ms18_product', 'PROD_NAME'),
+    ('supplier_name_prefix_idx', 'ms18_supplier', 'SUPPLIER_NAME'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    for name, table, column in PREFIX_INDEXES:
+        if vendor == 'postgresql':
+            expression = f'UPPER({quote(column)}::text) text_pattern_ops'
+        elif vendor == 'sqlite':
+            expression = f'{quote(column)} COLLATE NOCASE'
+        else:
+            continue
+        schema_editor.execute(f'CREATE INDEX {quote(name)} ON {quote(table)} ({expression})')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        for name, _, _ in PREFIX_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0041_reorder_levels_stock_band'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
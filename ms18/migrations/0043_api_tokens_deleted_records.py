@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0042_name_prefix_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('TOKEN_DIGEST', models.CharField(max_length=64, unique=True)),
+                ('TOKEN_NAME', models.CharField(blank=True, max_length=100)),
+                ('TOKEN_CREATED_AT', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('DEL_ID', models.BigAutoField(primary_key=True, serialize=False)),
+                ('DEL_MODEL', models.CharField(max_length=50)),
+                ('DEL_OBJECT_ID', models.BigIntegerField()),
+                ('DEL_DATE', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['DEL_MODEL', 'DEL_DATE'], name='deleted_model_date_idx'), models.Index(fields=['DEL_DATE'], name='deleted_date_idx')],
+            },
+        ),
+    ]
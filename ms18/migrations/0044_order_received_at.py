@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def backfill_received_at(apps, schema_editor):
+    # Older approved orders only have ORD_UPDATED_AT, the closest record of
+    # when they were approved
+    PurchaseOrder = apps.get_model('ms18', 'PurchaseOrder')
+    PurchaseOrder.objects.filter(status='Approved').update(ORD_RECEIVED_AT=models.F('ORD_UPDATED_AT'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0043_api_tokens_deleted_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='ORD_RECEIVED_AT',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_received_at, migrations.RunPython.noop),
+    ]
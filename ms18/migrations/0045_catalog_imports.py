@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ms18', '0044_order_received_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogImport',
+            fields=[
+                ('IMPORT_ID', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('IMPORT_NAME', models.CharField(max_length=255)),
+                ('IMPORT_STATE', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('IMPORT_PROGRESS', models.JSONField(default=dict)),
+                ('IMPORT_ERROR', models.TextField(blank=True)),
+                ('IMPORT_CREATED_AT', models.DateTimeField(default=django.utils.timezone.now)),
+                ('IMPORT_UPDATED_AT', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,18 +1,33 @@
+import hashlib
+import secrets
+
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
-from PIL import Image
+from .images import ThumbnailedImageMixin
+from .managers import ProductManager, RequisitionManager, RequestedProductManager, PurchaseOrderQuerySet
 
 class Supplier(models.Model):
     SUPPLIER_ID = models.AutoField(primary_key=True)
     SUPPLIER_NAME = models.CharField(max_length=100)
     SUPPLIER_ADDRESS = models.CharField(max_length=200)
     SUPPLIER_PHONE = models.CharField(max_length=12)
+    # Supplier's own reference; catalog imports match existing rows on it
+    SUPPLIER_CODE = models.CharField(max_length=50, unique=True, null=True, blank=True)
+    SUPPLIER_UPDATED_AT = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The name prefix filter uses supplier_name_prefix_idx (migration 0042)
+            models.Index(fields=['SUPPLIER_NAME'], name='supplier_name_idx'),
+            models.Index(fields=['SUPPLIER_UPDATED_AT'], name='supplier_updated_idx'),
+        ]
+
     def __str__(self):
         return self.SUPPLIER_NAME
     
-class Product(models.Model):
+class Product(ThumbnailedImageMixin, models.Model):
     PROD_NAME = models.CharField(max_length=100)
     PROD_DESCRIPTION = models.CharField(max_length=200)
     #PROD_DATE_POSTED = models.DateTimeField(default = timezone.now)
@@ -20,10 +35,71 @@ class Product(models.Model):
     PROD_QUANTITY = models.IntegerField(default=0)
     PROD_PRICE = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, null=True, blank=True)
+    PROD_SKU = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    PROD_UPDATED_AT = models.DateTimeField(auto_now=True)
 
+    objects = ProductManager()
+    thumbnail_fields = ('PROD_IMAGE',)
+
+    # Reorder levels, recomputed from requisition and order history by
+    # ms18.reorders; products below their reorder point get a draft
+    # requisition to their supplier.
+    DEFAULT_REORDER_POINT = 10
+    DEFAULT_REORDER_QUANTITY = 20
+    PROD_REORDER_POINT = models.PositiveIntegerField(default=DEFAULT_REORDER_POINT)
+    PROD_REORDER_QUANTITY = models.PositiveIntegerField(default=DEFAULT_REORDER_QUANTITY)
+    # Stored rather than compared on the fly so the planner has statistics
+    # on how many products need reordering and can use product_reorder_idx.
+    PROD_NEEDS_REORDER = models.GeneratedField(
+        expression=models.ExpressionWrapper(
+            models.Q(PROD_QUANTITY__lt=models.F('PROD_REORDER_POINT')), output_field=models.BooleanField()
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+    # Supply Status bands shown on the inventory page
+    VERY_LOW = 'verylow'
+    LOW = 'low'
+    HIGH = 'high'
+    VERY_HIGH = 'veryhigh'
+    STOCK_BAND_CHOICES = [
+        (VERY_LOW, 'Very Low'),
+        (LOW, 'Low'),
+        (HIGH, 'High'),
+        (VERY_HIGH, 'Very High'),
+    ]
+    # Kept by the database from PROD_QUANTITY, so the band can be filtered
+    # on through an index instead of being worked out for every row shown.
+    PROD_STOCK_BAND = models.GeneratedField(
+        expression=models.Case(
+            models.When(PROD_QUANTITY__lt=10, then=models.Value(VERY_LOW)),
+            models.When(PROD_QUANTITY__lt=20, then=models.Value(LOW)),
+            models.When(PROD_QUANTITY__lte=30, then=models.Value(HIGH)),
+            default=models.Value(VERY_HIGH),
+        ),
+        output_field=models.CharField(max_length=10, choices=STOCK_BAND_CHOICES),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # The name prefix filter uses product_name_prefix_idx (migration 0042)
+            models.Index(fields=['PROD_NAME'], name='product_name_idx'),
+            models.Index(fields=['PROD_QUANTITY'], name='product_quantity_idx'),
+            models.Index(fields=['supplier', 'PROD_NAME'], name='product_supplier_name_idx'),
+            models.Index(fields=['PROD_UPDATED_AT'], name='product_updated_idx'),
+            models.Index(fields=['PROD_STOCK_BAND', 'id'], name='product_stock_band_idx'),
+            # Only products below their reorder point are in this index
+            models.Index(fields=['supplier', 'id'], condition=models.Q(PROD_NEEDS_REORDER=True), name='product_reorder_idx'),
+        ]
 
     def __str__(self):
         return self.PROD_NAME
+
+    @property
+    def stock_band_label(self):
+        return dict(self.STOCK_BAND_CHOICES)[self.PROD_STOCK_BAND]
     
     def save(self, *args, **kwargs):
         if self.PROD_PRICE is not None and self.PROD_PRICE < 0:
@@ -31,13 +107,6 @@ class Product(models.Model):
         if self.PROD_QUANTITY is not None and self.PROD_QUANTITY < 0:
             self.PROD_QUANTITY = abs(self.PROD_QUANTITY)
         super().save(*args, **kwargs)
-        
-        img = Image.open(self.PROD_IMAGE.path)
-        
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.PROD_IMAGE.path)
     
     def get_absolute_url(self):
         return reverse("product-detail", kwargs={"pk": self.pk})
@@ -50,6 +119,10 @@ class PurchaseOrder(models.Model):
     ORD_QUANTITY = models.IntegerField(default=0)
     ORD_PRICE = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  
     ORD_DESCRIPTION = models.CharField(max_length=200)
+    # ORD_NAME and ORD_EMPLOYEE keep the names as they were when the order
+    # was placed; lookups go through these keys.
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    employee = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     
     APPROVED = 'Approved'
     PENDING = 'Pending'
@@ -64,6 +137,21 @@ class PurchaseOrder(models.Model):
         choices=STATUS_CHOICES,
         default=PENDING,
     )
+    ORD_UPDATED_AT = models.DateTimeField(auto_now=True)
+    # When the order was approved and its stock received; ORD_UPDATED_AT
+    # moves on every later save, so lead times are measured from this
+    ORD_RECEIVED_AT = models.DateTimeField(null=True, blank=True)
+
+    objects = PurchaseOrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'id'], name='order_employee_id_idx'),
+            models.Index(fields=['status', 'ORD_DATE_POSTED'], name='order_status_date_idx'),
+            # The review queue only ever reads pending orders
+            models.Index(fields=['id'], condition=models.Q(status='Pending'), name='order_pending_idx'),
+            models.Index(fields=['ORD_UPDATED_AT'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return self.ORD_NAME 
@@ -87,30 +175,52 @@ class Requisition(models.Model):
     APPROVED = 'Approved'
     PENDING = 'Pending'
     REJECTED = 'Rejected'
+    DRAFT = 'Draft'
     STATUS_CHOICES = [
         (APPROVED, 'Approved'),
         (PENDING, 'Pending'),
         (REJECTED, 'Rejected'),
+        (DRAFT, 'Draft'),
     ]
+    OPEN_STATUSES = (DRAFT, PENDING)
     REQ_STATUS = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
         default=PENDING,
     )
+    # Raised by the reorder engine: approving it brings stock in instead of
+    # taking it out.
+    REQ_REORDER = models.BooleanField(default=False)
+    REQ_UPDATED_AT = models.DateTimeField(auto_now=True)
+
+    objects = RequisitionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['REQ_STATUS', '-REQ_ID'], name='requisition_status_id_idx'),
+            models.Index(fields=['-REQ_ID'], condition=models.Q(REQ_STATUS='Pending'), name='requisition_pending_idx'),
+            models.Index(fields=['REQ_UPDATED_AT'], name='requisition_updated_idx'),
+        ]
     
     def approve(self):
-        if self.REQ_STATUS == 'Pending':
-            # Update status to 'Approved'
-            self.REQ_STATUS = 'Approved'
-            self.save()
-            # Adjust product quantities or perform other necessary actions
+        return self._transition(self.APPROVED)
 
     def reject(self):
-        if self.REQ_STATUS == 'Pending':
-            # Update status to 'Rejected'
-            self.REQ_STATUS = 'Rejected'
-            self.save()
-            # Perform any additional cleanup or actions
+        return self._transition(self.REJECTED, from_statuses=self.OPEN_STATUSES)
+
+    def submit(self):
+        return self._transition(self.PENDING, from_statuses=[self.DRAFT])
+
+    def _transition(self, status, from_statuses=(PENDING,)):
+        # Only a pending requisition (or a draft, for reject and submit) can
+        # change status, checked in the UPDATE itself so two concurrent
+        # approvals cannot both succeed.
+        updated = Requisition.objects.filter(pk=self.pk, REQ_STATUS__in=from_statuses).update(
+            REQ_STATUS=status, REQ_UPDATED_AT=timezone.now()
+        )
+        if updated:
+            self.REQ_STATUS = status
+        return bool(updated)
 
 
 class RequestedProduct(models.Model):
@@ -119,10 +229,142 @@ class RequestedProduct(models.Model):
     REQUESTED_PRODUCT_QUANTITY = models.PositiveIntegerField(default=0)
     Product = models.ForeignKey(Product, on_delete=models.CASCADE)
     Requisition = models.ForeignKey(Requisition, on_delete=models.CASCADE, null=True, blank=True)
+    REQUESTED_PRODUCT_UPDATED_AT = models.DateTimeField(auto_now=True)
+
+    objects = RequestedProductManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['REQUESTED_PRODUCT_UPDATED_AT'], name='requested_product_updated_idx'),
+        ]
+
+
+class StockMovement(models.Model):
+    # Append-only ledger of every change to Product.PROD_QUANTITY
+    ORDER = 'Order'
+    REQUISITION = 'Requisition'
+    ADJUSTMENT = 'Adjustment'
+    OPENING = 'Opening'
+    REASON_CHOICES = [
+        (ORDER, 'Order'),
+        (REQUISITION, 'Requisition'),
+        (ADJUSTMENT, 'Adjustment'),
+        (OPENING, 'Opening'),
+    ]
+    MOVE_ID = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    MOVE_QUANTITY = models.IntegerField()
+    MOVE_REASON = models.CharField(max_length=20, choices=REASON_CHOICES)
+    MOVE_REFERENCE = models.IntegerField(null=True, blank=True)
+    MOVE_DATE = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'MOVE_DATE'], name='movement_product_date_idx'),
+            models.Index(fields=['MOVE_DATE'], name='movement_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.MOVE_REASON} {self.MOVE_QUANTITY:+d} - Product: {self.product_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements cannot be changed once recorded.")
+        super().save(*args, **kwargs)
+
+
+class StockSnapshot(models.Model):
+    # On-hand quantity of a product as of SNAP_DATE, written by
+    # compact_stock_ledger so point-in-time lookups only replay the
+    # movements recorded after the latest snapshot.
+    SNAP_ID = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    SNAP_QUANTITY = models.IntegerField()
+    SNAP_DATE = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-SNAP_DATE'], name='snapshot_product_date_idx'),
+            models.Index(fields=['SNAP_DATE'], name='snapshot_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.SNAP_DATE}: {self.SNAP_QUANTITY}"
 
 
+class ApiToken(models.Model):
+    # Bearer token for API clients that do not use a browser session. Only
+    # a SHA-256 digest is stored; the token itself is shown once, by
+    # `manage.py create_api_token`. Delete the row to revoke it.
+    TOKEN_DIGEST = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    TOKEN_NAME = models.CharField(max_length=100, blank=True)
+    TOKEN_CREATED_AT = models.DateTimeField(default=timezone.now)
 
+    def __str__(self):
+        return f"{self.user} - {self.TOKEN_NAME or self.pk}"
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name=''):
+        # Returns (token, ApiToken); the token cannot be recovered later
+        token = secrets.token_urlsafe(32)
+        return token, cls.objects.create(TOKEN_DIGEST=cls.digest(token), user=user, TOKEN_NAME=name)
 
+    @classmethod
+    def user_for(cls, token):
+        api_token = cls.objects.select_related('user').filter(TOKEN_DIGEST=cls.digest(token)).first()
+        if api_token is None or not api_token.user.is_active:
+            return None
+        return api_token.user
 
 
+class DeletedRecord(models.Model):
+    # Rows deleted from the models the API exposes, so clients polling
+    # with ?since= learn about deletions as well as changes. Kept for
+    # DELETION_RETENTION_DAYS; see `manage.py prune_deleted_records`.
+    DELETION_RETENTION_DAYS = 30
+    DEL_ID = models.BigAutoField(primary_key=True)
+    DEL_MODEL = models.CharField(max_length=50)
+    DEL_OBJECT_ID = models.BigIntegerField()
+    DEL_DATE = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['DEL_MODEL', 'DEL_DATE'], name='deleted_model_date_idx'),
+            models.Index(fields=['DEL_DATE'], name='deleted_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.DEL_MODEL} {self.DEL_OBJECT_ID} @ {self.DEL_DATE}"
+
+
+class CatalogImport(models.Model):
+    # State of a background catalog import (see ms18.imports). Kept in the
+    # database rather than the cache so the admin status page sees the
+    # progress whichever web worker serves it and whichever process runs
+    # the import.
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    IMPORT_ID = models.CharField(max_length=32, primary_key=True)
+    IMPORT_NAME = models.CharField(max_length=255)
+    IMPORT_STATE = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED)
+    # Counts and errors as import_catalog() reports them
+    IMPORT_PROGRESS = models.JSONField(default=dict)
+    IMPORT_ERROR = models.TextField(blank=True)
+    IMPORT_CREATED_AT = models.DateTimeField(default=timezone.now)
+    IMPORT_UPDATED_AT = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.IMPORT_NAME} ({self.IMPORT_STATE})"
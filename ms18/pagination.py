@@ -0,0 +1,72 @@
+from django.http import QueryDict
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, params):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _querystring(self, key, value):
+        params = self.params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[key] = value
+        return params.urlencode()
+
+    def next_querystring(self):
+        return self._querystring('after', self.next_cursor)
+
+    def previous_querystring(self):
+        return self._querystring('before', self.previous_cursor)
+
+
+def keyset_paginate(queryset, params, page_size, key='pk', descending=False):
+    # Seek on an indexed key instead of OFFSET so every page costs the same
+    # no matter how deep the user has scrolled. Only page_size + 1 rows are
+    # fetched; the extra row tells us whether another page exists.
+    if params is None:
+        params = QueryDict()
+    after = _parse_cursor(params.get('after'))
+    before = _parse_cursor(params.get('before'))
+
+    forward_lookup = f'{key}__lt' if descending else f'{key}__gt'
+    backward_lookup = f'{key}__gt' if descending else f'{key}__lt'
+    forward_order = f'-{key}' if descending else key
+    backward_order = key if descending else f'-{key}'
+
+    if before is not None:
+        rows = list(queryset.filter(**{backward_lookup: before}).order_by(backward_order)[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        has_next = True
+    else:
+        if after is not None:
+            queryset = queryset.filter(**{forward_lookup: after})
+        rows = list(queryset.order_by(forward_order)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None
+
+    attname = queryset.model._meta.pk.attname if key == 'pk' else key
+    next_cursor = getattr(rows[-1], attname) if rows else None
+    previous_cursor = getattr(rows[0], attname) if rows else None
+    return KeysetPage(rows, has_next and bool(rows), has_previous and bool(rows),
+                      next_cursor, previous_cursor, params)
+
+
+def _parse_cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,138 @@
+import csv
+from decimal import Decimal
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import PurchaseOrder
+
+RECEIPT_CHUNK_SIZE = 2000
+# Pieces of a receipt produced per trip to the worker thread by areceipt()
+RECEIPT_THREAD_BATCH = 500
+
+
+def receipt_orders(user):
+    # Rows are read in chunks through a server-side cursor where the backend
+    # supports it, so only one chunk is held in memory at a time.
+    return (
+        PurchaseOrder.objects.filter(employee=user)
+        .order_by('id')
+        .only('id', 'ORD_NAME', 'ORD_QUANTITY', 'ORD_PRICE', 'status')
+        .iterator(chunk_size=RECEIPT_CHUNK_SIZE)
+    )
+
+
+def with_running_total(orders):
+    running_total = Decimal('0.00')
+    for order in orders:
+        total_price = order.ORD_QUANTITY * order.ORD_PRICE
+        running_total += total_price
+        yield order, total_price, running_total
+
+
+def receipt_lines(user, currency='₱'):
+    yield f"Orders from {user.username}"
+    yield ""
+    overall_total = Decimal('0.00')
+    for order, total_price, overall_total in with_running_total(receipt_orders(user)):
+        yield f"Order {order.id}:"
+        yield f"Product: {order.ORD_NAME}"
+        yield f"Quantity: {order.ORD_QUANTITY}"
+        yield f"Unit Price: {currency}{order.ORD_PRICE}"
+        yield f"Status: {order.status}"
+        yield f"Running Total: {currency}{overall_total}"
+        yield ""
+    yield f"Overall Total: {currency}{overall_total}"
+
+
+def text_receipt(user):
+    for line in receipt_lines(user):
+        yield f"{line}\n"
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_receipt(user):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['order_id', 'product', 'quantity', 'unit_price', 'total_price', 'status', 'running_total'])
+    for order, total_price, running_total in with_running_total(receipt_orders(user)):
+        yield writer.writerow([
+            order.id, order.ORD_NAME, order.ORD_QUANTITY, order.ORD_PRICE, total_price, order.status, running_total,
+        ])
+
+
+def pdf_receipt(user, lines_per_page=50):
+    # Minimal PDF 1.4 writer: each page is emitted as soon as it is full.
+    # Only object offsets and page numbers are kept until the trailer.
+    offsets = {}
+    position = 0
+
+    def emit(number, body):
+        nonlocal position
+        data = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        offsets[number] = position
+        position += len(data)
+        return data
+
+    def page_objects(number, lines):
+        text = [b"BT /F1 10 Tf 14 TL 40 800 Td"]
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            text.append(b"(" + escaped.encode('latin-1', 'replace') + b") Tj T*")
+        text.append(b"ET")
+        stream = b"\n".join(text)
+        yield emit(number, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        yield emit(number + 1, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % number
+        ))
+
+    header = b"%PDF-1.4\n"
+    position = len(header)
+    yield header
+    yield emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    yield emit(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    pages = []
+    number = 4
+    lines = []
+    for line in receipt_lines(user, currency='PHP '):
+        lines.append(line)
+        if len(lines) == lines_per_page:
+            yield from page_objects(number, lines)
+            pages.append(number + 1)
+            number += 2
+            lines = []
+    if lines or not pages:
+        yield from page_objects(number, lines)
+        pages.append(number + 1)
+        number += 2
+
+    kids = b" ".join(b"%d 0 R" % page for page in pages)
+    yield emit(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(pages))
+
+    xref = [b"xref\n0 %d\n" % number, b"0000000000 65535 f \n"]
+    xref += [b"%010d 00000 n \n" % offsets[n] for n in range(1, number)]
+    yield b"".join(xref)
+    yield b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, position)
+
+
+RECEIPT_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', text_receipt),
+    'csv': ('text/csv; charset=utf-8', csv_receipt),
+    'pdf': ('application/pdf', pdf_receipt),
+}
+
+
+async def areceipt(receipt, user, batch_size=RECEIPT_THREAD_BATCH):
+    # A receipt for async views. The generators above read the database as
+    # they go, so batches of their output are produced in the ORM's worker
+    # thread and the event loop is free while the query runs.
+    chunks = receipt(user)
+    take = sync_to_async(lambda: list(islice(chunks, batch_size)))
+    while batch := await take():
+        for chunk in batch:
+            yield chunk
@@ -0,0 +1,140 @@
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, DurationField, Exists, ExpressionWrapper, F, OuterRef, Sum
+from django.utils import timezone
+
+from .models import Product, PurchaseOrder, Requisition, RequestedProduct
+from .services import BULK_BATCH_SIZE
+
+# Reorder levels come from the last HISTORY_DAYS of activity:
+#   daily demand   = approved (non-reorder) requisition quantities / HISTORY_DAYS
+#   lead time      = average days from an order being placed to it being
+#                    approved (received), DEFAULT_LEAD_DAYS without orders
+#   reorder point  = daily demand * lead time * SAFETY_FACTOR
+#   reorder amount = the larger of the usual order size and REVIEW_DAYS of
+#                    demand
+# never below the model defaults.
+HISTORY_DAYS = 90
+DEFAULT_LEAD_DAYS = 7
+SAFETY_FACTOR = 1.5
+REVIEW_DAYS = 30
+
+
+def demand_by_product(since):
+    return dict(
+        RequestedProduct.objects.select_related(None)
+        .filter(
+            Requisition__REQ_STATUS=Requisition.APPROVED,
+            Requisition__REQ_REORDER=False,
+            Requisition__REQ_DATE_CREATEDAT__gte=since,
+        )
+        .values('Product')
+        .annotate(total=Sum('REQUESTED_PRODUCT_QUANTITY'))
+        .order_by()
+        .values_list('Product', 'total')
+    )
+
+
+def supply_by_product(since):
+    # {product_id: (average lead time, average order quantity)}
+    lead_time = ExpressionWrapper(F('ORD_RECEIVED_AT') - F('ORD_DATE_POSTED'), output_field=DurationField())
+    rows = (
+        PurchaseOrder.objects
+        .filter(
+            status=PurchaseOrder.APPROVED, ORD_DATE_POSTED__gte=since, product__isnull=False,
+            ORD_RECEIVED_AT__isnull=False,
+        )
+        .values('product')
+        .annotate(lead_time=Avg(lead_time), quantity=Avg('ORD_QUANTITY'))
+        .order_by()
+        .values_list('product', 'lead_time', 'quantity')
+    )
+    return {product_id: (lead_time, quantity) for product_id, lead_time, quantity in rows}
+
+
+def reorder_levels(demand, supply):
+    # {product_id: (reorder point, reorder quantity)} for products with history
+    levels = {}
+    for product_id in demand.keys() | supply.keys():
+        daily_demand = demand.get(product_id, 0) / HISTORY_DAYS
+        lead_time, order_quantity = supply.get(product_id, (None, None))
+        lead_days = lead_time / timedelta(days=1) if lead_time is not None else DEFAULT_LEAD_DAYS
+        levels[product_id] = (
+            max(Product.DEFAULT_REORDER_POINT, math.ceil(daily_demand * lead_days * SAFETY_FACTOR)),
+            max(Product.DEFAULT_REORDER_QUANTITY, math.ceil(order_quantity or 0), math.ceil(daily_demand * REVIEW_DAYS)),
+        )
+    return levels
+
+
+def update_reorder_levels(now=None):
+    # Recompute every product's reorder point and quantity; only rows whose
+    # levels change are written. Returns the number of products updated.
+    now = now or timezone.now()
+    since = now - timedelta(days=HISTORY_DAYS)
+    levels = reorder_levels(demand_by_product(since), supply_by_product(since))
+    defaults = (Product.DEFAULT_REORDER_POINT, Product.DEFAULT_REORDER_QUANTITY)
+
+    changed = []
+    with transaction.atomic():
+        current = (
+            Product.objects.select_related(None).order_by()
+            .values_list('pk', 'PROD_REORDER_POINT', 'PROD_REORDER_QUANTITY')
+            .iterator(chunk_size=BULK_BATCH_SIZE * 4)
+        )
+        for pk, point, quantity in current:
+            new_point, new_quantity = levels.get(pk, defaults)
+            if (new_point, new_quantity) != (point, quantity):
+                changed.append(Product(pk=pk, PROD_REORDER_POINT=new_point, PROD_REORDER_QUANTITY=new_quantity, PROD_UPDATED_AT=now))
+        Product.objects.bulk_update(
+            changed, ['PROD_REORDER_POINT', 'PROD_REORDER_QUANTITY', 'PROD_UPDATED_AT'], batch_size=BULK_BATCH_SIZE
+        )
+    return len(changed)
+
+
+def reorder_candidates():
+    # Products below their reorder point that have a supplier and no open
+    # reorder requisition yet; served from product_reorder_idx.
+    open_reorders = RequestedProduct.objects.filter(
+        Product=OuterRef('pk'), Requisition__REQ_REORDER=True, Requisition__REQ_STATUS__in=Requisition.OPEN_STATUSES,
+    )
+    return (
+        Product.objects.select_related(None)
+        .filter(PROD_NEEDS_REORDER=True, supplier__isnull=False)
+        .exclude(Exists(open_reorders))
+        .order_by('supplier', 'id')
+    )
+
+
+def create_reorder_requisitions():
+    # One draft requisition per supplier for everything below its reorder
+    # point, each line ordering the product back up to reorder point plus
+    # reorder quantity. Returns the new requisitions.
+    with transaction.atomic():
+        rows = reorder_candidates().values_list(
+            'pk', 'PROD_NAME', 'supplier_id', 'PROD_QUANTITY', 'PROD_REORDER_POINT', 'PROD_REORDER_QUANTITY'
+        )
+        by_supplier = {}
+        for pk, name, supplier_id, quantity, point, reorder_quantity in rows:
+            by_supplier.setdefault(supplier_id, []).append((pk, name, point + reorder_quantity - quantity))
+        if not by_supplier:
+            return []
+
+        now = timezone.now()
+        requisitions = Requisition.objects.bulk_create([
+            Requisition(supplier_id=supplier_id, REQ_STATUS=Requisition.DRAFT, REQ_REORDER=True, REQ_DATE_CREATEDAT=now)
+            for supplier_id in by_supplier
+        ], batch_size=BULK_BATCH_SIZE)
+        RequestedProduct.objects.bulk_create([
+            RequestedProduct(REQUESTED_PRODUCT_NAME=name, REQUESTED_PRODUCT_QUANTITY=quantity, Product_id=pk, Requisition=requisition)
+            for requisition, lines in zip(requisitions, by_supplier.values())
+            for pk, name, quantity in lines
+        ], batch_size=BULK_BATCH_SIZE)
+    return requisitions
+
+
+def run_reorders():
+    # Scheduled entry point (manage.py generate_reorders)
+    updated = update_reorder_levels()
+    return updated, create_reorder_requisitions()
@@ -0,0 +1,130 @@
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Reads go to the read replica only inside replica_reads(): GET requests to
+# listing and reporting views (@read_from_replica or ReplicaReadMixin), which
+# do not write. Never inside a transaction on the primary, nor for a client
+# pinned to the primary by ReplicaPinningMiddleware after a POST. Everything
+# else, and every write, uses the primary. Without a REPLICA_DATABASE alias
+# in DATABASES all reads use the primary.
+_replica = contextvars.ContextVar('ms18_replica_reads', default=False)
+_pinned = contextvars.ContextVar('ms18_pinned_to_primary', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in connections.settings else None
+
+
+@contextmanager
+def replica_reads():
+    token = _replica.set(True)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+@contextmanager
+def routing_scope(pinned):
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def primary_reads():
+    return routing_scope(True)
+
+
+def _on_replica(iterable, pinned):
+    # Streaming responses are read after the view (and the middleware) has
+    # returned, so each chunk is produced in the view's routing state again
+    iterator = iter(iterable)
+    while True:
+        with routing_scope(pinned), replica_reads():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+async def _aon_replica(iterable, pinned):
+    iterator = aiter(iterable)
+    while True:
+        with routing_scope(pinned), replica_reads():
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield chunk
+
+
+def _stream_on_replica(response):
+    if response.streaming:
+        stream = _aon_replica if response.is_async else _on_replica
+        response.streaming_content = stream(response.streaming_content, _pinned.get())
+    return response
+
+
+def read_from_replica(view):
+    # GET and HEAD requests to the view read from the replica; other
+    # methods (form posts, bulk actions) stay on the primary. Works for
+    # sync and async views; the ORM's async methods run in the context
+    # they were awaited from, so they are routed the same way.
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                response = await view(request, *args, **kwargs)
+            return _stream_on_replica(response)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            response = view(request, *args, **kwargs)
+            # Template responses (class-based views) run their queries
+            # while rendering, which would otherwise happen after this
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+        return _stream_on_replica(response)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        return read_from_replica(super().dispatch)(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and _replica.get() and not _pinned.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db != replica_alias()
@@ -0,0 +1,183 @@
+import re
+
+from django.db import connection, connections, router
+
+from .caching import cached
+from .models import Product
+
+TYPEAHEAD_LIMIT = 10
+MAX_TERMS = 8
+
+# Search rows for products: id, name, supplier name, description
+_PRODUCT_ROWS = '''
+    SELECT p."id", p."PROD_NAME", COALESCE(s."SUPPLIER_NAME", ''), p."PROD_DESCRIPTION"
+    FROM "ms18_product" p LEFT JOIN "ms18_supplier" s ON s."SUPPLIER_ID" = p."supplier_id"
+'''
+
+
+def search_terms(query):
+    # Words of the query, lower-cased; each is matched as a prefix.
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _product_filter(product_ids, supplier_ids):
+    # WHERE clause over _PRODUCT_ROWS for the products to (re)index
+    if product_ids is not None:
+        return f'WHERE p."id" IN ({_placeholders(product_ids)})', list(product_ids)
+    if supplier_ids is not None:
+        return f'WHERE p."supplier_id" IN ({_placeholders(supplier_ids)})', list(supplier_ids)
+    return '', []
+
+
+class PostgresSearch:
+    # ms18_product_search holds a weighted tsvector per product (name A,
+    # supplier B, description C) behind a GIN index. Every term is matched
+    # as a prefix. With pg_trgm installed, names within typo distance of the
+    # query match as well.
+    trigram = None
+
+    def install(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS "ms18_product_search" (
+                "product_id" bigint PRIMARY KEY,
+                "name" varchar(100) NOT NULL,
+                "supplier" varchar(100) NOT NULL,
+                "document" tsvector NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS "product_search_document_idx" ON "ms18_product_search" USING gin ("document")')
+        if self.has_trigram(cursor):
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS "product_search_name_trgm_idx" '
+                'ON "ms18_product_search" USING gin (lower("name") gin_trgm_ops)'
+            )
+
+    def uninstall(self, cursor):
+        cursor.execute('DROP TABLE IF EXISTS "ms18_product_search"')
+
+    def has_trigram(self, cursor):
+        if self.trigram is None:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            self.trigram = cursor.fetchone() is not None
+        return self.trigram
+
+    def index(self, cursor, product_ids=None, supplier_ids=None):
+        where, params = _product_filter(product_ids, supplier_ids)
+        cursor.execute(f'''
+            INSERT INTO "ms18_product_search" ("product_id", "name", "supplier", "document")
+            SELECT id, name, supplier,
+                   setweight(to_tsvector('simple', name), 'A')
+                   || setweight(to_tsvector('simple', supplier), 'B')
+                   || setweight(to_tsvector('simple', description), 'C')
+            FROM ({_PRODUCT_ROWS} {where}) AS rows (id, name, supplier, description)
+            ON CONFLICT ("product_id") DO UPDATE
+            SET "name" = EXCLUDED."name", "supplier" = EXCLUDED."supplier", "document" = EXCLUDED."document"
+        ''', params)
+
+    def remove(self, cursor, product_ids):
+        cursor.execute(f'DELETE FROM "ms18_product_search" WHERE "product_id" IN ({_placeholders(product_ids)})', list(product_ids))
+
+    def search(self, cursor, terms, limit):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        if self.has_trigram(cursor):
+            phrase = ' '.join(terms)
+            cursor.execute('''
+                SELECT "product_id", "name", "supplier" FROM "ms18_product_search"
+                WHERE "document" @@ to_tsquery('simple', %s) OR lower("name") %% %s
+                ORDER BY ts_rank("document", to_tsquery('simple', %s)) + similarity(lower("name"), %s) DESC, "name"
+                LIMIT %s
+            ''', [tsquery, phrase, tsquery, phrase, limit])
+        else:
+            cursor.execute('''
+                SELECT "product_id", "name", "supplier" FROM "ms18_product_search"
+                WHERE "document" @@ to_tsquery('simple', %s)
+                ORDER BY ts_rank("document", to_tsquery('simple', %s)) DESC, "name"
+                LIMIT %s
+            ''', [tsquery, tsquery, limit])
+        return cursor.fetchall()
+
+
+class SQLiteSearch:
+    # FTS5 table keyed by product id (rowid), with prefix indexes for two
+    # and three characters so short typeahead prefixes stay cheap. Ranked by
+    # bm25 with name weighted over supplier over description.
+    def install(self, cursor):
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS "ms18_product_search"
+            USING fts5("name", "supplier", "description", tokenize = 'unicode61', prefix = '2 3')
+        ''')
+
+    def uninstall(self, cursor):
+        cursor.execute('DROP TABLE IF EXISTS "ms18_product_search"')
+
+    def index(self, cursor, product_ids=None, supplier_ids=None):
+        where, params = _product_filter(product_ids, supplier_ids)
+        if where:
+            cursor.execute(f'''
+                DELETE FROM "ms18_product_search"
+                WHERE "rowid" IN (SELECT p."id" FROM "ms18_product" p {where})
+            ''', params)
+        else:
+            cursor.execute('DELETE FROM "ms18_product_search"')
+        cursor.execute(f'''
+            INSERT INTO "ms18_product_search" ("rowid", "name", "supplier", "description")
+            {_PRODUCT_ROWS} {where}
+        ''', params)
+
+    def remove(self, cursor, product_ids):
+        cursor.execute(f'DELETE FROM "ms18_product_search" WHERE "rowid" IN ({_placeholders(product_ids)})', list(product_ids))
+
+    def search(self, cursor, terms, limit):
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        cursor.execute('''
+            SELECT "rowid", "name", "supplier" FROM "ms18_product_search"
+            WHERE "ms18_product_search" MATCH %s
+            ORDER BY bm25("ms18_product_search", 10.0, 5.0, 1.0), "name"
+            LIMIT %s
+        ''', [match, limit])
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch(),
+    'sqlite': SQLiteSearch(),
+}
+
+
+def get_backend(conn=None):
+    return BACKENDS[(conn or connection).vendor]
+
+
+def index_products(product_ids=None, supplier_ids=None):
+    # Refresh the search rows for these products, or for every product of
+    # these suppliers; everything when neither is given.
+    if (product_ids is not None and not product_ids) or (supplier_ids is not None and not supplier_ids):
+        return
+    with connection.cursor() as cursor:
+        get_backend().index(cursor, product_ids, supplier_ids)
+
+
+def remove_products(product_ids):
+    with connection.cursor() as cursor:
+        get_backend().remove(cursor, product_ids)
+
+
+def search_products(query, limit=TYPEAHEAD_LIMIT):
+    # [(product id, name, supplier name)], best match first. Raw SQL skips
+    # the router, so the database is picked the way a Product read would be
+    # (the replica inside replica_reads()); the index is only written on the
+    # primary.
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    def run():
+        conn = connections[router.db_for_read(Product)]
+        with conn.cursor() as cursor:
+            return [tuple(row) for row in get_backend(conn).search(cursor, terms, limit)]
+
+    return cached('search', [' '.join(terms), limit], run)
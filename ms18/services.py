@@ -0,0 +1,389 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum, Case, When, Value, Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Product, PurchaseOrder, Cart, Requisition, RequestedProduct, StockMovement, StockSnapshot, DeletedRecord
+
+BULK_BATCH_SIZE = 500
+
+# Snapshots stop this far behind "now" so that movements from transactions
+# still in flight are not skipped by a compaction run.
+SNAPSHOT_GRACE = timedelta(minutes=1)
+
+
+class StockError(Exception):
+    pass
+
+
+def parse_line_quantities(data, prefix='quantity_'):
+    # Read the quantity_<product id> inputs from the order and requisition
+    # forms. Returns {product_id: quantity} for every positive line and a
+    # message for each line that could not be read.
+    quantities = {}
+    errors = []
+    for key, value in data.items():
+        if not key.startswith(prefix):
+            continue
+        product_id = key[len(prefix):]
+        try:
+            product_id = int(product_id)
+            quantity = int(value or 0)
+        except ValueError:
+            errors.append(f"Invalid quantity '{value}' for product with ID {product_id}.")
+            continue
+        if quantity < 0:
+            errors.append(f"Quantity for product with ID {product_id} cannot be negative.")
+        elif quantity > 0:
+            quantities[product_id] = quantity
+    return quantities, errors
+
+
+def fetch_products(product_ids):
+    products = (
+        Product.objects.select_related(None)
+        .only('id', 'PROD_NAME', 'PROD_DESCRIPTION', 'PROD_PRICE', 'supplier_id')
+        .in_bulk(product_ids)
+    )
+    errors = [f"Product with ID {product_id} does not exist." for product_id in product_ids if product_id not in products]
+    return products, errors
+
+
+def create_orders(user, quantities):
+    # One product fetch, one insert per table, all or nothing.
+    products, errors = fetch_products(list(quantities))
+    now = timezone.now()
+    lines = [(products[product_id], quantity) for product_id, quantity in quantities.items() if product_id in products]
+
+    with transaction.atomic():
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                ORD_EMPLOYEE=user.username,
+                ORD_DATE_POSTED=now,
+                ORD_NAME=product.PROD_NAME,
+                ORD_QUANTITY=quantity,
+                ORD_DESCRIPTION=product.PROD_DESCRIPTION,
+                ORD_PRICE=product.PROD_PRICE,
+                product=product,
+                employee=user,
+                status=PurchaseOrder.PENDING,
+            )
+            for product, quantity in lines
+        ], batch_size=BULK_BATCH_SIZE)
+        Cart.objects.bulk_create([
+            Cart(
+                CART_QUANTITY=quantity,
+                CART_DATE_ADDED=now,
+                user=user,
+                product=product,
+                PurchaseOrder=order,
+            )
+            for (product, quantity), order in zip(lines, orders)
+        ], batch_size=BULK_BATCH_SIZE)
+    return orders, errors
+
+
+def create_requisition(user, supplier, quantities):
+    # The requisition and all of its lines are written together; the lines
+    # carry their Requisition foreign key from the start so no second save
+    # is needed.
+    products, errors = fetch_products(list(quantities))
+    lines = [(products[product_id], quantity) for product_id, quantity in quantities.items() if product_id in products]
+    if not lines:
+        return None, [], errors
+
+    with transaction.atomic():
+        requisition = Requisition.objects.create(REQ_EMPLOYEE=user, supplier=supplier)
+        requested_products = RequestedProduct.objects.bulk_create([
+            RequestedProduct(
+                REQUESTED_PRODUCT_NAME=product.PROD_NAME,
+                REQUESTED_PRODUCT_QUANTITY=quantity,
+                Product=product,
+                Requisition=requisition,
+            )
+            for product, quantity in lines
+        ], batch_size=BULK_BATCH_SIZE)
+    return requisition, requested_products, errors
+
+
+def update_stock_quantities(deltas):
+    # {product_id: change} applied as a single UPDATE ... SET PROD_QUANTITY =
+    # PROD_QUANTITY + CASE ... so concurrent adjustments never overwrite
+    # each other the way product.PROD_QUANTITY += n; product.save() does.
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    change = Case(
+        *[When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+        default=Value(0),
+    )
+    updated = Product.objects.filter(pk__in=list(deltas)).update(
+        PROD_QUANTITY=F('PROD_QUANTITY') + change, PROD_UPDATED_AT=timezone.now()
+    )
+    # Queryset updates do not send post_save
+    bump_catalog_version()
+    return updated
+
+
+def apply_stock_deltas(deltas, reason, reference=None):
+    # Stock change plus the matching ledger entries
+    with transaction.atomic():
+        updated = update_stock_quantities(deltas)
+        record_movements(deltas, reason, reference)
+    return updated
+
+
+def record_movements(deltas, reason, reference=None):
+    now = timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, MOVE_QUANTITY=delta, MOVE_REASON=reason, MOVE_REFERENCE=reference, MOVE_DATE=now)
+        for product_id, delta in deltas.items() if delta
+    ], batch_size=BULK_BATCH_SIZE)
+
+
+def lock_product_quantity(product_id):
+    return (
+        Product.objects.select_related(None).select_for_update()
+        .filter(pk=product_id)
+        .values_list('PROD_QUANTITY', flat=True)
+        .first()
+    )
+
+
+def receive_order_stock(order):
+    if order.product_id is None:
+        raise StockError(f"Product {order.ORD_NAME} does not exist.")
+    apply_stock_deltas({order.product_id: order.ORD_QUANTITY}, StockMovement.ORDER, order.pk)
+
+
+def _lock_order(order_id):
+    return PurchaseOrder.objects.select_for_update().get(pk=order_id)
+
+
+def _set_order_status(order, status):
+    # The status guard in the WHERE clause makes the transition happen at
+    # most once even if two requests got past the row lock check.
+    now = timezone.now()
+    received_at = now if status == PurchaseOrder.APPROVED else None
+    updated = PurchaseOrder.objects.filter(pk=order.pk, status=PurchaseOrder.PENDING).update(
+        status=status, ORD_UPDATED_AT=now, ORD_RECEIVED_AT=received_at
+    )
+    if updated:
+        order.status = status
+        order.ORD_RECEIVED_AT = received_at
+    return bool(updated)
+
+
+def approve_order(order_id):
+    # Returns False when the order was already approved or rejected.
+    with transaction.atomic():
+        order = _lock_order(order_id)
+        if order.status != PurchaseOrder.PENDING or not _set_order_status(order, PurchaseOrder.APPROVED):
+            return False
+        receive_order_stock(order)
+    return True
+
+
+def reject_order(order_id):
+    with transaction.atomic():
+        order = _lock_order(order_id)
+        if order.status != PurchaseOrder.PENDING:
+            return False
+        return _set_order_status(order, PurchaseOrder.REJECTED)
+
+
+def bulk_approve_orders(order_ids):
+    # Approve many pending orders in one transaction: one locking read, one
+    # status UPDATE, one stock UPDATE and one ledger insert regardless of how
+    # many orders are selected. Returns (approved ids, ids left pending
+    # because their product no longer exists).
+    with transaction.atomic():
+        rows = list(
+            PurchaseOrder.objects.select_for_update()
+            .filter(pk__in=order_ids, status=PurchaseOrder.PENDING)
+            .order_by('pk')
+            .values_list('pk', 'product_id', 'ORD_QUANTITY')
+        )
+        approved = [(pk, product_id, quantity) for pk, product_id, quantity in rows if product_id is not None]
+        skipped = [pk for pk, product_id, quantity in rows if product_id is None]
+        if not approved:
+            return [], skipped
+
+        now = timezone.now()
+        PurchaseOrder.objects.filter(
+            pk__in=[pk for pk, _, _ in approved], status=PurchaseOrder.PENDING,
+        ).update(status=PurchaseOrder.APPROVED, ORD_UPDATED_AT=now, ORD_RECEIVED_AT=now)
+
+        deltas = {}
+        for pk, product_id, quantity in approved:
+            deltas[product_id] = deltas.get(product_id, 0) + quantity
+        update_stock_quantities(deltas)
+
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=product_id, MOVE_QUANTITY=quantity, MOVE_REASON=StockMovement.ORDER, MOVE_REFERENCE=pk, MOVE_DATE=now)
+            for pk, product_id, quantity in approved if quantity
+        ], batch_size=BULK_BATCH_SIZE)
+    return [pk for pk, _, _ in approved], skipped
+
+
+def bulk_reject_orders(order_ids):
+    # A single conditional UPDATE; returns how many orders were rejected.
+    return PurchaseOrder.objects.filter(pk__in=order_ids, status=PurchaseOrder.PENDING).update(
+        status=PurchaseOrder.REJECTED, ORD_UPDATED_AT=timezone.now()
+    )
+
+
+def _lock_requisition(req_id):
+    # select_related(None): FOR UPDATE cannot lock the nullable side of the
+    # supplier/employee joins the default manager adds.
+    return Requisition.objects.select_related(None).select_for_update().get(pk=req_id)
+
+
+def approve_requisition(req_id):
+    # Returns False when the requisition was already approved or rejected.
+    if bulk_approve_requisitions([req_id]):
+        return True
+    if not Requisition.objects.filter(pk=req_id).exists():
+        raise Requisition.DoesNotExist(f"Requisition {req_id} does not exist.")
+    return False
+
+
+def bulk_approve_requisitions(req_ids):
+    # Approve many requisitions as one unit. The requested quantities are
+    # summed per product in one grouped query and taken off stock (or, for
+    # reorder requisitions, added to it) with one UPDATE ... CASE. If any
+    # product would go below zero nothing is changed and StockError is
+    # raised. Returns the approved ids.
+    with transaction.atomic():
+        pending = dict(
+            Requisition.objects.select_related(None).select_for_update()
+            .filter(pk__in=req_ids, REQ_STATUS=Requisition.PENDING)
+            .order_by('pk')
+            .values_list('pk', 'REQ_REORDER')
+        )
+        if not pending:
+            return []
+
+        lines = (
+            RequestedProduct.objects.select_related(None)
+            .filter(Requisition_id__in=pending)
+            .values('Requisition', 'Product')
+            .annotate(total=Sum('REQUESTED_PRODUCT_QUANTITY'))
+            .order_by()
+            .values_list('Requisition', 'Product', 'total')
+        )
+        lines = [
+            (req_id, product_id, total if pending[req_id] else -total)
+            for req_id, product_id, total in lines if total
+        ]
+        deltas = {}
+        for req_id, product_id, delta in lines:
+            deltas[product_id] = deltas.get(product_id, 0) + delta
+
+        # Lock the affected products in id order so concurrent batches
+        # cannot deadlock, then check every line before writing anything.
+        stock = dict(
+            Product.objects.select_related(None).select_for_update()
+            .filter(pk__in=list(deltas))
+            .order_by('pk')
+            .values_list('pk', 'PROD_QUANTITY')
+        )
+        shortages = [
+            f"{product_id} (requested {-delta}, in stock {stock.get(product_id, 0)})"
+            for product_id, delta in sorted(deltas.items()) if stock.get(product_id, 0) + delta < 0
+        ]
+        if shortages:
+            raise StockError(f"Not enough stock for products {', '.join(shortages)}.")
+
+        Requisition.objects.filter(pk__in=list(pending), REQ_STATUS=Requisition.PENDING).update(
+            REQ_STATUS=Requisition.APPROVED, REQ_UPDATED_AT=timezone.now()
+        )
+        update_stock_quantities(deltas)
+
+        now = timezone.now()
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=product_id, MOVE_QUANTITY=delta, MOVE_REASON=StockMovement.REQUISITION, MOVE_REFERENCE=req_id, MOVE_DATE=now)
+            for req_id, product_id, delta in lines
+        ], batch_size=BULK_BATCH_SIZE)
+    return list(pending)
+
+
+def reject_requisition(req_id):
+    with transaction.atomic():
+        requisition = _lock_requisition(req_id)
+        return requisition.reject()
+
+
+def bulk_reject_requisitions(req_ids):
+    return Requisition.objects.filter(pk__in=req_ids, REQ_STATUS__in=Requisition.OPEN_STATUSES).update(
+        REQ_STATUS=Requisition.REJECTED, REQ_UPDATED_AT=timezone.now()
+    )
+
+
+def submit_requisition(req_id):
+    # Draft -> Pending; False when it is not a draft any more
+    with transaction.atomic():
+        requisition = _lock_requisition(req_id)
+        return requisition.submit()
+
+
+def bulk_submit_requisitions(req_ids):
+    return Requisition.objects.filter(pk__in=req_ids, REQ_STATUS=Requisition.DRAFT).update(
+        REQ_STATUS=Requisition.PENDING, REQ_UPDATED_AT=timezone.now()
+    )
+
+
+def stock_as_of(product_id, when):
+    # Latest snapshot at or before `when` (an index seek) plus the movements
+    # recorded between that snapshot and `when`.
+    snapshot = (
+        StockSnapshot.objects.filter(product_id=product_id, SNAP_DATE__lte=when)
+        .order_by('-SNAP_DATE')
+        .values_list('SNAP_QUANTITY', 'SNAP_DATE')
+        .first()
+    )
+    movements = StockMovement.objects.filter(product_id=product_id, MOVE_DATE__lte=when)
+    quantity = 0
+    if snapshot:
+        quantity, snapshot_date = snapshot
+        movements = movements.filter(MOVE_DATE__gt=snapshot_date)
+    return quantity + (movements.aggregate(total=Sum('MOVE_QUANTITY'))['total'] or 0)
+
+
+def compact_stock_ledger(cutoff=None):
+    # Write a snapshot for every product that moved since the previous
+    # compaction run. Products without movements keep their older snapshot,
+    # which is still exact for them.
+    cutoff = cutoff or timezone.now() - SNAPSHOT_GRACE
+    with transaction.atomic():
+        previous_cutoff = StockSnapshot.objects.aggregate(last=Max('SNAP_DATE'))['last']
+        if previous_cutoff and previous_cutoff >= cutoff:
+            return 0
+        movements = StockMovement.objects.filter(MOVE_DATE__lte=cutoff)
+        if previous_cutoff:
+            movements = movements.filter(MOVE_DATE__gt=previous_cutoff)
+        moved = dict(
+            movements.values('product').annotate(total=Sum('MOVE_QUANTITY')).order_by().values_list('product', 'total')
+        )
+        latest = StockSnapshot.objects.filter(product=OuterRef('pk')).order_by('-SNAP_DATE').values('SNAP_QUANTITY')[:1]
+        previous = dict(
+            Product.objects.select_related(None)
+            .filter(pk__in=list(moved))
+            .annotate(quantity=Subquery(latest))
+            .values_list('pk', 'quantity')
+        )
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(product_id=product_id, SNAP_QUANTITY=(previous.get(product_id) or 0) + total, SNAP_DATE=cutoff)
+            for product_id, total in moved.items()
+        ], batch_size=BULK_BATCH_SIZE)
+    return len(moved)
+
+
+def prune_deleted_records(now=None):
+    # Drop deletion records past their retention; API clients asking for
+    # changes since before then are told to fetch the full list again.
+    cutoff = (now or timezone.now()) - timedelta(days=DeletedRecord.DELETION_RETENTION_DAYS)
+    count, _ = DeletedRecord.objects.filter(DEL_DATE__lt=cutoff).delete()
+    return count
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version
+from .models import Product, Supplier, PurchaseOrder, Requisition, RequestedProduct, DeletedRecord
+from .search import index_products, remove_products
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_catalog(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Supplier)
+def index_supplier_products(sender, instance, created, **kwargs):
+    # Products carry the supplier name in their search row
+    if not created:
+        index_products(supplier_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Requisition)
+@receiver(post_delete, sender=RequestedProduct)
+def record_deletion(sender, instance, **kwargs):
+    # Reported to API clients polling with ?since=
+    DeletedRecord.objects.create(DEL_MODEL=sender._meta.label_lower, DEL_OBJECT_ID=instance.pk)
@@ -0,0 +1,48 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME = re.compile(r'^(?P<digest>[0-9a-f]{32})(_\d+)?\.\w+$')
+
+
+def hashed_digest(name):
+    # Digest encoded in a content-addressed name (or one of its thumbnail
+    # variants), or None for names that were not stored by content hash.
+    match = HASHED_NAME.match(posixpath.basename(name))
+    return match.group('digest') if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Uploads are stored as <upload_to>/<sha256 prefix><ext>. Identical
+    # uploads share one file, and since a name always refers to the same
+    # bytes it can be cached forever.
+    digest_length = 32
+
+    def content_digest(self, content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return sha256.hexdigest()[:self.digest_length]
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        hashed_name = posixpath.join(directory, self.content_digest(content) + extension)
+        if self.exists(hashed_name):
+            return hashed_name
+        return super().save(hashed_name, content, max_length)
+
+    def save_exact(self, name, content):
+        # Derived files (thumbnails) keep the name they are given; the name
+        # already embeds the digest of the image they were made from.
+        if self.exists(name):
+            return name
+        return super().save(name, content)
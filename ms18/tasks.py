@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(func):
+    # Register a function so it can be queued by name
+    _tasks[func.__name__] = func
+    return func
+
+
+def run_task(name, args):
+    try:
+        _tasks[name](*args)
+    except Exception:
+        logger.exception("Task %s%r failed", name, tuple(args))
+
+
+def enqueue(name, *args):
+    # Jobs are handed to the backend only once the surrounding transaction
+    # commits, so a worker never sees rows or files that were rolled back.
+    backend = get_backend()
+    transaction.on_commit(lambda: backend.submit(name, list(args)))
+
+
+class ImmediateBackend:
+    # Runs tasks right away; meant for tests.
+    def submit(self, name, args):
+        run_task(name, args)
+
+
+class ThreadBackend:
+    # Runs tasks on a small in-process pool off the request thread.
+    def __init__(self, workers=2, **options):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ms18-task')
+
+    def submit(self, name, args):
+        self.executor.submit(self.run, name, args)
+
+    @staticmethod
+    def run(name, args):
+        # Like a request: drop a stale or expired connection first, and
+        # hand a pooled connection back afterwards instead of keeping it
+        # for the life of the worker thread.
+        close_old_connections()
+        try:
+            run_task(name, args)
+        finally:
+            close_old_connections()
+
+
+class SpoolBackend:
+    # Stand-in for a message broker: each job is a JSON file in a spool
+    # directory, drained by `manage.py run_task_worker`.
+    def __init__(self, spool_dir, **options):
+        self.spool_dir = str(spool_dir)
+
+    def submit(self, name, args):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = f'{time.time_ns()}-{uuid.uuid4().hex}'
+        temp_path = os.path.join(self.spool_dir, f'.{job_id}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'task': name, 'args': args}, f)
+        os.replace(temp_path, os.path.join(self.spool_dir, f'{job_id}.json'))
+
+    def drain(self):
+        processed = 0
+        for file_name in sorted(os.listdir(self.spool_dir)) if os.path.isdir(self.spool_dir) else []:
+            if not file_name.endswith('.json'):
+                continue
+            path = os.path.join(self.spool_dir, file_name)
+            try:
+                with open(path) as f:
+                    job = json.load(f)
+                os.remove(path)
+            except FileNotFoundError:
+                continue  # Claimed by another worker
+            run_task(job['task'], job['args'])
+            processed += 1
+        return processed
+
+
+BACKENDS = {
+    'immediate': ImmediateBackend,
+    'thread': ThreadBackend,
+    'spool': SpoolBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    options = dict(getattr(settings, 'TASK_QUEUE', {}))
+    backend = options.pop('BACKEND', 'thread')
+    return BACKENDS[backend](**{key.lower(): value for key, value in options.items()})
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == 'TASK_QUEUE':
+        get_backend.cache_clear()
@@ -0,0 +1,35 @@
+from django import template
+
+from ms18.caching import cached
+from ms18.images import thumbnail_url, DISPLAY_SIZE
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(file, size=DISPLAY_SIZE):
+    return thumbnail_url(file, int(size))
+
+
+class CatalogCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        parts = [var.resolve(context) for var in self.vary_on]
+        return cached(f'fragment:{self.name}', parts, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def catalog_cache(parser, token):
+    # {% catalog_cache name [vary_on ...] %} ... {% endcatalog_cache %}
+    # Like {% cache %}, but the key follows the catalog version so saving a
+    # product or supplier invalidates the fragment.
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    nodelist = parser.parse(('endcatalog_cache',))
+    parser.delete_first_token()
+    return CatalogCacheNode(nodelist, bits[1], [parser.compile_filter(bit) for bit in bits[2:]])
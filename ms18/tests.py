@@ -1,3 +1,1420 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from .models import Product, Supplier, Requisition, RequestedProduct, PurchaseOrder, Cart, StockMovement, StockSnapshot, ApiToken
+from . import services
+from .caching import cache_stats
+from .search import search_products, index_products
+from . import reorders
+from .metrics import registry as metrics_registry
+from .middleware import QueryRecorder, fingerprint
+from . import benchmarks
+from . import routers
+from . import images
+from .images import variant_name, THUMBNAIL_SIZES
+from .views import ProductListView
+
+
+class QueryCountTests(TestCase):
+    # Each listing view must issue the same number of queries whether it
+    # renders a handful of rows or many times more.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+        cls.requisition = Requisition.objects.create(REQ_EMPLOYEE=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def seed(self, count):
+        for i in range(count):
+            supplier = Supplier.objects.create(
+                SUPPLIER_NAME=f'Supplier {i}', SUPPLIER_ADDRESS='Cebu City', SUPPLIER_PHONE='0900000000'
+            )
+            product = Product.objects.create(
+                PROD_NAME=f'Product {i}', PROD_DESCRIPTION='Test product', PROD_QUANTITY=i, supplier=supplier
+            )
+            Requisition.objects.create(REQ_EMPLOYEE=self.user, supplier=supplier)
+            RequestedProduct.objects.create(
+                REQUESTED_PRODUCT_NAME=product.PROD_NAME, REQUESTED_PRODUCT_QUANTITY=1,
+                Product=product, Requisition=self.requisition,
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertQueryCountStable(self, url):
+        self.seed(3)
+        small = self.count_queries(url)
+        self.seed(20)
+        large = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} issues a query per row')
+
+    def test_product_list(self):
+        self.assertQueryCountStable(reverse('ms18-home'))
+
+    def test_order_form(self):
+        self.assertQueryCountStable(reverse('ms18-about'))
+
+    def test_add_requisition(self):
+        self.assertQueryCountStable(reverse('add-requisition') + '?supplier=supplier')
+
+    def test_order_forms_are_paged(self):
+        acme = Supplier.objects.create(SUPPLIER_NAME='Acme')
+        Product.objects.bulk_create([
+            Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='Test product', supplier=acme if i % 2 else None)
+            for i in range(120)
+        ])
+        response = self.client.get(reverse('ms18-about'))
+        self.assertEqual(len(response.context['products']), 50)
+        response = self.client.get(reverse('ms18-about'), {'name': 'part 1', 'after': response.context['page'].next_cursor})
+        self.assertEqual([p.PROD_NAME for p in response.context['products']][:2], ['Part 100', 'Part 101'])
+
+        # Requisitions list nothing until a supplier is searched for
+        self.assertEqual(list(self.client.get(reverse('add-requisition')).context['products']), [])
+        response = self.client.get(reverse('add-requisition'), {'supplier': 'acm'})
+        self.assertEqual(len(response.context['products']), 50)
+        self.assertTrue(all(p.supplier == acme for p in response.context['products']))
+        self.assertContains(response, '?supplier=acm&amp;after=')
+
+    def test_view_requisitions(self):
+        self.assertQueryCountStable(reverse('view-requisitions'))
+
+    def test_requested_products(self):
+        self.assertQueryCountStable(reverse('requested-product-view', args=[self.requisition.REQ_ID]))
+
+
+class OrderIntakeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('employee', 'employee@example.com', 'password')
+        cls.products = [
+            Product.objects.create(PROD_NAME=f'Product {i}', PROD_DESCRIPTION='Test product', PROD_PRICE=10)
+            for i in range(20)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_lines(self, products, quantity=2):
+        data = {f'quantity_{product.pk}': quantity for product in products}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('add-to-cart'), data)
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        return len(context.captured_queries)
+
+    def test_creates_order_and_cart_row_per_line(self):
+        self.post_lines(self.products[:3])
+        self.assertEqual(PurchaseOrder.objects.filter(employee=self.user, product__in=self.products[:3]).count(), 3)
+        self.assertEqual(Cart.objects.filter(user=self.user, PurchaseOrder__isnull=False).count(), 3)
+
+    def test_query_count_independent_of_line_count(self):
+        self.assertEqual(self.post_lines(self.products[:2]), self.post_lines(self.products))
+
+    def test_invalid_lines_are_reported(self):
+        response = self.client.post(reverse('add-to-cart'), {
+            f'quantity_{self.products[0].pk}': '1',
+            f'quantity_{self.products[1].pk}': 'abc',
+            'quantity_999999': '1',
+        }, follow=True)
+        errors = [str(message) for message in response.context['messages']]
+        self.assertEqual(PurchaseOrder.objects.count(), 1)
+        self.assertTrue(any('abc' in error for error in errors))
+        self.assertTrue(any('999999' in error for error in errors))
+
+
+class RequisitionIntakeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('employee', 'employee@example.com', 'password')
+        cls.supplier = Supplier.objects.create(
+            SUPPLIER_NAME='Joyo', SUPPLIER_ADDRESS='Cebu City', SUPPLIER_PHONE='0900000000'
+        )
+        cls.products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Product {i}', PROD_DESCRIPTION='Test product', supplier=cls.supplier)
+            for i in range(1200)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_lines(self, products):
+        data = {f'quantity_{product.pk}': 3 for product in products}
+        data['hidden_supplier_id'] = self.supplier.SUPPLIER_ID
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(reverse('add_to_req'), data)
+        return len(context.captured_queries)
+
+    def test_lines_are_attached_to_requisition(self):
+        self.post_lines(self.products[:5])
+        requisition = Requisition.objects.get()
+        self.assertEqual(requisition.REQ_EMPLOYEE, self.user)
+        self.assertEqual(requisition.requestedproduct_set.filter(REQUESTED_PRODUCT_QUANTITY=3).count(), 5)
+
+    def test_query_count_bounded_for_large_requisitions(self):
+        small = self.post_lines(self.products[:5])
+        large = self.post_lines(self.products)
+        self.assertLessEqual(large - small, 10)
+        self.assertEqual(RequestedProduct.objects.count(), 1205)
+
+
+class StockAdjustmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product', PROD_QUANTITY=50)
+
+    def test_order_approval_is_idempotent(self):
+        order = PurchaseOrder.objects.create(ORD_EMPLOYEE='staff', ORD_NAME='Keyboard', ORD_QUANTITY=5, product=self.product)
+        self.assertTrue(services.approve_order(order.pk))
+        self.assertFalse(services.approve_order(order.pk))
+        self.assertFalse(services.reject_order(order.pk))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.PROD_QUANTITY, 55)
+
+    def test_requisition_approval_is_idempotent(self):
+        requisition = Requisition.objects.create()
+        RequestedProduct.objects.create(Product=self.product, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=4)
+        RequestedProduct.objects.create(Product=self.product, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=6)
+        self.assertTrue(services.approve_requisition(requisition.pk))
+        self.assertFalse(services.approve_requisition(requisition.pk))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.PROD_QUANTITY, 40)
+
+
+class BatchRequisitionApprovalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='Test product', PROD_QUANTITY=100) for i in range(20)
+        ])
+
+    def make_requisitions(self, count, quantity):
+        requisitions = Requisition.objects.bulk_create([Requisition() for _ in range(count)])
+        RequestedProduct.objects.bulk_create([
+            RequestedProduct(Product=product, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=quantity)
+            for requisition in requisitions for product in self.products
+        ])
+        return [requisition.pk for requisition in requisitions]
+
+    def test_quantities_are_aggregated_across_requisitions(self):
+        req_ids = self.make_requisitions(10, 3)
+        with CaptureQueriesContext(connection) as context:
+            approved = services.bulk_approve_requisitions(req_ids)
+        self.assertEqual(approved, req_ids)
+        self.assertLessEqual(len(context.captured_queries), 10)
+        self.assertEqual(set(Product.objects.values_list('PROD_QUANTITY', flat=True)), {70})
+        self.assertEqual(StockMovement.objects.filter(MOVE_REASON=StockMovement.REQUISITION).count(), 200)
+        self.assertEqual(services.bulk_approve_requisitions(req_ids), [])
+
+    def test_shortage_rejects_whole_batch(self):
+        req_ids = self.make_requisitions(3, 40)
+        with self.assertRaises(services.StockError):
+            services.bulk_approve_requisitions(req_ids)
+        self.assertEqual(set(Product.objects.values_list('PROD_QUANTITY', flat=True)), {100})
+        self.assertEqual(Requisition.objects.filter(REQ_STATUS=Requisition.PENDING).count(), 3)
+        self.assertFalse(StockMovement.objects.exists())
+
+        # Only staff can approve
+        url = reverse('view-requisitions')
+        data = {'action': 'approve', 'req_ids': req_ids[:2]}
+        self.assertRedirects(self.client.post(url, data), f"{reverse('login')}?next={url}")
+        self.client.force_login(User.objects.create_user('clerk', 'clerk@example.com', 'password'))
+        self.assertEqual(self.client.post(url, data).status_code, 403)
+        for name in ['approve_requisition', 'reject_requisition', 'submit_requisition']:
+            response = self.client.post(reverse(name, args=[req_ids[0]]))
+            self.assertTrue(response['Location'].startswith(reverse('login')), name)
+        self.assertEqual(Requisition.objects.filter(REQ_STATUS=Requisition.PENDING).count(), 3)
+
+        self.client.force_login(User.objects.create_user('manager', 'manager@example.com', 'password', is_staff=True))
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Requisition.objects.filter(REQ_STATUS=Requisition.APPROVED).count(), 2)
+        self.assertEqual(set(Product.objects.values_list('PROD_QUANTITY', flat=True)), {20})
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentApprovalTests(TransactionTestCase):
+    # Fires approvals from many threads at once against the test database.
+    # Needs a backend with real row locking (PostgreSQL).
+    workers = 16
+
+    def run_in_parallel(self, func, args_list):
+        barrier = threading.Barrier(len(args_list))
+        errors = []
+
+        def worker(args):
+            try:
+                barrier.wait()
+                func(*args)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(args,)) for args in args_list]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_order_approvals_do_not_lose_updates(self):
+        product = Product.objects.create(PROD_NAME='Mouse', PROD_DESCRIPTION='Test product', PROD_QUANTITY=0)
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(ORD_EMPLOYEE='staff', ORD_NAME='Mouse', ORD_QUANTITY=2, product=product) for _ in range(self.workers)
+        ])
+        self.run_in_parallel(services.approve_order, [(order.pk,) for order in orders])
+        product.refresh_from_db()
+        self.assertEqual(product.PROD_QUANTITY, 2 * self.workers)
+
+    def test_parallel_approvals_of_one_order_apply_once(self):
+        product = Product.objects.create(PROD_NAME='Monitor', PROD_DESCRIPTION='Test product', PROD_QUANTITY=0)
+        order = PurchaseOrder.objects.create(ORD_EMPLOYEE='staff', ORD_NAME='Monitor', ORD_QUANTITY=3, product=product)
+        self.run_in_parallel(services.approve_order, [(order.pk,)] * self.workers)
+        product.refresh_from_db()
+        self.assertEqual(product.PROD_QUANTITY, 3)
+
+    def test_parallel_approvals_of_one_requisition_apply_once(self):
+        product = Product.objects.create(PROD_NAME='Cable', PROD_DESCRIPTION='Test product', PROD_QUANTITY=100)
+        requisition = Requisition.objects.create()
+        RequestedProduct.objects.create(Product=product, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=7)
+        self.run_in_parallel(services.approve_requisition, [(requisition.pk,)] * self.workers)
+        product.refresh_from_db()
+        self.assertEqual(product.PROD_QUANTITY, 93)
+
+
+class StockLedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product')
+
+    def test_approvals_write_movements(self):
+        order = PurchaseOrder.objects.create(ORD_EMPLOYEE='staff', ORD_NAME='Keyboard', ORD_QUANTITY=5, product=self.product)
+        requisition = Requisition.objects.create()
+        RequestedProduct.objects.create(Product=self.product, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=2)
+        services.approve_order(order.pk)
+        services.approve_requisition(requisition.pk)
+        movements = StockMovement.objects.filter(product=self.product).order_by('MOVE_ID')
+        self.assertEqual(
+            list(movements.values_list('MOVE_REASON', 'MOVE_QUANTITY', 'MOVE_REFERENCE')),
+            [(StockMovement.ORDER, 5, order.pk), (StockMovement.REQUISITION, -2, requisition.pk)],
+        )
+
+    def test_stock_as_of_matches_history_across_compactions(self):
+        start = timezone.now()
+        history = []
+        for day, delta in enumerate([10, -3, 7, -4, 1]):
+            when = start + timedelta(days=day)
+            StockMovement.objects.create(product=self.product, MOVE_QUANTITY=delta, MOVE_REASON=StockMovement.ADJUSTMENT, MOVE_DATE=when)
+            history.append(when)
+            if day % 2:
+                services.compact_stock_ledger(cutoff=when)
+
+        expected = [10, 7, 14, 10, 11]
+        for when, quantity in zip(history, expected):
+            self.assertEqual(services.stock_as_of(self.product.pk, when), quantity)
+        self.assertEqual(services.stock_as_of(self.product.pk, start - timedelta(days=1)), 0)
+        self.assertEqual(StockSnapshot.objects.filter(product=self.product).count(), 2)
+
+
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, TASK_QUEUE={'BACKEND': 'immediate'})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, size=(600, 400)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'purple').save(buffer, format='PNG')
+        return SimpleUploadedFile('keyboard.png', buffer.getvalue(), content_type='image/png')
+
+    def test_new_image_is_thumbnailed_after_commit(self):
+        with mock.patch.object(images, 'enqueue', wraps=images.enqueue) as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                product = Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product', PROD_IMAGE=self.upload())
+        self.assertEqual(enqueue.call_count, 1)
+        name = product.PROD_IMAGE.name
+        for size in THUMBNAIL_SIZES:
+            with default_storage.open(variant_name(name, size)) as f:
+                self.assertLessEqual(max(Image.open(f).size), size)
+            self.assertTrue(default_storage.exists(variant_name(name, size, webp=True)))
+
+    def test_saves_without_image_change_queue_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product', PROD_IMAGE=self.upload())
+        product = Product.objects.get()
+        with mock.patch.object(images, 'enqueue') as enqueue:
+            product.PROD_PRICE = 99
+            product.save()
+            Product.objects.create(PROD_NAME='Mouse', PROD_DESCRIPTION='Uses the default image')
+        enqueue.assert_not_called()
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, SERVE_MEDIA=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, color):
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), color).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_identical_uploads_share_one_file(self):
+        first = Product.objects.create(PROD_NAME='A', PROD_DESCRIPTION='Test', PROD_IMAGE=self.upload('a.png', 'red'))
+        second = Product.objects.create(PROD_NAME='B', PROD_DESCRIPTION='Test', PROD_IMAGE=self.upload('b.png', 'red'))
+        third = Product.objects.create(PROD_NAME='C', PROD_DESCRIPTION='Test', PROD_IMAGE=self.upload('a.png', 'blue'))
+        self.assertEqual(first.PROD_IMAGE.name, second.PROD_IMAGE.name)
+        self.assertNotEqual(first.PROD_IMAGE.name, third.PROD_IMAGE.name)
+        self.assertRegex(first.PROD_IMAGE.name, r'^product_pics/[0-9a-f]{32}\.png$')
+
+    def test_hashed_media_is_served_immutable_with_etag(self):
+        product = Product.objects.create(PROD_NAME='A', PROD_DESCRIPTION='Test', PROD_IMAGE=self.upload('a.png', 'red'))
+        url = product.PROD_IMAGE.url
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class ReceiptTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('employee', 'employee@example.com', 'password')
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(ORD_EMPLOYEE='employee', employee=cls.user, ORD_NAME=f'Product {i}', ORD_QUANTITY=2, ORD_PRICE='1.50')
+            for i in range(120)
+        ])
+        PurchaseOrder.objects.create(ORD_EMPLOYEE='someone-else', ORD_NAME='Other', ORD_QUANTITY=1, ORD_PRICE=1000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def receipt(self, receipt_format):
+        response = self.client.get(reverse('generate-receipt'), {'format': receipt_format})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_text_receipt_has_single_overall_total(self):
+        content = self.receipt('txt').decode()
+        self.assertEqual(content.count('Overall Total'), 1)
+        self.assertTrue(content.rstrip().endswith('Overall Total: ₱360.00'))
+
+    def test_csv_receipt_running_total(self):
+        rows = self.receipt('csv').decode().splitlines()
+        self.assertEqual(len(rows), 121)
+        self.assertTrue(rows[-1].endswith(',360.00'))
+
+    def test_pdf_receipt_is_well_formed(self):
+        content = self.receipt('pdf')
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        startxref = int(content.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertTrue(content[startxref:].startswith(b'xref'))
+        self.assertIn(b'Overall Total: PHP 360.00', content)
+
+    def test_unknown_format_rejected(self):
+        response = self.client.get(reverse('generate-receipt'), {'format': 'xls'})
+        self.assertEqual(response.status_code, 400)
+        # Receipts are reads; the cart's form sends a GET
+        self.assertEqual(self.client.post(reverse('generate-receipt'), {'format': 'txt'}).status_code, 405)
+
+
+class CartTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('employee', 'employee@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_orders(self, count, status=PurchaseOrder.PENDING):
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                ORD_EMPLOYEE='employee', employee=self.user, ORD_NAME='Keyboard', ORD_QUANTITY=3, ORD_PRICE='2.00',
+                status=status,
+            )
+            for _ in range(count)
+        ])
+
+    def test_totals_computed_per_status(self):
+        self.add_orders(30)
+        self.add_orders(5, PurchaseOrder.APPROVED)
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.context['overall_total'], 210)
+        self.assertEqual(response.context['status_totals'][PurchaseOrder.APPROVED]['subtotal'], 30)
+        self.assertEqual(len(response.context['cart_items']), 25)
+        self.assertEqual(response.context['cart_items'][0].total_price, 6)
+
+    def test_query_count_independent_of_history(self):
+        self.add_orders(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('cart'))
+        self.add_orders(200)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('cart'))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class QueryPlanTests(TestCase):
+    # Runs EXPLAIN for the hot queries behind the listing, cart, review and
+    # requisition pages on a seeded dataset and fails if the planner reads
+    # the filtered table sequentially instead of using an index.
+    suppliers = 200
+    products_per_supplier = 50
+    orders = 20000
+    requisitions = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(50)])
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(SUPPLIER_NAME=f'Supplier {i}', SUPPLIER_ADDRESS='Cebu City', SUPPLIER_PHONE='0900000000')
+            for i in range(cls.suppliers)
+        ])
+        cls.supplier = suppliers[0]
+        # Out of stock products (2%) are below their reorder point; with the
+        # default point a fifth of the table would be, which makes the
+        # reorder candidates plan a coin toss between index and table scan
+        products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Product {s}-{i}', PROD_DESCRIPTION='Seeded', PROD_QUANTITY=i, PROD_REORDER_POINT=1, supplier=supplier)
+            for s, supplier in enumerate(suppliers) for i in range(cls.products_per_supplier)
+        ], batch_size=2000)
+        start = timezone.now() - timedelta(days=1000)
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                ORD_EMPLOYEE='seed', ORD_NAME='Seeded', ORD_QUANTITY=1, ORD_PRICE=1,
+                ORD_DATE_POSTED=start + timedelta(hours=i), employee=cls.users[i % len(cls.users)],
+                product=products[i % len(products)],
+                status=PurchaseOrder.PENDING if i % 20 == 0 else PurchaseOrder.APPROVED,
+            )
+            for i in range(cls.orders)
+        ], batch_size=2000)
+        requisitions = Requisition.objects.bulk_create([
+            Requisition(
+                REQ_EMPLOYEE=cls.users[i % len(cls.users)], supplier=suppliers[i % len(suppliers)],
+                REQ_STATUS=Requisition.PENDING if i % 20 == 0 else Requisition.APPROVED,
+            )
+            for i in range(cls.requisitions)
+        ], batch_size=2000)
+        cls.requisition = requisitions[0]
+        RequestedProduct.objects.bulk_create([
+            RequestedProduct(Product=products[i % len(products)], Requisition=requisitions[i % len(requisitions)], REQUESTED_PRODUCT_QUANTITY=1)
+            for i in range(cls.requisitions * 2)
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def inventory_page(self, **filters):
+        # The queryset the inventory page pages through, as keyset_paginate runs it
+        view = ProductListView()
+        view.request = RequestFactory().get(reverse('ms18-home'), filters)
+        return view.get_queryset().order_by('id')[:51]
+
+    def hot_queries(self):
+        user = self.users[0]
+        recent = timezone.now() - timedelta(days=2)
+        return [
+            ('inventory page', Product._meta.db_table, self.inventory_page()),
+            ('inventory by name prefix', Product._meta.db_table, self.inventory_page(name='product 7-')),
+            ('inventory by supplier prefix', Product._meta.db_table, self.inventory_page(supplier='supplier 7')),
+            ('suppliers by name prefix', Supplier._meta.db_table, self.inventory_page(supplier='supplier 7')),
+            ('inventory by stock band', Product._meta.db_table, self.inventory_page(stock=Product.LOW)),
+            ('products by supplier', Product._meta.db_table,
+             Product.objects.filter(supplier=self.supplier).order_by('PROD_NAME')),
+            ('product by name', Product._meta.db_table, Product.objects.filter(PROD_NAME='Product 7-7')),
+            ('pending orders', PurchaseOrder._meta.db_table,
+             PurchaseOrder.objects.filter(status=PurchaseOrder.PENDING).order_by('id')[:50]),
+            ('cart page', PurchaseOrder._meta.db_table,
+             PurchaseOrder.objects.filter(employee=user).with_line_total().order_by('-id')[:26]),
+            ('cart totals', PurchaseOrder._meta.db_table, PurchaseOrder.objects.filter(employee=user).order_by().values('status')),
+            ('recent approved orders', PurchaseOrder._meta.db_table,
+             PurchaseOrder.objects.filter(status=PurchaseOrder.APPROVED, ORD_DATE_POSTED__gte=recent)),
+            ('requisition list', Requisition._meta.db_table, Requisition.objects.listing().order_by('-REQ_ID')[:50]),
+            ('pending requisitions', Requisition._meta.db_table,
+             Requisition.objects.filter(REQ_STATUS=Requisition.PENDING).order_by('-REQ_ID')[:50]),
+            ('requested products', RequestedProduct._meta.db_table,
+             RequestedProduct.objects.listing().filter(Requisition=self.requisition)),
+            ('reorder candidates', Product._meta.db_table, reorders.reorder_candidates()),
+        ]
+
+    def sequential_scans(self, queryset, plan):
+        if connection.vendor == 'postgresql':
+            return set(re.findall(r'Seq Scan on "?(\w+)"?', plan))
+        # SQLite reports a walk in primary-key order as a plain "SCAN table";
+        # for an unfiltered page with no sort step it stops after LIMIT rows.
+        # A filtered query walking the table may read all of it.
+        if queryset.query.high_mark is not None and not queryset.query.where and 'USE TEMP B-TREE' not in plan:
+            return set()
+        return {match.group(1) for match in re.finditer(r'\bSCAN (\w+)(?! USING)', plan)}
+
+    def test_hot_queries_use_indexes(self):
+        for label, table, queryset in self.hot_queries():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertNotIn(table, self.sequential_scans(queryset, plan), f'{label} scans {table}:\n{plan}')
+
+
+class ReviewQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.product = Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product', PROD_QUANTITY=0)
+        cls.orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(ORD_EMPLOYEE='staff', ORD_NAME='Keyboard', ORD_QUANTITY=2, product=cls.product)
+            for _ in range(300)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_queue_is_paginated(self):
+        response = self.client.get(reverse('admin_review_orders'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['pending_orders']), 100)
+        self.assertTrue(response.context['page'].has_next)
+
+    def test_bulk_approve_uses_fixed_number_of_queries(self):
+        order_ids = [order.pk for order in self.orders]
+        with CaptureQueriesContext(connection) as context:
+            services.bulk_approve_orders(order_ids[:250])
+        self.assertLessEqual(len(context.captured_queries), 8)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.PROD_QUANTITY, 500)
+        self.assertEqual(StockMovement.objects.filter(MOVE_REASON=StockMovement.ORDER).count(), 250)
+
+        # Already approved orders are skipped; only the rest are rejected
+        response = self.client.post(reverse('admin_review_orders'), {'action': 'reject', 'order_ids': order_ids})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(PurchaseOrder.objects.filter(status=PurchaseOrder.REJECTED).count(), 50)
+        self.assertEqual(PurchaseOrder.objects.filter(status=PurchaseOrder.APPROVED).count(), 250)
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.supplier = Supplier.objects.create(SUPPLIER_NAME='Acme')
+        cls.product = Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Test product', PROD_QUANTITY=5, supplier=cls.supplier)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_repeat_renders_skip_catalog_queries(self):
+        for name in ('ms18-home', 'ms18-about', 'add-requisition', 'supplier-list'):
+            self.client.get(reverse(name))
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse(name))
+            catalog_queries = [q for q in context.captured_queries if re.search(r'FROM "ms18_(product|supplier)"', q['sql'])]
+            self.assertEqual(catalog_queries, [], name)
+        stats = cache_stats()
+        self.assertGreater(stats['hits'], 0)
+        self.assertEqual(self.client.get(reverse('catalog-cache-stats')).json()['hits'], stats['hits'])
+
+    def test_writes_invalidate_cached_pages(self):
+        self.assertContains(self.client.get(reverse('ms18-about')), 'Keyboard')
+        self.product.PROD_NAME = 'Trackball'
+        self.product.save()
+        self.assertContains(self.client.get(reverse('ms18-about')), 'Trackball')
+
+        services.update_stock_quantities({self.product.pk: 1234})
+        self.assertContains(self.client.get(reverse('ms18-home')), '1239')
+
+        self.supplier.SUPPLIER_NAME = 'Globex'
+        self.supplier.save()
+        self.assertContains(self.client.get(reverse('supplier-list')), 'Globex')
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        cls.clerk = User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        cls.supplier = Supplier.objects.create(SUPPLIER_NAME='Acme', SUPPLIER_ADDRESS='Manila', SUPPLIER_PHONE='123')
+        cls.products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='Test product', PROD_QUANTITY=10, supplier=cls.supplier)
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        url = reverse('api-products') + '?fields=id,quantity&limit=20'
+        with CaptureQueriesContext(connection) as context:
+            first = self.client.get(url).json()
+        select = [q['sql'] for q in context.captured_queries if 'PROD_DESCRIPTION' in q['sql'] or '"PROD_QUANTITY"' in q['sql']][-1]
+        self.assertNotIn('PROD_DESCRIPTION', select)
+        self.assertEqual(first['results'][0], {'id': self.products[0].pk, 'quantity': 10})
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 30)
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(reverse('api-products') + '?fields=bogus').status_code, 400)
+
+    def test_conditional_get_and_since(self):
+        url = reverse('api-products')
+        response = self.client.get(url)
+        synced_at = response.json()['synced_at']
+        with CaptureQueriesContext(connection) as context:
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertFalse([q for q in context.captured_queries if 'PROD_DESCRIPTION' in q['sql']])
+
+        # Only the page's keys are read, not the whole set
+        self.assertFalse([q for q in context.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+        services.update_stock_quantities({self.products[3].pk: 5})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        changed = self.client.get(url, {'since': synced_at, 'fields': 'id,quantity'}).json()
+        self.assertIn({'id': self.products[3].pk, 'quantity': 15}, changed['results'])
+        self.assertEqual(changed['deleted'], [])
+
+        deleted_pk = self.products[4].pk
+        self.products[4].delete()
+        self.assertEqual(self.client.get(url, {'since': synced_at}).json()['deleted'], [deleted_pk])
+        old = (timezone.now() - timedelta(days=365)).isoformat()
+        self.assertEqual(self.client.get(url, {'since': old}).status_code, 410)
+
+    def test_malformed_filters(self):
+        for url, params in [
+            (reverse('api-products'), {'supplier': 'abc'}),
+            (reverse('api-orders'), {'product': 'x'}),
+            (reverse('api-products'), {'stock_band': 'nope'}),
+            (reverse('api-orders'), {'status': 'Shipped'}),
+            (reverse('api-products'), {'since': '2024-13-45T00:00:00'}),
+            (reverse('api-products'), {'since': 'yesterday'}),
+        ]:
+            with self.subTest(params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid', response.json()['error'])
+        self.assertEqual(len(self.client.get(reverse('api-products'), {'supplier': self.supplier.pk}).json()['results']), 30)
+        response = self.client.get(reverse('api-products'), {'stock_band': Product.VERY_LOW})
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_and_session_authentication(self):
+        token, _ = ApiToken.issue(self.staff, 'sync job')
+        client = self.client_class(enforce_csrf_checks=True)
+        url = reverse('api-suppliers')
+        supplier = {'name': 'Globex', 'address': 'Cebu City', 'phone': '0900000000'}
+        response = client.post(url, supplier, content_type='application/json', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 201)
+        response = client.get(url, headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 401)
+
+        # Session writes still need the CSRF token
+        client.force_login(self.staff)
+        self.assertEqual(client.get(url).status_code, 200)
+        response = client.post(url, {**supplier, 'name': 'Initech'}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['error'])
+        client.get(reverse('login'))
+        response = client.post(
+            url, {**supplier, 'name': 'Initech'}, content_type='application/json', headers={'X-CSRFToken': client.cookies['csrftoken'].value},
+        )
+        self.assertEqual(response.status_code, 201)
+
+        out = StringIO()
+        call_command('create_api_token', 'clerk', '--name', 'scanner', stdout=out)
+        self.assertEqual(ApiToken.user_for(out.getvalue().strip()), self.clerk)
+
+    def test_writes(self):
+        response = self.client.patch(
+            reverse('api-products-detail', args=[self.products[0].pk]), {'quantity': 25}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['quantity'], 25)
+        self.assertEqual(StockMovement.objects.get().MOVE_QUANTITY, 15)
+
+        self.client.force_login(self.clerk)
+        self.assertEqual(self.client.post(reverse('api-suppliers'), {'name': 'Globex'}, content_type='application/json').status_code, 403)
+        response = self.client.post(
+            reverse('api-orders'), {'lines': [{'product': self.products[1].pk, 'quantity': 2}]}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        order_id = response.json()['results'][0]['id']
+        self.assertEqual([order['id'] for order in self.client.get(reverse('api-orders')).json()['results']], [order_id])
+        self.assertEqual(self.client.patch(reverse('api-orders-detail', args=[order_id]), {'status': 'Approved'}, content_type='application/json').status_code, 403)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api-orders')).status_code, 401)
+
+
+class CatalogImportTests(TestCase):
+
+    header = 'sku,name,description,price,quantity,supplier_code,supplier_name,supplier_address,supplier_phone\n'
+
+    def write_csv(self, rows):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/catalog.csv'
+        with open(path, 'w') as f:
+            f.write(self.header + ''.join(f'{row}\n' for row in rows))
+        return path
+
+    def test_rows_are_upserted_in_chunks(self):
+        rows = [f'SKU{i},Part {i},Test product,{i}.50,5,SUP{i % 3},Supplier {i % 3},Manila,123' for i in range(250)]
+        rows.append('SKU-BAD,Broken,Test product,abc,5,,,,')
+        out = StringIO()
+        call_command('import_catalog', self.write_csv(rows), chunk_size=100, stdout=out, stderr=StringIO())
+        self.assertIn('250 product rows (250 new), 1 rejected', out.getvalue())
+        self.assertEqual(Supplier.objects.count(), 3)
+        self.assertEqual(Product.objects.count(), 250)
+        self.assertEqual(StockMovement.objects.filter(MOVE_REASON=StockMovement.OPENING).count(), 250)
+
+        # Second run updates in place; stock on existing products is untouched
+        rows = ['SKU1,Renamed part,Test product,9.99,500,SUP2,Renamed supplier,Cebu,456']
+        call_command('import_catalog', self.write_csv(rows), stdout=StringIO())
+        product = Product.objects.get(PROD_SKU='SKU1')
+        self.assertEqual((product.PROD_NAME, product.PROD_QUANTITY, product.supplier.SUPPLIER_NAME), ('Renamed part', 5, 'Renamed supplier'))
+        self.assertEqual(Product.objects.count(), 250)
+        self.assertEqual(StockMovement.objects.count(), 250)
+
+    def test_blank_columns_keep_stored_values(self):
+        supplier = Supplier.objects.create(SUPPLIER_NAME='Acme', SUPPLIER_ADDRESS='Manila', SUPPLIER_PHONE='123', SUPPLIER_CODE='ACME')
+        Product.objects.create(PROD_NAME='Keyboard', PROD_DESCRIPTION='Wired', PROD_PRICE=Decimal('10.00'), PROD_SKU='KB1')
+        rows = [
+            # A bare supplier_code links the product to the existing supplier
+            'KB1,Keyboard,,,,ACME,,,',
+            'KB2,Mouse,Wireless,5,2,ACME,,,',
+            # Repeating code and name leaves address and phone alone
+            'KB3,Monitor,,,,ACME,Acme Corp,,',
+            'KB4,Cable,,,,NOPE,,,',
+        ]
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', self.write_csv(rows), stdout=out, stderr=err)
+        self.assertIn('3 product rows (2 new), 1 rejected', out.getvalue())
+        self.assertIn("Line 5: unknown supplier_code 'NOPE'.", err.getvalue())
+
+        supplier.refresh_from_db()
+        self.assertEqual((supplier.SUPPLIER_NAME, supplier.SUPPLIER_ADDRESS, supplier.SUPPLIER_PHONE), ('Acme Corp', 'Manila', '123'))
+        product = Product.objects.get(PROD_SKU='KB1')
+        self.assertEqual((product.PROD_DESCRIPTION, product.PROD_PRICE, product.supplier), ('Wired', Decimal('10.00'), supplier))
+        self.assertEqual(Product.objects.get(PROD_SKU='KB3').PROD_QUANTITY, 0)
+
+        # Rows without a supplier_code keep the product's supplier
+        call_command('import_catalog', self.write_csv(['KB2,Mouse,,,,,,,']), stdout=StringIO())
+        self.assertEqual(Product.objects.get(PROD_SKU='KB2').supplier, supplier)
+
+    def test_spooled_import_status_is_shared(self):
+        # The upload is queued by the web process and imported by
+        # run_task_worker, which has a cache of its own
+        media_root, spool_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, spool_dir)
+        staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+        self.client.force_login(staff)
+        upload = SimpleUploadedFile('catalog.csv', (self.header + 'SKU1,Keyboard,Test product,10,3,SUP1,Acme,Manila,123\n').encode())
+        with override_settings(MEDIA_ROOT=media_root, TASK_QUEUE={'BACKEND': 'spool', 'SPOOL_DIR': spool_dir}):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('admin:ms18_product_import'), {'file': upload})
+            status_url = response['Location']
+            self.assertContains(self.client.get(status_url), '<strong>queued</strong>')
+
+            worker_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'}}
+            # close_old_connections() would close the test's transaction, as
+            # the test client also avoids
+            with override_settings(CACHES=worker_cache), \
+                    mock.patch('ms18.management.commands.run_task_worker.close_old_connections'):
+                call_command('run_task_worker', once=True, stdout=StringIO())
+        response = self.client.get(status_url)
+        self.assertContains(response, '<strong>done</strong>')
+        self.assertContains(response, 'Products imported: 1 (1 new)')
+        self.assertEqual(self.client.get(reverse('admin:ms18_product_import_status', args=['0' * 32])).status_code, 404)
+
+    @skipIf(openpyxl is None, 'openpyxl is not installed')
+    def test_xlsx_upload_through_admin(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(self.header.strip().split(','))
+        workbook.active.append(['SKU1', 'Keyboard', 'Test product', 10, 3, 'SUP1', 'Acme', 'Manila', '123'])
+        buffer = BytesIO()
+        workbook.save(buffer)
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+        self.client.force_login(staff)
+        with override_settings(MEDIA_ROOT=media_root, TASK_QUEUE={'BACKEND': 'immediate'}), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:ms18_product_import'), {
+                'file': SimpleUploadedFile('catalog.xlsx', buffer.getvalue()),
+            })
+        self.assertContains(self.client.get(response['Location']), 'Products imported: 1 (1 new)')
+        self.assertEqual(Product.objects.get().supplier.SUPPLIER_CODE, 'SUP1')
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        supplier = Supplier.objects.create(SUPPLIER_NAME='Acme', SUPPLIER_CODE='ACME')
+        products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='Test, "quoted"', PROD_QUANTITY=i, PROD_PRICE='1.25', supplier=supplier)
+            for i in range(120)
+        ])
+        services.create_orders(cls.user, {products[0].pk: 2, products[1].pk: 3})
+        services.create_orders(cls.other, {products[2].pk: 4})
+        services.create_requisition(cls.user, supplier, {products[3].pk: 5, products[4].pk: 6})
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_and_jsonl(self):
+        rows = list(csv.reader(StringIO(self.read(self.client.get(reverse('export-data', args=['products', 'csv']))).decode())))
+        self.assertEqual(len(rows), 121)
+        self.assertEqual(rows[1][3:6], ['Test, "quoted"', '0', '1.25'])
+        self.assertEqual(rows[1][7:9], ['ACME', 'Acme'])
+
+        lines = self.read(self.client.get(reverse('export-data', args=['orders', 'jsonl']))).decode().splitlines()
+        self.assertEqual([json.loads(line)['quantity'] for line in lines], [2, 3])
+
+        out = StringIO()
+        call_command('export_data', 'requisitions', '--format', 'jsonl', stdout=out)
+        self.assertEqual([json.loads(line)['quantity'] for line in out.getvalue().splitlines()], [5, 6])
+        self.assertEqual(self.client.get('/export/products.xml').status_code, 404)
+
+    @skipIf(pq is None, 'pyarrow is not installed')
+    def test_parquet_row_groups(self):
+        call_command_output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, call_command_output)
+        path = f'{call_command_output}/products.parquet'
+        call_command('export_data', 'products', '--format', 'parquet', '--output', path, '--chunk-size', '50')
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 120)
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 3)
+        response = self.client.get(reverse('export-data', args=['products', 'parquet']))
+        self.assertEqual(pq.read_table(BytesIO(self.read(response))).num_rows, 120)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        cls.acme = Supplier.objects.create(SUPPLIER_NAME='Acme Peripherals')
+        cls.keyboard = Product.objects.create(PROD_NAME='Mechanical Keyboard', PROD_DESCRIPTION='Blue switches', supplier=cls.acme)
+        cls.mouse = Product.objects.create(PROD_NAME='Wireless Mouse', PROD_DESCRIPTION='Pairs with any keyboard', supplier=cls.acme)
+        cls.cable = Product.objects.create(PROD_NAME='USB Cable', PROD_DESCRIPTION='Two metres')
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, query):
+        return [product_id for product_id, _, _ in search_products(query)]
+
+    def test_prefix_terms_and_ranking(self):
+        # Name matches rank above description matches
+        self.assertEqual(self.ids('keyb'), [self.keyboard.pk, self.mouse.pk])
+        self.assertEqual(self.ids('mech key'), [self.keyboard.pk])
+        self.assertEqual(self.ids('acme'), sorted([self.keyboard.pk, self.mouse.pk], key=lambda pk: pk != self.keyboard.pk))
+        self.assertEqual(self.ids('"); drop'), [])
+        self.assertEqual(self.ids(''), [])
+
+    def test_index_follows_writes(self):
+        self.cable.PROD_NAME = 'Braided Cable'
+        self.cable.save()
+        self.assertEqual(self.ids('braid'), [self.cable.pk])
+        self.acme.SUPPLIER_NAME = 'Globex'
+        self.acme.save()
+        self.assertEqual(self.ids('acme'), [])
+        self.assertEqual(len(self.ids('globex')), 2)
+        self.mouse.delete()
+        self.assertEqual(self.ids('wireless'), [])
+
+    def test_typeahead_endpoint(self):
+        self.client.force_login(self.user)
+        results = self.client.get(reverse('product-search'), {'q': 'usb ca'}).json()['results']
+        self.assertEqual(results, [{'id': self.cable.pk, 'name': 'USB Cable', 'supplier': '', 'url': reverse('product-detail', args=[self.cable.pk])}])
+        # limit is clamped to 1..50; a negative LIMIT would return every match
+        results = self.client.get(reverse('product-search'), {'q': 'keyb', 'limit': '-1'}).json()['results']
+        self.assertEqual(len(results), 1)
+
+
+class ReorderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('keeper', 'keeper@example.com', 'password')
+        cls.acme, cls.globex = Supplier.objects.bulk_create([
+            Supplier(SUPPLIER_NAME='Acme'), Supplier(SUPPLIER_NAME='Globex'),
+        ])
+        cls.fast = Product.objects.create(PROD_NAME='Fast mover', PROD_DESCRIPTION='x', PROD_QUANTITY=25, supplier=cls.acme)
+        cls.slow = Product.objects.create(PROD_NAME='Slow mover', PROD_DESCRIPTION='x', PROD_QUANTITY=5, supplier=cls.acme)
+        cls.other = Product.objects.create(PROD_NAME='Other', PROD_DESCRIPTION='x', PROD_QUANTITY=0, supplier=cls.globex)
+        cls.orphan = Product.objects.create(PROD_NAME='No supplier', PROD_DESCRIPTION='x', PROD_QUANTITY=0)
+        cls.stocked = Product.objects.create(PROD_NAME='Stocked', PROD_DESCRIPTION='x', PROD_QUANTITY=50, supplier=cls.globex)
+
+        # 900 used over the last 90 days (10 a day), orders taking 2 days
+        # to arrive in lots of 40
+        requisition = Requisition.objects.create(REQ_STATUS=Requisition.APPROVED, REQ_EMPLOYEE=cls.user)
+        RequestedProduct.objects.create(Product=cls.fast, Requisition=requisition, REQUESTED_PRODUCT_QUANTITY=900)
+        posted = timezone.now() - timedelta(days=10)
+        order = PurchaseOrder.objects.create(
+            ORD_NAME='Fast mover', ORD_QUANTITY=40, product=cls.fast, status=PurchaseOrder.APPROVED, ORD_DATE_POSTED=posted,
+        )
+        PurchaseOrder.objects.filter(pk=order.pk).update(ORD_RECEIVED_AT=posted + timedelta(days=2))
+
+    def test_stock_band_is_stored(self):
+        bands = dict(Product.objects.values_list('PROD_NAME', 'PROD_STOCK_BAND'))
+        self.assertEqual(bands['Slow mover'], Product.VERY_LOW)
+        self.assertEqual(bands['Fast mover'], Product.HIGH)
+        self.assertEqual(bands['Stocked'], Product.VERY_HIGH)
+        services.update_stock_quantities({self.stocked.pk: -35})
+        self.assertEqual(Product.objects.filter(PROD_STOCK_BAND=Product.LOW).get(), self.stocked)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('ms18-home'), {'stock': Product.VERY_LOW})
+        self.assertEqual({product.pk for product in response.context['products']}, {self.slow.pk, self.other.pk, self.orphan.pk})
+        self.assertContains(response, '<td class="verylow">Very Low</td>', html=True)
+        response = self.client.get(reverse('add-requisition'), {'supplier': 'acme'})
+        self.assertContains(response, '<td class="verylow">Very Low</td>', html=True)
+
+    def test_reorder_levels_from_history(self):
+        self.assertEqual(reorders.update_reorder_levels(), 1)
+        self.fast.refresh_from_db()
+        # 10 a day * 2 days * 1.5 safety; 30 days of demand beats the lot size
+        self.assertEqual((self.fast.PROD_REORDER_POINT, self.fast.PROD_REORDER_QUANTITY), (30, 300))
+        self.slow.refresh_from_db()
+        self.assertEqual(self.slow.PROD_REORDER_POINT, Product.DEFAULT_REORDER_POINT)
+        self.assertEqual(reorders.update_reorder_levels(), 0)
+
+        # Editing an order later moves ORD_UPDATED_AT but not its lead time
+        order = PurchaseOrder.objects.get(product=self.fast)
+        order.ORD_DESCRIPTION = 'Edited'
+        order.save()
+        self.assertEqual(reorders.update_reorder_levels(), 0)
+
+    def test_approval_records_receipt_time(self):
+        orders, _ = services.create_orders(self.user, {self.slow.pk: 1, self.other.pk: 2})
+        self.assertIsNone(orders[0].ORD_RECEIVED_AT)
+        services.approve_order(orders[0].pk)
+        services.bulk_approve_orders([orders[1].pk])
+        self.assertFalse(PurchaseOrder.objects.filter(pk__in=[o.pk for o in orders], ORD_RECEIVED_AT__isnull=True).exists())
+
+    def test_drafts_one_requisition_per_supplier(self):
+        call_command('generate_reorders', stdout=StringIO())
+        drafts = Requisition.objects.filter(REQ_REORDER=True)
+        self.assertEqual(set(drafts.values_list('supplier', 'REQ_STATUS')), {
+            (self.acme.pk, Requisition.DRAFT), (self.globex.pk, Requisition.DRAFT),
+        })
+        lines = dict(RequestedProduct.objects.filter(Requisition__in=drafts).values_list('Product', 'REQUESTED_PRODUCT_QUANTITY'))
+        # Back up to reorder point + reorder quantity
+        self.assertEqual(lines, {self.fast.pk: 305, self.slow.pk: 25, self.other.pk: 30})
+
+        # Open drafts are not duplicated
+        self.assertEqual(reorders.create_reorder_requisitions(), [])
+
+    def test_approving_a_reorder_adds_stock(self):
+        requisitions = reorders.create_reorder_requisitions()
+        self.assertEqual(len(requisitions), 2)
+        req_ids = [requisition.pk for requisition in requisitions]
+        self.assertEqual(services.bulk_approve_requisitions(req_ids), [])
+
+        self.client.force_login(User.objects.create_user('manager', 'manager@example.com', 'password', is_staff=True))
+        self.client.post(reverse('view-requisitions'), {'action': 'submit', 'req_ids': req_ids})
+        self.assertEqual(services.bulk_approve_requisitions(req_ids), req_ids)
+        quantities = dict(Product.objects.values_list('pk', 'PROD_QUANTITY'))
+        self.assertEqual(quantities[self.slow.pk], 30)
+        self.assertEqual(quantities[self.other.pk], 30)
+        self.assertEqual(StockMovement.objects.get(product=self.other).MOVE_QUANTITY, 30)
+        # Nothing is below its reorder point any more
+        self.assertFalse(reorders.reorder_candidates().exists())
+
+
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('ops', 'ops@example.com', 'password', is_staff=True)
+        cls.clerk = User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        Product.objects.bulk_create([Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='x') for i in range(3)])
+
+    def setUp(self):
+        cache.clear()
+        metrics_registry.reset()
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_for_staff(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('ms18-home'))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+        self.client.force_login(self.clerk)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('ms18-home')))
+
+    def test_request_log_line(self):
+        self.client.force_login(self.clerk)
+        with self.assertLogs('ms18.performance', 'INFO') as logs:
+            self.client.get(reverse('ms18-home'), {'stock': 'low'})
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['view'], entry['method'], entry['status']), ('ms18-home', 'GET', 200))
+        self.assertGreater(entry['queries'], 0)
+        self.assertEqual(entry['duplicate_queries'], 0)
+
+    def test_duplicate_fingerprints(self):
+        self.assertEqual(fingerprint('SELECT 1 WHERE id IN (%s, %s)\n  AND x = %s'), 'SELECT 1 WHERE id IN (...) AND x = %s')
+        self.assertEqual(fingerprint('INSERT INTO t VALUES (%s, %s), (%s, %s)'), 'INSERT INTO t VALUES (...)')
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for product in Product.objects.all():
+                list(Product.objects.filter(pk__in=[product.pk, 0]))
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.duplicates().values()), [3])
+
+    def test_metrics_endpoint(self):
+        self.client.force_login(self.clerk)
+        self.client.get(reverse('ms18-home'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.force_login(self.staff)
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE ms18_request_duration_seconds histogram', body)
+        self.assertIn('ms18_request_duration_seconds_count{view="ms18-home",method="GET"} 1', body)
+        self.assertIn('ms18_requests_total{view="ms18-home",method="GET",status="200"} 1', body)
+        self.assertRegex(body, r'ms18_request_queries_bucket\{view="ms18-home",le="\+Inf"\} 1')
+
+        self.client.logout()
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer s3cret'})
+            self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmarks.seed_dataset(300)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_dataset(self):
+        counts = benchmarks.dataset_counts()
+        self.assertEqual((counts['products'], counts['suppliers'], counts['orders'], counts['requisitions']), (300, 10, 300, 30))
+        self.assertTrue(benchmarks.is_seeded())
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark', '1k', stdout=StringIO())
+        # Same seed, same data
+        self.assertEqual(Product.objects.get(PROD_SKU='bench-p00000007').PROD_NAME, benchmarks.product_name(7))
+        self.assertTrue(search_products('wireless keyboard'))
+
+    def test_every_route_is_benchmarked(self):
+        from . import urls, api
+        names = {pattern.name for pattern in urls.urlpatterns if getattr(pattern, 'name', None)}
+        names |= {pattern.name for pattern in api.urlpatterns}
+        covered = {route.name for route in benchmarks.routes(benchmarks.fixtures())}
+        self.assertEqual(names - covered, set())
+
+    def test_route_benchmarks(self):
+        results = benchmarks.run_route_benchmarks(iterations=1, warmup=0)
+        failing = {label: result['status'] for label, result in results.items() if result['status'] >= 500}
+        self.assertEqual(failing, {})
+        self.assertGreater(results['inventory']['queries'], 0)
+        # Writes were rolled back
+        self.assertEqual(Product.objects.filter(PROD_NAME='Benchmark create').count(), 0)
+        self.assertEqual(benchmarks.dataset_counts()['products'], 300)
+
+    def test_percentiles_and_results(self):
+        latencies = [i / 1000 for i in range(1, 101)]
+        summary = benchmarks.summarize(latencies, [2, 4])
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms'], summary['max_ms']), (50, 95, 99, 100))
+        self.assertEqual(summary['queries'], 3)
+
+        before = benchmarks.result_document('routes', {'inventory': summary})
+        after = benchmarks.result_document('routes', {'inventory': {**summary, 'p50_ms': 25, 'queries': 2}})
+        with tempfile.TemporaryDirectory() as directory:
+            path = benchmarks.save_results(after, f'{directory}/routes.json')
+            with open(path) as f:
+                saved = json.load(f)
+        self.assertEqual(saved['dataset']['products'], 300)
+        self.assertEqual(benchmarks.compare_results(before, saved), [('inventory', 50, 25, -50.0, 3, 2)])
+
+    def test_server_benchmark_paths_and_missing_server(self):
+        self.client.force_login(User.objects.get(username='bench-clerk-0'))
+        for label, path in benchmarks.async_view_paths(benchmarks.fixtures()):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, label)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            with self.assertRaisesMessage(CommandError, 'pip install uvicorn'):
+                call_command('benchmark_servers', '--server', 'asgi')
+
+
+class ConnectionSettingsTests(TestCase):
+
+    def database_settings(self, **environ):
+        # Settings as a fresh process would build them from the environment
+        script = (
+            'import json, sys, django; django.setup(); from django.conf import settings; '
+            'print(json.dumps([settings.DATABASES, "psycopg_pool" in sys.modules]))'
+        )
+        if environ.pop('asgi', False):
+            # As uvicorn loads the project
+            script = script.replace('django.setup()', 'import django_project.asgi')
+        env = {key: value for key, value in os.environ.items() if not key.startswith('DB_') and key != 'DJANGO_ASGI'}
+        env.update(environ, DJANGO_SETTINGS_MODULE='django_project.settings')
+        output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True).stdout
+        databases, pool_imported = json.loads(output)
+        return databases['default'], pool_imported, databases
+
+    def test_replica_alias(self):
+        _, _, databases = self.database_settings()
+        self.assertNotIn('replica', databases)
+        _, _, databases = self.database_settings(DB_NAME='inventory', DB_REPLICA_HOST='replica.internal')
+        self.assertEqual((databases['replica']['NAME'], databases['replica']['HOST']), ('inventory', 'replica.internal'))
+        self.assertEqual(databases['replica']['TEST']['MIRROR'], 'default')
+
+    def test_persistent_connections_by_default(self):
+        database, _, _ = self.database_settings(DB_NAME='inventory', DB_HOST='db.internal')
+        self.assertEqual((database['NAME'], database['HOST']), ('inventory', 'db.internal'))
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertNotIn('pool', database['OPTIONS'])
+        database, _, _ = self.database_settings(DB_CONN_MAX_AGE='', DB_CONN_HEALTH_CHECKS='0')
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (None, False))
+
+    def test_no_persistent_connections_under_asgi(self):
+        # Each ASGI request's sync ORM work runs in a new thread, which
+        # would leave its persistent connection open
+        database, _, _ = self.database_settings(asgi=True, DB_CONN_MAX_AGE='')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        database, _, _ = self.database_settings(asgi=True, DB_POOL='1')
+        self.assertIn('pool', database['OPTIONS'])
+
+    def test_pool_is_not_opened_at_startup(self):
+        database, pool_imported, _ = self.database_settings(DB_POOL='1', DB_POOL_MAX_SIZE='4')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 4, 'timeout': 10.0})
+        self.assertFalse(pool_imported)
+
+    @skipIf(connection.vendor != 'postgresql', 'pooling is PostgreSQL only')
+    def test_connection_benchmark(self):
+        results = benchmarks.run_connection_benchmark(requests=5)
+        self.assertEqual(results['per request']['connections'], 5)
+        self.assertEqual(results['persistent']['connections'], 1)
+        self.assertLessEqual(results['pool']['connections'], 4)
+        # The default connection was left alone
+        self.assertNotIn('pool', connection.settings_dict['OPTIONS'])
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(routers, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_the_replica_only_when_asked(self):
+        with routers.routing_scope(False):
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+            with routers.replica_reads():
+                self.assertEqual(self.router.db_for_read(Product), 'replica')
+                self.assertEqual(self.router.db_for_write(Product), 'default')
+                with routers.primary_reads():
+                    self.assertEqual(self.router.db_for_read(Product), 'default')
+        with routers.routing_scope(False), routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'replica')
+            routers.replica_alias.return_value = None
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_replica_is_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'ms18'))
+        self.assertFalse(self.router.allow_migrate('replica', 'ms18'))
+
+
+@skipIf('replica' not in connections, 'no replica database configured')
+class ReplicaRoutingTests(TransactionTestCase):
+    # The test runner checks every alias named here, even for skipped tests
+    databases = {'default', 'replica'} & set(connections)
+
+    def setUp(self):
+        self.user = User.objects.create_user('clerk', 'clerk@example.com', 'password')
+        self.supplier = Supplier.objects.create(SUPPLIER_NAME='Acme')
+        self.product = Product.objects.create(PROD_NAME='Widget', PROD_DESCRIPTION='x', PROD_QUANTITY=5, supplier=self.supplier)
+        self.client.force_login(self.user)
+        # Forget the catalog changes above (see the last test)
+        cache.clear()
+
+    def get(self, name, *args, query=None):
+        # The view's own queries on each database; the session and user are
+        # loaded from the primary by the auth middleware and decorators
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as primary:
+            response = self.client.get(reverse(name, args=args), query)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        count = lambda context: sum('ms18_' in query['sql'] for query in context.captured_queries)
+        return response, content, count(replica), count(primary)
+
+    def test_reporting_views_read_from_the_replica(self):
+        response, content, replica, primary = self.get('supplier-list')
+        self.assertContains(response, 'Acme')
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        # Streamed exports too
+        _, content, replica, primary = self.get('export-data', 'products', 'csv')
+        self.assertIn(b'Widget', content)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        # The typeahead's raw SQL as well
+        response, _, replica, primary = self.get('product-search', query={'q': 'widg'})
+        # (the flush between these tests leaves older rows in the search table)
+        self.assertIn(self.product.pk, [result['id'] for result in response.json()['results']])
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        # The cart's receipt form is a GET, so receipts do as well
+        _, content, replica, primary = self.get('generate-receipt')
+        self.assertIn(b'Overall Total', content)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        # Views without the decorator stay on the primary
+        _, _, replica, _ = self.get('product-detail', self.product.pk)
+        self.assertEqual(replica, 0)
+
+    async def test_async_views_read_from_the_replica(self):
+        # The async ORM runs in the request's worker thread, with the view's
+        # context but that thread's connections
+        await self.async_client.aforce_login(self.user)
+        replica, primary = QueryRecorder(), QueryRecorder()
+
+        def recording():
+            stack = ExitStack()
+            stack.enter_context(connections['replica'].execute_wrapper(replica))
+            stack.enter_context(connection.execute_wrapper(primary))
+            return stack
+
+        with await sync_to_async(recording)():
+            response = await self.async_client.get(reverse('export-data', args=['products', 'csv']))
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        count = lambda recorder: sum(n for sql, n in recorder.fingerprints.items() if 'ms18_' in sql)
+        self.assertIn(b'Widget', content)
+        self.assertGreater(count(replica), 0)
+        self.assertEqual(count(primary), 0)
+
+    def test_reads_follow_a_post_to_the_primary(self):
+        response = self.client.post(reverse('add-to-cart'), {f'quantity_{self.product.pk}': 1})
+        self.assertIn('ms18_primary', response.cookies)
+        _, _, replica, primary = self.get('cart')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+        self.client.cookies.pop('ms18_primary')
+        _, _, replica, _ = self.get('cart')
+        self.assertGreater(replica, 0)
+
+    def test_catalog_pages_are_cached_from_the_primary_after_a_change(self):
+        _, _, replica, primary = self.get('ms18-home')
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        # Right after a change the replica may still have the old rows
+        self.product.PROD_NAME = 'Gadget'
+        self.product.save()
+        response, _, replica, primary = self.get('ms18-home')
+        self.assertContains(response, 'Gadget')
+        self.assertGreater(primary, 0)
+
+
+class AsyncViewTests(TestCase):
+    # Under ASGI (the async test client) the async views stream from
+    # async iterators; the other tests cover the same views under WSGI.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk', 'clerk@example.com', 'password', is_staff=True)
+        supplier = Supplier.objects.create(SUPPLIER_NAME='Acme')
+        products = Product.objects.bulk_create([
+            Product(PROD_NAME=f'Part {i}', PROD_DESCRIPTION='x', PROD_QUANTITY=i, PROD_PRICE='1.25', supplier=supplier)
+            for i in range(30)
+        ])
+        index_products()
+        services.create_orders(cls.user, {products[0].pk: 2, products[1].pk: 3})
+        cls.requisition, _, _ = services.create_requisition(cls.user, supplier, {products[2].pk: 5, products[3].pk: 6})
+
+    def setUp(self):
+        cache.clear()
+        self.async_client.force_login(self.user)
+
+    async def read(self, response):
+        self.assertTrue(response.is_async)
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    async def test_export(self):
+        response = await self.async_client.get(reverse('export-data', args=['products', 'csv']))
+        rows = list(csv.reader(StringIO((await self.read(response)).decode())))
+        self.assertEqual(len(rows), 31)
+        response = await self.async_client.get(reverse('export-data', args=['orders', 'jsonl']))
+        self.assertEqual([json.loads(line)['quantity'] for line in (await self.read(response)).splitlines()], [2, 3])
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    async def test_receipt(self):
+        response = await self.async_client.get(reverse('generate-receipt'), {'format': 'txt'})
+        content = (await self.read(response)).decode()
+        self.assertTrue(content.rstrip().endswith('Overall Total: ₱6.25'))
+
+    async def test_typeahead_and_requisition_lines(self):
+        results = (await self.async_client.get(reverse('product-search'), {'q': 'part'})).json()['results']
+        self.assertEqual(len(results), 10)
+        response = await self.async_client.get(reverse('requested-product-view', args=[self.requisition.pk]))
+        self.assertContains(response, 'Part 3')
+        response = await self.async_client.get(reverse('requested-product-view', args=[0]))
+        self.assertEqual(response.status_code, 404)
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, include
 from .views import ProductListView, ProductDetailView, ProductCreateView, ProductUpdateView, ProductDeleteView, SupplierListView, SupplierCreateView,admin_review_orders, admin_approve_order, admin_reject_order, RequestedProdView, generate_receipt
 from .views import add_supplier_to_product, add_to_req, view_requisitions, approve_requisition, reject_requisition
 from . import views
@@ -19,15 +19,21 @@ urlpatterns = [
    #path('about/cart/', views.cart_view, name='about-cart'),  # Add a URL pattern for the about/cart page
     path('supplier/new/', SupplierCreateView.as_view(), name='supplier-create'),
     path('purchaseOrder/', views.about, name='ms18-about'),
-    path('admin/review-orders/', admin_review_orders, name='admin_review_orders'),
-    path('admin/approve-order/<int:order_id>/', admin_approve_order, name='admin_approve_order'),
-    path('admin/reject-order/<int:order_id>/', admin_reject_order, name='admin_reject_order'),
+    path('review-orders/', admin_review_orders, name='admin_review_orders'),
+    path('approve-order/<int:order_id>/', admin_approve_order, name='admin_approve_order'),
+    path('reject-order/<int:order_id>/', admin_reject_order, name='admin_reject_order'),
     path('generate-receipt/', generate_receipt, name='generate-receipt'),
+    path('export/<str:kind>.<str:export_format>', views.export_data, name='export-data'),
     path('AddRequisition/', views.add_requisitions, name='add-requisition'),  
     path('add-to-req/', views.add_to_req, name='add_to_req'),
     path('ViewRequisition/', views.view_requisitions, name='view-requisitions'), 
     path('approve_requisition/<int:req_id>/', views.approve_requisition, name='approve_requisition'),
     path('reject_requisition/<int:req_id>/', views.reject_requisition, name='reject_requisition'),
+    path('submit_requisition/<int:req_id>/', views.submit_requisition, name='submit_requisition'),
     path('requested_prod/<int:pk>/', views.RequestedProdView, name='requested-product-view'),
+    path('cache-stats/', views.catalog_cache_stats, name='catalog-cache-stats'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('search/', views.product_search, name='product-search'),
+    path('api/v1/', include('ms18.api')),
 ]
 
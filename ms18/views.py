@@ -1,20 +1,74 @@
-from django.shortcuts import render, redirect, HttpResponseRedirect, get_object_or_404
+from django.shortcuts import render, redirect, HttpResponseRedirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from django.http import Http404
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.http import HttpResponseForbidden
+from django.http import StreamingHttpResponse
 from  django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from .models import Product, PurchaseOrder, Cart, Supplier, RequestedProduct, Requisition
+from .models import Product, PurchaseOrder, Cart, Supplier, RequestedProduct, Requisition, StockMovement
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
 from django.db import transaction
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, SuspiciousFileOperation
+from django.utils._os import safe_join
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.http import quote_etag
+from django.utils.crypto import constant_time_compare
+from django.views.static import serve
+from .storage import hashed_digest
+from .receipts import RECEIPT_FORMATS, areceipt
+from .exports import EXPORTS, EXPORT_FORMATS, export, aexport, parquet_available
+import os
+from .pagination import keyset_paginate
+from .services import parse_line_quantities, create_orders, create_requisition
+from . import services
+from .caching import cached, cache_stats
+from .search import search_products, TYPEAHEAD_LIMIT
+from .metrics import registry as metrics_registry
+from .routers import read_from_replica, ReplicaReadMixin
+from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+
+
+def streams_async(request):
+    # Streaming responses are read as they are sent only when the iterator
+    # matches the server: async under ASGI, sync under WSGI (runserver, the
+    # test client). Otherwise Django reads the whole response up front.
+    return isinstance(request, ASGIRequest)
+
+
+def serve_media(request, path):
+    # Content-addressed files never change under the same name, so they get
+    # a year-long immutable Cache-Control and an ETag taken from the digest.
+    digest = hashed_digest(path)
+    if digest:
+        etag = quote_etag(digest)
+    else:
+        try:
+            stat = os.stat(safe_join(settings.MEDIA_ROOT, path))
+        except (OSError, SuspiciousFileOperation):
+            raise Http404("File does not exist.")
+        etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['ETag'] = etag
+    if digest:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response
 
 
 def home(request):
@@ -25,11 +79,54 @@ def home(request):
     return render(request, 'ms18/home.html', context)
 
 
-class ProductListView(LoginRequiredMixin, ListView):
+PRODUCT_PAGE_SIZE = 50
+
+
+def filter_products(queryset, params):
+    # Prefix filters from the inventory search boxes; see migration 0042
+    # for the indexes behind them
+    supplier_name = params.get('supplier', '').strip()
+    product_name = params.get('name', '').strip()
+    stock_band = params.get('stock', '')
+
+    if supplier_name:
+        queryset = queryset.filter(supplier__SUPPLIER_NAME__istartswith=supplier_name)
+    if product_name:
+        queryset = queryset.filter(PROD_NAME__istartswith=product_name)
+    if stock_band in dict(Product.STOCK_BAND_CHOICES):
+        queryset = queryset.filter(PROD_STOCK_BAND=stock_band)
+    return queryset
+
+
+def product_page(queryset, params):
+    # Only the rows on the current page are fetched from the database
+    return cached('product_page', [params.urlencode()],
+                  lambda: keyset_paginate(queryset, params, PRODUCT_PAGE_SIZE))
+
+
+def product_filters(params):
+    return {
+        'supplier': params.get('supplier', ''),
+        'name': params.get('name', ''),
+        'stock': params.get('stock', ''),
+    }
+
+
+class ProductListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
     model = Product
     template_name = 'ms18/home.html'
     context_object_name = 'products'
-    
+
+    def get_queryset(self):
+        return filter_products(Product.objects.listing(), self.request.GET)
+
+    def get_context_data(self, **kwargs):
+        page = product_page(self.object_list, self.request.GET)
+        kwargs['page'] = page
+        kwargs['stock_bands'] = Product.STOCK_BAND_CHOICES
+        kwargs['filters'] = product_filters(self.request.GET)
+        return super().get_context_data(object_list=page.object_list, **kwargs)
+
     def form_valid(self, form):
         form.instance.employee = self.request.user
         return super().form_valid(form)
@@ -60,7 +157,10 @@ class ProductCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.employee = self.request.user
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            services.record_movements({self.object.pk: self.object.PROD_QUANTITY}, StockMovement.OPENING)
+        return response
     
 class SupplierCreateView(LoginRequiredMixin, CreateView):
     model = Supplier
@@ -108,60 +208,21 @@ class ProductDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     success_url = '/'
     
     def test_func(self):
-        product = self.get_object()
-        if self.request.user == product.employee:
-            return True
-        return False
+        # Products have no owner; deleting one is left to staff
+        return self.request.user.is_staff
+
 
-@login_required
-def about(request):
-     # Retrieve products ordered by date_posted in descending order (newest first)
-    products = Product.objects.all()
-    return render(request, 'ms18/about.html', {'products': products})
-    
-    
 from .models import Cart
 
 def add_to_cart(request):
     if request.user.is_authenticated and request.method == 'POST':
-        selected_products = []
-        for key, value in request.POST.items():
-            if key.startswith('quantity_') and int(value) > 0:
-                product_id = key.split('_')[1]
-                try:
-                    product = Product.objects.get(pk=product_id)
-
-                    # Calculate the order price based on the associated product's price
-                    order_price = product.PROD_PRICE
-
-                    selected_products.append(product)
-
-                    # Create a PurchaseOrder for the selected product with a pending status
-                    order = PurchaseOrder.objects.create(
-                        ORD_EMPLOYEE=request.user.username,
-                        ORD_DATE_POSTED=timezone.now(),
-                        ORD_NAME=product.PROD_NAME,
-                        ORD_QUANTITY=int(value),
-                        ORD_DESCRIPTION=product.PROD_DESCRIPTION,
-                        ORD_PRICE=order_price,  # Set the order price based on the product's price
-                        status=PurchaseOrder.PENDING  # Set the initial status to pending
-                    )
-
-                    # Create a Cart entry for the selected product and purchase order
-                    Cart.objects.create(
-                        CART_QUANTITY=int(value),
-                        CART_DATE_ADDED=timezone.now(),
-                        user=request.user,
-                        product=product,
-                        PurchaseOrder=order
-                    )
-
-                except Product.DoesNotExist:
-                    messages.error(request, f"Product with ID {product_id} does not exist.")
-                except Exception as e:
-                    messages.error(request, f"An error occurred while adding product with ID {product_id}: {e}")
-
-        if selected_products:
+        quantities, errors = parse_line_quantities(request.POST)
+        orders, missing = create_orders(request.user, quantities)
+
+        for error in errors + missing:
+            messages.error(request, error)
+
+        if orders:
             messages.success(request, 'Items added to orders successfully! Pending admin approval.')
 
         return redirect('cart')  # Redirect to a 'cart' view or another appropriate view
@@ -170,39 +231,47 @@ def add_to_cart(request):
         return redirect('login')  # Redirect to the login page if the user is not authenticated
 
 
+@login_required
+@read_from_replica
 def cart(request):
     user = request.user
-    cart_items = PurchaseOrder.objects.filter(ORD_EMPLOYEE=user.username)
+    orders = PurchaseOrder.objects.filter(employee=user)
 
-    overall_total = 0
-
-    for order in cart_items:
-        order.total_price = order.ORD_QUANTITY * order.ORD_PRICE
-        overall_total += order.total_price
+    # Totals are summed by the database; only the current page of line
+    # items is loaded.
+    status_totals = orders.status_totals()
+    overall_total = sum((totals['subtotal'] for totals in status_totals.values()), 0)
+    page = keyset_paginate(
+        orders.with_line_total().only('id', 'ORD_NAME', 'ORD_QUANTITY', 'ORD_PRICE', 'status'),
+        request.GET, 25, descending=True,
+    )
 
     context = {
-        'cart_items': cart_items,
+        'cart_items': page.object_list,
+        'page': page,
+        'status_totals': status_totals,
         'overall_total': overall_total,
     }
     return render(request, 'ms18/cart.html', context)
 
     
-class SupplierListView(ListView):
+class SupplierListView(ReplicaReadMixin, ListView):
     model = Supplier
-    template_name = 'ms18/supplier_list.html'
+    template_name = 'ms18/supplier.html'
     context_object_name = 'suppliers'
     
 def add_supplier_to_product(request, product_id):
+    product = get_object_or_404(Product, pk=product_id)
     if request.method == 'POST':
         supplier_name = request.POST.get('supplier_name')
-
-        # Assuming you have a 'supplier' field in your Product model
-        product = Product.objects.get(pk=product_id)
-        product.supplier = supplier_name
-        product.save()
-
-        messages.success(request, f'Supplier "{supplier_name}" added to {product.PROD_NAME}.')
-        return redirect(reverse('product-detail', args=[product_id]))
+        supplier = Supplier.objects.filter(SUPPLIER_NAME=supplier_name).first()
+        if supplier is None:
+            messages.error(request, f'No supplier named "{supplier_name}".')
+        else:
+            product.supplier = supplier
+            product.save()
+            messages.success(request, f'Supplier "{supplier_name}" added to {product.PROD_NAME}.')
+    return redirect(reverse('product-detail', args=[product_id]))
 
 
 def add_product(request):
@@ -216,82 +285,102 @@ def add_product(request):
 
     return render(request, 'your_template.html', {'form': form})
 
+@user_passes_test(lambda u: u.is_staff)
 def admin_review_orders(request):
-    # Retrieve pending orders for admin review
-    pending_orders = PurchaseOrder.objects.filter(status=PurchaseOrder.PENDING)
+    if request.method == 'POST':
+        order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids') if order_id.isdigit()]
+        action = request.POST.get('action')
+        if not order_ids:
+            messages.warning(request, 'No orders selected.')
+        elif action == 'approve':
+            approved, skipped = services.bulk_approve_orders(order_ids)
+            messages.success(request, f'{len(approved)} orders approved. Inventory updated.')
+            if skipped:
+                messages.error(request, f"Orders {', '.join(map(str, skipped))} have no matching product and were left pending.")
+        elif action == 'reject':
+            rejected = services.bulk_reject_orders(order_ids)
+            messages.success(request, f'{rejected} orders rejected.')
+        else:
+            return HttpResponseBadRequest(f"Unknown action '{action}'.")
+        return redirect(f"{reverse('admin_review_orders')}?{request.GET.urlencode()}")
+
+    # Retrieve pending orders for admin review, one page at a time
+    pending_orders = (
+        PurchaseOrder.objects.filter(status=PurchaseOrder.PENDING)
+        .select_related('employee')
+        .only('id', 'ORD_NAME', 'ORD_QUANTITY', 'ORD_DATE_POSTED', 'ORD_EMPLOYEE', 'employee__username')
+    )
+    page = keyset_paginate(pending_orders, request.GET, 100)
 
     context = {
-        'pending_orders': pending_orders
+        'pending_orders': page.object_list,
+        'page': page,
     }
     return render(request, 'ms18/admin_review_orders.html', context)
 
 
-@transaction.atomic
+@user_passes_test(lambda u: u.is_staff)
 def admin_approve_order(request, order_id):
-    order = get_object_or_404(PurchaseOrder, id=order_id)
-
-    # Update the status to Approved
-    order.status = PurchaseOrder.APPROVED
-    order.save()
-
     try:
-        product = Product.objects.get(PROD_NAME=order.ORD_NAME)
-        original_quantity = product.PROD_QUANTITY
-        product.PROD_QUANTITY += order.ORD_QUANTITY
-        product.save()
-
-        # Print statements for debugging
-        print(f"Order {order.id} approved. Inventory updated: {original_quantity} -> {product.PROD_QUANTITY}")
-        print(f"Product details: {product.PROD_NAME}, Quantity: {product.PROD_QUANTITY}")
-        messages.success(request, f'Order {order.id} approved. Inventory updated.')
-    except Product.DoesNotExist:
-        messages.error(request, f"Product {order.ORD_NAME} does not exist.")
-    except Exception as e:
-        messages.error(request, f"An error occurred: {e}")
+        if services.approve_order(order_id):
+            messages.success(request, f'Order {order_id} approved. Inventory updated.')
+        else:
+            messages.warning(request, f'Order {order_id} has already been processed.')
+    except PurchaseOrder.DoesNotExist:
+        raise Http404(f"Order {order_id} does not exist.")
+    except services.StockError as e:
+        messages.error(request, str(e))
 
     return redirect('admin_review_orders')
 
 
 @user_passes_test(lambda u: u.is_staff)
 def admin_reject_order(request, order_id):
-    order = get_object_or_404(PurchaseOrder, id=order_id)
-    order.status = PurchaseOrder.REJECTED
-    order.save()
-    messages.success(request, f'Order {order.id} rejected.')
+    try:
+        if services.reject_order(order_id):
+            messages.success(request, f'Order {order_id} rejected.')
+        else:
+            messages.warning(request, f'Order {order_id} has already been processed.')
+    except PurchaseOrder.DoesNotExist:
+        raise Http404(f"Order {order_id} does not exist.")
     return redirect('admin_review_orders')
 
 
 def inventory(request):
     products = Product.objects.all()
-
-    for product in products:
-        print(f"Product: {product.PROD_NAME}, Quantity: {product.PROD_QUANTITY}")
-
     return render(request, 'ms18/home.html', {'products': products})
 
 
-def generate_receipt(request):
-    user = request.user
-    cart_items = PurchaseOrder.objects.filter(ORD_EMPLOYEE=user.username)
-
-    # Customize the receipt content based on your requirements
-    receipt_content = f"Orders from {user.username}\n\n"
-    overall_total = 0
-    
-    for order in cart_items:
-        total_price = order.ORD_QUANTITY * order.ORD_PRICE
-        overall_total += total_price
+@require_GET
+@login_required
+@read_from_replica
+async def generate_receipt(request):
+    receipt_format = request.GET.get('format') or 'txt'
+    if receipt_format not in RECEIPT_FORMATS:
+        return HttpResponseBadRequest(f"Unsupported receipt format '{receipt_format}'.")
+
+    # The receipt is generated while it is sent, so memory use does not grow
+    # with the number of orders.
+    content_type, receipt = RECEIPT_FORMATS[receipt_format]
+    user = await request.auser()
+    content = areceipt(receipt, user) if streams_async(request) else receipt(user)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="order.{receipt_format}"'
 
-        receipt_content += f"Order {order.id}:\n"
-        receipt_content += f"Product: {order.ORD_NAME}\n"
-        receipt_content += f"Quantity: {order.ORD_QUANTITY}\n"
-        receipt_content += f"Unit Price: ₱{order.ORD_PRICE}\n"
-        receipt_content += f"Status: {order.status}\n\n"
-        receipt_content += f"Overall Total: ₱{overall_total}"
+    return response
 
-    response = HttpResponse(receipt_content, content_type='text/plain')
-    response['Content-Disposition'] = 'attachment; filename="order.txt"'
 
+@login_required
+@read_from_replica
+async def export_data(request, kind, export_format):
+    if kind not in EXPORTS or export_format not in EXPORT_FORMATS:
+        raise Http404(f"No export '{kind}.{export_format}'.")
+    if export_format == 'parquet' and not parquet_available():
+        return HttpResponseBadRequest('Parquet exports need pyarrow installed on the server.')
+    content_type = EXPORT_FORMATS[export_format][0]
+    stream = aexport if streams_async(request) else export
+    response = StreamingHttpResponse(stream(kind, export_format, await request.auser()), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{export_format}"'
     return response
 
 
@@ -308,108 +397,180 @@ def generate_receipt(request):
 
 @login_required
 def about(request):
-     # Retrieve products ordered by date_posted in descending order (newest first)
-    products = Product.objects.all()
-    return render(request, 'ms18/about.html', {'products': products})
+    # The order form pages through the inventory with the same filters
+    page = product_page(filter_products(Product.objects.listing(), request.GET), request.GET)
+    return render(request, 'ms18/about.html', {
+        'products': page.object_list, 'page': page, 'filters': product_filters(request.GET),
+    })
 
     
 
 def add_requisitions(request):
+    # A requisition goes to one supplier, so products are only listed once
+    # a supplier has been searched for
+    filters = product_filters(request.GET)
+    page = None
+    if filters['supplier'].strip():
+        page = product_page(filter_products(Product.objects.listing(), request.GET), request.GET)
     context = {
-        'products': Product.objects.all(),
-        'suppliers': Supplier.objects.all()
+        'products': page.object_list if page else [],
+        'page': page,
+        'filters': filters,
     }
     return render(request, 'ms18/add_requisition.html', context)
 
+@login_required
 def add_to_req(request):
     if request.method == 'POST':
         selected_supplier_id = request.POST.get('hidden_supplier_id')
-        search_supplier_name = request.POST.get('search_supplier_name', '')  # Example: retrieving from POST data
         if not selected_supplier_id:
             messages.error(request, "No supplier selected.")
             return redirect('view-requisitions')
 
-        user_instance, created = User.objects.get_or_create(username=request.user.username)
-
         try:
             supplier = Supplier.objects.get(pk=selected_supplier_id)
-        except Supplier.DoesNotExist:
+        except (Supplier.DoesNotExist, ValueError):
             messages.error(request, f"Supplier with ID {selected_supplier_id} does not exist.")
             return redirect('view-requisitions')
 
-        requisition = Requisition.objects.create(
-            REQ_EMPLOYEE=user_instance,
-            supplier=supplier,
-        )
-
-        products_added = []
-
-        for key, value in request.POST.items():
-            if key.startswith('quantity_') and int(value) > 0:
-                product_id = key.split('_')[1]
-                try:
-                    product = Product.objects.get(pk=product_id)
-                    quantity = request.POST.get(f'quantity_{product.id}', 0)
-                    products_added.append(product.PROD_NAME)
-
-                    # Create RequestedProduct without assigning Requisition
-                    requested_product = RequestedProduct.objects.create(
-                        REQUESTED_PRODUCT_NAME=product.PROD_NAME,
-                        REQUESTED_PRODUCT_QUANTITY=quantity,
-                        Product=product,
-                    )
-
-                    # Assign the Requisition to the RequestedProduct
-                    requested_product.Requisition = requisition
-                    requested_product.save()
-
-                except Product.DoesNotExist:
-                    messages.error(request, f"Product with ID {product_id} does not exist.")
-                except Exception as e:
-                    messages.error(request, f"An error occurred while adding product with ID {product_id}: {e}")
-
-        if products_added:
-            requisition.save()
-            messages.success(request, f'Products ({", ".join(products_added)}) added to Requisition successfully!')
+        quantities, errors = parse_line_quantities(request.POST)
+        requisition, requested_products, missing = create_requisition(request.user, supplier, quantities)
 
+        for error in errors + missing:
+            messages.error(request, error)
+
+        if len(requested_products) > 20:
+            messages.success(request, f'{len(requested_products)} products added to Requisition {requisition.REQ_ID} successfully!')
+        elif requested_products:
+            products_added = [requested_product.REQUESTED_PRODUCT_NAME for requested_product in requested_products]
+            messages.success(request, f'Products ({", ".join(products_added)}) added to Requisition successfully!')
         else:
             messages.warning(request, 'No products were added to the Requisition.')
 
     return redirect('view-requisitions')
 
 
+@login_required
+@read_from_replica
 def view_requisitions(request):
-    requisitions = Requisition.objects.order_by('-REQ_ID')
+    if request.method == 'POST':
+        # Bulk actions change stock; approvals are for staff, as for orders
+        if not request.user.is_staff:
+            return HttpResponseForbidden('Only staff can approve, reject or submit requisitions.')
+        req_ids = [int(req_id) for req_id in request.POST.getlist('req_ids') if req_id.isdigit()]
+        action = request.POST.get('action')
+        if not req_ids:
+            messages.warning(request, 'No requisitions selected.')
+        elif action == 'approve':
+            try:
+                approved = services.bulk_approve_requisitions(req_ids)
+            except services.StockError as e:
+                messages.error(request, f'No requisitions were approved. {e}')
+            else:
+                messages.success(request, f'{len(approved)} requisitions approved successfully!')
+        elif action == 'reject':
+            rejected = services.bulk_reject_requisitions(req_ids)
+            messages.success(request, f'{rejected} requisitions rejected successfully!')
+        elif action == 'submit':
+            submitted = services.bulk_submit_requisitions(req_ids)
+            messages.success(request, f'{submitted} requisitions submitted for approval!')
+        else:
+            return HttpResponseBadRequest(f"Unknown action '{action}'.")
+        return redirect('view-requisitions')
+
+    requisitions = Requisition.objects.listing().order_by('-REQ_ID')
     context = {
         'Requisition': requisitions,
     }
     return render(request, 'ms18/requisition_view.html', context)
 
+@user_passes_test(lambda u: u.is_staff)
 def approve_requisition(request, req_id):
-    requisition = Requisition.objects.get(pk=req_id)
-    requisition.approve()  # Implement a method in your Requisition model to handle approval
+    try:
+        approved = services.approve_requisition(req_id)
+    except Requisition.DoesNotExist:
+        raise Http404(f"Requisition {req_id} does not exist.")
+    except services.StockError as e:
+        messages.error(request, str(e))
+        return redirect('view-requisitions')
+
+    if approved:
+        messages.success(request, f'Requisition {req_id} approved successfully!')
+    else:
+        messages.warning(request, f'Requisition {req_id} has already been processed.')
+    return redirect('view-requisitions')
 
-    # Update product quantities
-    for requested_product in requisition.requestedproduct_set.all():
-        requested_product.Product.PROD_QUANTITY -= requested_product.REQUESTED_PRODUCT_QUANTITY
-        requested_product.Product.save()
 
-    messages.success(request, f'Requisition {req_id} approved successfully!')
+@user_passes_test(lambda u: u.is_staff)
+def reject_requisition(request, req_id):
+    try:
+        rejected = services.reject_requisition(req_id)
+    except Requisition.DoesNotExist:
+        raise Http404(f"Requisition {req_id} does not exist.")
+
+    if rejected:
+        messages.success(request, f'Requisition {req_id} rejected successfully!')
+    else:
+        messages.warning(request, f'Requisition {req_id} has already been processed.')
     return redirect('view-requisitions')
 
 
-def reject_requisition(request, req_id):
-    requisition = Requisition.objects.get(pk=req_id)
-    requisition.reject()  # Implement a method in your Requisition model to handle rejection
-    messages.success(request, f'Requisition {req_id} rejected successfully!')
+@user_passes_test(lambda u: u.is_staff)
+def submit_requisition(request, req_id):
+    try:
+        submitted = services.submit_requisition(req_id)
+    except Requisition.DoesNotExist:
+        raise Http404(f"Requisition {req_id} does not exist.")
+
+    if submitted:
+        messages.success(request, f'Requisition {req_id} submitted for approval!')
+    else:
+        messages.warning(request, f'Requisition {req_id} is not a draft.')
     return redirect('view-requisitions')
 
 
-def RequestedProdView(request, pk):
-    requisition = get_object_or_404(Requisition, REQ_ID=pk)
-    requested_prods = RequestedProduct.objects.filter(Requisition=requisition)
+@login_required
+@read_from_replica
+async def product_search(request):
+    # Typeahead: best matches for the words typed so far, each a prefix.
+    # The search is raw SQL behind the cache, so it runs in the ORM's thread.
+    try:
+        limit = max(1, min(int(request.GET.get('limit', TYPEAHEAD_LIMIT)), 50))
+    except ValueError:
+        return HttpResponseBadRequest('limit must be a number.')
+    matches = await sync_to_async(search_products)(request.GET.get('q', ''), limit)
+    results = [
+        {'id': product_id, 'name': name, 'supplier': supplier, 'url': reverse('product-detail', args=[product_id])}
+        for product_id, name, supplier in matches
+    ]
+    response = JsonResponse({'results': results})
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
+
+@user_passes_test(lambda u: u.is_staff)
+def catalog_cache_stats(request):
+    return JsonResponse(cache_stats())
+
+
+def metrics(request):
+    # Prometheus scrape target; see PerformanceMiddleware
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and constant_time_compare(authorization, f'Bearer {token}'))):
+        return HttpResponseForbidden('Staff access or a metrics token is required.')
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@read_from_replica
+async def RequestedProdView(request, pk):
+    requisition = await aget_object_or_404(Requisition, REQ_ID=pk)
+    requested_prods = [
+        line async for line in RequestedProduct.objects.listing().filter(Requisition=requisition)
+    ]
     
     context = {
         'requested_prods': requested_prods,
     }
-    return render(request, 'ms18/requested_prod_view.html', context)
+    # base.html reads the user and their profile while rendering
+    return await sync_to_async(render)(request, 'ms18/requested_prod_view.html', context)
@@ -1,20 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
+from ms18.images import ThumbnailedImageMixin
 
-class Profile(models.Model):
+class Profile(ThumbnailedImageMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     image = models.ImageField(default='user_default.png', upload_to='profile_pics')
+
+    thumbnail_fields = ('image',)
     
     def __str__(self):
         return f'{self.user.username} Profile'
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        img = Image.open(self.image.path)
-        
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)